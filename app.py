@@ -1,81 +1,147 @@
 import streamlit as st  
 import pandas as pd  
 import numpy as np  
-import altair as alt  
-from sklearn.linear_model import LogisticRegression  
-from sklearn.ensemble import RandomForestClassifier  
-from xgboost import XGBClassifier  
-from sklearn.svm import SVC  
-from sklearn.model_selection import train_test_split  
-from sklearn.metrics import accuracy_score  
-from scipy.stats import poisson  
+import io  
+import os  
+import tempfile  
+import weakref  
+from prediction.batch import DEFAULT_CHUNK_SIZE, FIXTURE_COLUMNS, iter_fixture_chunks, score_file, train_on_fixtures, validate_fixtures  
+from prediction.cache import cache_key, get_prediction_cache  
+from prediction.graph import ComputeGraph  
+from prediction.history import DEFAULT_PAGE_SIZE, PredictionHistory  
+from prediction.feed import FeedRunner, OddsBook, socket_lines, strength_probabilities, tail_file  
+from prediction.evaluation import compare_profiles, fit_and_score, iter_evaluate_models, split_dataset  
+from prediction.models import DEFAULT_PROFILE, PROFILES, build_models, profile_version  
+from prediction.metrics import get_metrics, timed  
+from prediction.markets import DEFAULT_EDGE_THRESHOLD, scan_value_bets  
+from prediction.poisson import DEFAULT_MAX_GOALS, goal_probabilities, scoreline_tensor  
+from prediction.registry import get_registry  
+from prediction.schema import TEAM_STATS  
+from prediction.rolling import featurize_store  
+from prediction.store import DEFAULT_STORE_DIR as MATCH_STORE_DIR, MatchStore  
+from prediction.strength import fit_from_store  
+
+# Nombre de matchs récents de l'historique utilisés pour comparer les profils d'entraînement  
+PROFILE_SAMPLE_SIZE = 5000  
 
 # Initialisation de session_state si non existant  
 if 'history' not in st.session_state:  
-    st.session_state.history = []  
-
-# Fonction pour entraîner les modèles  
-def train_models(X_train, y_train):  
-    models = {  
-        "Logistic Regression": LogisticRegression(max_iter=1000),  
-        "Random Forest": RandomForestClassifier(n_estimators=100, n_jobs=-1),  
-        "XGBoost": XGBClassifier(use_label_encoder=False, eval_metric='mlogloss', n_jobs=-1),  
-        "SVM": SVC(probability=True)  
-    }  
-    return {name: model.fit(X_train, y_train) for name, model in models.items()}  
+    st.session_state.history = PredictionHistory()  
+
+# Temps par étape de cette exécution de la page (panneau de débogage, export METRICS_FILE)  
+metrics_run = get_metrics().start_run("app")  
 
 # Fonction pour prédire les résultats avec le modèle de Poisson  
-def poisson_prediction(goals_pred):  
-    return np.array([poisson.pmf(i, goals_pred) for i in range(6)])  
+def poisson_prediction(goals_pred, max_goals=DEFAULT_MAX_GOALS):  
+    return goal_probabilities(goals_pred, max_goals)[0]  
 
-# Fonction pour évaluer les modèles avec une validation simple  
-def evaluate_models_simple(X, y):  
+# Fonction pour évaluer les modèles avec une validation simple (sans affichage : le résultat est mis en cache)  
+def evaluate_models_simple(X, y, profile=DEFAULT_PROFILE):  
     # Divisez les données en ensembles d'entraînement et de test  
-    try:  
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)  
-    except Exception as e:  
-        st.error(f"Erreur lors de la division des données : {e}")  
-        return None  
+    X_train, X_test, y_train, y_test = split_dataset(X, y)  
 
-    models = {  
-        "Logistic Regression": LogisticRegression(max_iter=1000),  
-        "Random Forest": RandomForestClassifier(n_estimators=100, n_jobs=-1),  
-        "XGBoost": XGBClassifier(use_label_encoder=False, eval_metric='mlogloss', n_jobs=-1),  
-        "SVM": SVC(probability=True)  
-    }  
-
-    scores = {}  
-    for name, model in models.items():  
+    # Les modèles déjà entraînés sur ces données sont repris du registre  
+    registry = get_registry()  
+    results = {}  
+    for name, model in build_models(profile=profile).items():  
         try:  
-            model.fit(X_train, y_train)  
-            y_pred = model.predict(X_test)  
-            scores[name] = accuracy_score(y_test, y_pred)  
+            results[name] = fit_and_score(name, model, registry, X_train, y_train, X_test, y_test)  
+            results[name]["status"] = "ok"  
         except Exception as e:  
-            st.error(f"Erreur lors de l'entraînement du modèle {name}: {e}")  
-            scores[name] = None  
-
-    return scores  
+            results[name] = {"accuracy": None, "status": "erreur", "error": str(e)}  
+
+    return results  
+
+# Fonction pour évaluer les modèles en parallèle (temps d'entraînement et délai par modèle)  
+# Chaque score est écrit dans `progress` (st.empty) dès que son modèle a fini ; seul le dictionnaire final est mis en cache  
+def evaluate_models_parallel(X, y, profile=DEFAULT_PROFILE, progress=None):  
+    X_train, X_test, y_train, y_test = split_dataset(X, y)  
+    results = {}  
+    for name, result in iter_evaluate_models(X_train, y_train, X_test, y_test, models=build_models(profile=profile)):  
+        results[name] = result  
+        if progress is not None:  
+            progress.dataframe(pd.DataFrame(results).T)  
+    return results  
+
+# Affichage des résultats d'évaluation, qu'ils viennent du cache ou d'un calcul de cette session  
+def show_evaluation(results, parallel=False, table=None):  
+    for name, result in results.items():  
+        if result["status"] == "erreur":  
+            st.error(f"Erreur lors de l'entraînement du modèle {name}: {result['error']}")  
+        elif result["status"] == "timeout":  
+            st.warning(f"Le modèle {name} a dépassé le temps imparti.")  
+    if parallel:  
+        (table or st).dataframe(pd.DataFrame(results).T)  
+    return {name: result["accuracy"] for name, result in results.items()}  
 
-# Fonction pour calculer la probabilité implicite  
-def calculate_implied_prob(odds):  
-    return 1 / odds  
+# Fonction pour prédire les résultats du match  
+def predict_match_result(expected_home, expected_away, rho=0.0, max_goals=DEFAULT_MAX_GOALS):  
+    matrix = scoreline_tensor(expected_home, expected_away, max_goals, rho=rho)[0]  
+    home_goals, away_goals = np.indices(matrix.shape)  
+    results_df = pd.DataFrame({  
+        'Home Goals': home_goals.ravel(),  
+        'Away Goals': away_goals.ravel(),  
+        'Probability': matrix.ravel()  
+    })  
+    return results_df  
 
-# Fonction pour détecter les paris de valeur  
-def detect_value_bet(predicted_prob, implied_prob, threshold=0.05):  
-    return predicted_prob > (implied_prob + threshold)  
+# Graphique de la distribution des buts d'une équipe (altair n'est chargé qu'ici)  
+def goals_chart(poisson_results, team):  
+    import altair as alt  
+    poisson_df = pd.DataFrame({  
+        'Buts': range(len(poisson_results)),  
+        'Probabilité': poisson_results  
+    })  
+    return alt.Chart(poisson_df).mark_bar().encode(  
+        x='Buts:O',  
+        y='Probabilité:Q',  
+        tooltip=['Buts', 'Probabilité']  
+    ).properties(title=f"Distribution des buts pour {team}")  
+
+# Graphe de calcul des résultats : chaque bloc n'est recalculé que si ses entrées changent  
+def build_app_graph():  
+    graph = ComputeGraph()  
+    graph.node("poisson_home", ["home_goals"])(poisson_prediction)  
+    graph.node("poisson_away", ["away_goals"])(poisson_prediction)  
+    graph.node("match_results", ["home_goals", "away_goals", "rho"])(predict_match_result)  
+    graph.node("chart_home", ["poisson_home", "home_team"])(goals_chart)  
+    graph.node("chart_away", ["poisson_away", "away_team"])(goals_chart)  
+
+    @graph.node("value_bets", ["home_goals", "away_goals", "rho", "market_odds"])  
+    def value_bets(expected_home, expected_away, rho, market_odds):  
+        # Tous les marchés saisis sont dérivés de la même matrice des scores  
+        tensor = scoreline_tensor(expected_home, expected_away, DEFAULT_MAX_GOALS, fold_tail=True, rho=rho)  
+        odds = pd.DataFrame(list(market_odds), columns=["market", "selection", "odds"]).assign(match=0)  
+        return scan_value_bets(tensor, odds, threshold=DEFAULT_EDGE_THRESHOLD)  
+
+    return graph  
+
+# Forces d'équipes ajustées une fois par processus sur l'historique des matchs, s'il existe  
+@st.cache_resource(ttl=3600)  
+def load_team_strength(store_dir=MATCH_STORE_DIR):  
+    if not os.path.exists(os.path.join(store_dir, "meta.json")):  
+        return None  
+    return fit_from_store(MatchStore(store_dir))  
 
-# Fonction pour prédire les résultats du match  
-def predict_match_result(poisson_home, poisson_away):  
-    home_goals = np.arange(len(poisson_home))  
-    away_goals = np.arange(len(poisson_away))  
-    results = []  
+# État glissant de chaque équipe après une passe unique sur l'historique  
+@st.cache_resource(ttl=3600)  
+def load_rolling_features(store_dir=MATCH_STORE_DIR):  
+    if not os.path.exists(os.path.join(store_dir, "meta.json")):  
+        return None  
+    return featurize_store(MatchStore(store_dir))[2]  
 
-    for h in home_goals:  
-        for a in away_goals:  
-            results.append((h, a, poisson_home[h] * poisson_away[a]))  
+# Flux de cotes en direct : un carnet et un thread d'ingestion par processus, partagés par les sessions  
+@st.cache_resource  
+def start_odds_feed(source):  
+    strength = load_team_strength()  
+    book = OddsBook(strength_probabilities(strength) if strength is not None else None, threshold=DEFAULT_EDGE_THRESHOLD)  
+    if source.isdigit():  
+        return FeedRunner(lambda stop: socket_lines(port=int(source), stop=stop), book).start()  
+    return FeedRunner(lambda stop: tail_file(source, stop=stop), book).start()  
 
-    results_df = pd.DataFrame(results, columns=['Home Goals', 'Away Goals', 'Probability'])  
-    return results_df  
+if 'graph' not in st.session_state:  
+    st.session_state.graph = build_app_graph()  
+graph = st.session_state.graph  
 
 # Interface utilisateur  
 st.set_page_config(page_title="Prédiction de Matchs", layout="wide")  
@@ -120,45 +186,113 @@ with col2:
     away_fautes_commises = st.number_input("⚠️ Fautes commises par match", min_value=0, max_value=30, value=14)  
     away_interceptions = st.number_input("🛑 Interceptions par match", min_value=0, max_value=30, value=10)  
 
+# Moyennes et forme récente : saisies, ou calculées sur les 5 derniers matchs de l'historique  
+rolling = load_rolling_features()  
+if rolling is not None and st.checkbox("🔁 Moyennes et forme récente issues de l'historique des matchs", value=False):  
+    if home_team in rolling.teams and away_team in rolling.teams:  
+        names = rolling.feature_names  
+        home_snapshot, away_snapshot = (  
+            dict(zip(names, row)) for row in rolling.snapshot([rolling.code(home_team), rolling.code(away_team)])  
+        )  
+        home_goals, away_goals = home_snapshot['goals'], away_snapshot['goals']  
+        home_encais, away_encais = home_snapshot['encais'], away_snapshot['encais']  
+        home_forme_recente, away_forme_recente = int(home_snapshot['forme_recente']), int(away_snapshot['forme_recente'])  
+        home_xG, away_xG = home_snapshot.get('xG', home_xG), away_snapshot.get('xG', away_xG)  
+        home_possession, away_possession = home_snapshot.get('possession', home_possession), away_snapshot.get('possession', away_possession)  
+        home_tirs_cadres, away_tirs_cadres = home_snapshot.get('tirs_cadres', home_tirs_cadres), away_snapshot.get('tirs_cadres', away_tirs_cadres)  
+        st.dataframe(pd.DataFrame([home_snapshot, away_snapshot], index=[home_team, away_team]))  
+    else:  
+        st.warning("Équipes absentes de l'historique des matchs : utilisation des valeurs saisies.")  
+
+# Espérances de buts : moyennes saisies, ou modèle de Dixon-Coles si l'historique des matchs est disponible  
+strength = load_team_strength()  
+use_strength = strength is not None and st.checkbox("📐 Espérances de buts issues des forces d'équipes (Dixon-Coles)", value=False)  
+if use_strength and home_team in strength.teams and away_team in strength.teams:  
+    (expected_home,), (expected_away,) = strength.expected_goals(home_team, away_team)  
+    rho = strength.rho  
+    st.caption(f"λ domicile = {expected_home:.2f}, λ extérieur = {expected_away:.2f}, rho = {rho:.3f}")  
+else:  
+    if use_strength:  
+        st.warning("Équipes absentes de l'historique des matchs : utilisation des moyennes saisies.")  
+    expected_home, expected_away, rho = home_goals, away_goals, 0.0  
+
+graph.set_inputs(home_team=home_team, away_team=away_team, home_goals=expected_home, away_goals=expected_away, rho=rho)  
+
+# Cotes du bookmaker pour la recherche de paris de valeur (1X2, double chance, over/under, BTTS, score exact, handicap asiatique)  
+market_odds = st.data_editor(  
+    pd.DataFrame({  
+        "market": ["1X2", "1X2", "1X2", "Over/Under 2.5", "Over/Under 2.5", "BTTS", "Asian handicap -0.5"],  
+        "selection": ["1", "X", "2", "over", "under", "yes", "home"],  
+        "odds": [1.8, 3.6, 2.2, 1.9, 1.9, 1.8, 1.8]  
+    }),  
+    num_rows="dynamic",  
+    key="market_odds"  
+).dropna()  
+graph.set_inputs(market_odds=tuple(market_odds.itertuples(index=False, name=None)))  
+
+parallel_evaluation = st.checkbox("⚙️ Évaluation parallèle des modèles (avec temps d'entraînement)", value=False)  
+training_profile = st.selectbox("🏎️ Profil d'entraînement", list(PROFILES), index=list(PROFILES).index(DEFAULT_PROFILE))  
+
+# Temps d'entraînement et log-loss de chaque profil, mesurés sur l'historique des matchs  
+with st.expander("⏱️ Comparer les profils d'entraînement"):  
+    if not os.path.exists(os.path.join(MATCH_STORE_DIR, "meta.json")):  
+        st.info("Disponible une fois l'historique des matchs ingéré (python -m prediction.store).")  
+    elif st.button("Mesurer les profils"):  
+        X_history, y_history = MatchStore(MATCH_STORE_DIR).training_set()  
+        X_history, y_history = np.asarray(X_history[-PROFILE_SAMPLE_SIZE:]), y_history[-PROFILE_SAMPLE_SIZE:]  
+        with st.spinner("Entraînement des modèles de chaque profil..."):  
+            st.session_state.profile_comparison = pd.DataFrame(compare_profiles(X_history, y_history))  
+    if st.session_state.get('profile_comparison') is not None:  
+        comparison = st.session_state.profile_comparison  
+        st.dataframe(comparison, hide_index=True)  
+        st.dataframe(comparison.groupby("profil", sort=False).agg(fit_time=("fit_time", "sum"), log_loss=("log_loss", "min")))  
+
+# Rassemblez les données dans un DataFrame  
+home_data = {  
+    'goals': home_goals,  
+    'xG': home_xG,  
+    'encais': home_encais,  
+    'possession': home_possession,  
+    'tirs_par_match': home_tirs_par_match,  
+    'passes_cles_par_match': home_passes_cles_par_match,  
+    'tirs_cadres': home_tirs_cadres,  
+    'touches_surface': home_touches_surface,  
+    'duels_defensifs': home_duels_defensifs,  
+    'passes_reussies': home_passes_reussies,  
+    'forme_recente': home_forme_recente,  
+    'victories': home_victories,  
+    'fautes_commises': home_fautes_commises,  
+    'interceptions': home_interceptions  
+}  
+
+away_data = {  
+    'goals': away_goals,  
+    'xG': away_xG,  
+    'encais': away_encais,  
+    'possession': away_possession,  
+    'tirs_par_match': away_tirs_par_match,  
+    'passes_cles_par_match': away_passes_cles_par_match,  
+    'tirs_cadres': away_tirs_cadres,  
+    'touches_surface': away_touches_surface,  
+    'duels_defensifs': away_duels_defensifs,  
+    'passes_reussies': away_passes_reussies,  
+    'forme_recente': away_forme_recente,  
+    'victories': away_victories,  
+    'fautes_commises': away_fautes_commises,  
+    'interceptions': away_interceptions  
+}  
+
+# Les sessions qui demandent les mêmes caractéristiques (et le même mode d'évaluation) partagent le résultat  
+evaluation_mode = "parallèle" if parallel_evaluation else "simple"  
+prediction_key = cache_key(home_data, away_data, training_profile, evaluation_mode, version=profile_version(training_profile))  
+# Entrées de tous les blocs de résultats : des résultats calculés avec d'autres valeurs ne sont plus affichés  
+results_key = cache_key(prediction_key, home_team, away_team, expected_home, expected_away, rho)  
+
 # Bouton pour prédire les résultats  
 if st.button("🔍 Prédire les résultats"):  
-    # Rassemblez les données dans un DataFrame  
-    home_data = {  
-        'goals': home_goals,  
-        'xG': home_xG,  
-        'encais': home_encais,  
-        'possession': home_possession,  
-        'tirs_par_match': home_tirs_par_match,  
-        'passes_cles_par_match': home_passes_cles_par_match,  
-        'tirs_cadres': home_tirs_cadres,  
-        'touches_surface': home_touches_surface,  
-        'duels_defensifs': home_duels_defensifs,  
-        'passes_reussies': home_passes_reussies,  
-        'forme_recente': home_forme_recente,  
-        'victories': home_victories,  
-        'fautes_commises': home_fautes_commises,  
-        'interceptions': home_interceptions  
-    }  
-    
-    away_data = {  
-        'goals': away_goals,  
-        'xG': away_xG,  
-        'encais': away_encais,  
-        'possession': away_possession,  
-        'tirs_par_match': away_tirs_par_match,  
-        'passes_cles_par_match': away_passes_cles_par_match,  
-        'tirs_cadres': away_tirs_cadres,  
-        'touches_surface': away_touches_surface,  
-        'duels_defensifs': away_duels_defensifs,  
-        'passes_reussies': away_passes_reussies,  
-        'forme_recente': away_forme_recente,  
-        'victories': away_victories,  
-        'fautes_commises': away_fautes_commises,  
-        'interceptions': away_interceptions  
-    }  
-
-    # Convertir les données en DataFrame pour l'entraînement  
-    X = pd.DataFrame([home_data, away_data])  
+    # Convertir les données en DataFrame pour l'entraînement (colonnes dans l'ordre du schéma partagé)  
+    with timed("dataframe"):  
+        X = pd.DataFrame(TEAM_STATS.matrix([home_data, away_data]), columns=TEAM_STATS.names)  
 
     # Vérifiez les valeurs manquantes  
     if X.isnull().values.any():  
@@ -182,75 +316,162 @@ if st.button("🔍 Prédire les résultats"):
         # Évaluez les modèles avec une validation simple si les données sont trop petites  
         if len(X) < 3:  # Nombre minimal d'échantillons pour cv=3  
             st.warning("Pas assez d'échantillons pour effectuer une validation croisée. Utilisation d'une validation simple.")  
-            model_scores = evaluate_models_simple(X, y)  
+        # Seul le dictionnaire des résultats est mis en cache ; l'affichage a lieu ensuite, dans cette session  
+        # (en mode parallèle, le tableau se remplit au fil de l'eau pendant le calcul)  
+        live_table = st.empty()  
+        if parallel_evaluation:  
+            compute = lambda: evaluate_models_parallel(X, y, training_profile, progress=live_table)  
         else:  
-            model_scores = evaluate_models_simple(X, y)  
+            compute = lambda: evaluate_models_simple(X, y, training_profile)  
+        try:  
+            with timed("evaluate_models"):  
+                evaluation = get_prediction_cache().get_or_compute(prediction_key, compute)  
+        except Exception as e:  
+            st.error(f"Erreur lors de la division des données : {e}")  
+            evaluation = None  
+        model_scores = show_evaluation(evaluation, parallel_evaluation, live_table) if evaluation is not None else None  
 
-        # Affichez les résultats  
+        st.session_state.model_scores = model_scores  
+        st.session_state.results_key = results_key  
+
+        # Ajouter l'historique des prédictions (matrice de scores à largeur fixe)  
         if model_scores is not None:  
-            st.write("Scores des modèles :", model_scores)  
-
-            # Prédictions avec le modèle de Poisson  
-            poisson_results_home = poisson_prediction(home_goals)  # Exemple pour l'équipe à domicile  
-            poisson_results_away = poisson_prediction(away_goals)  # Exemple pour l'équipe à l'extérieur  
-            st.write("Résultats de Poisson pour l'équipe à domicile :", poisson_results_home)  
-            st.write("Résultats de Poisson pour l'équipe à l'extérieur :", poisson_results_away)  
-
-            # Détection des paris de valeur (exemple)  
-            implied_prob_home = calculate_implied_prob(1.8)  # Remplacez par la cote réelle  
-            implied_prob_away = calculate_implied_prob(2.2)  # Remplacez par la cote réelle  
-            value_bet_home = detect_value_bet(poisson_results_home[1], implied_prob_home)  # Exemple pour 1 but  
-            value_bet_away = detect_value_bet(poisson_results_away[1], implied_prob_away)  # Exemple pour 1 but  
-
-            st.write("Paris de valeur pour l'équipe à domicile :", value_bet_home)  
-            st.write("Paris de valeur pour l'équipe à l'extérieur :", value_bet_away)  
-
-            # Prédiction des résultats du match  
-            match_results = predict_match_result(poisson_results_home, poisson_results_away)  
-            st.subheader("📊 Prédictions des Résultats du Match")  
-            st.write(match_results)  
-
-            # Visualisation des résultats de Poisson  
-            st.subheader("📊 Visualisation des Résultats de Poisson")  
-            poisson_df_home = pd.DataFrame({  
-                'Buts': range(6),  
-                'Probabilité': poisson_results_home  
-            })  
-            poisson_df_away = pd.DataFrame({  
-                'Buts': range(6),  
-                'Probabilité': poisson_results_away  
-            })  
-
-            # Graphique pour l'équipe à domicile  
-            st.write(f"Distribution des buts pour {home_team}")  
-            chart_home = alt.Chart(poisson_df_home).mark_bar().encode(  
-                x='Buts:O',  
-                y='Probabilité:Q',  
-                tooltip=['Buts', 'Probabilité']  
-            ).properties(title=f"Distribution des buts pour {home_team}")  
-            st.altair_chart(chart_home, use_container_width=True)  
-
-            # Graphique pour l'équipe à l'extérieur  
-            st.write(f"Distribution des buts pour {away_team}")  
-            chart_away = alt.Chart(poisson_df_away).mark_bar().encode(  
-                x='Buts:O',  
-                y='Probabilité:Q',  
-                tooltip=['Buts', 'Probabilité']  
-            ).properties(title=f"Distribution des buts pour {away_team}")  
-            st.altair_chart(chart_away, use_container_width=True)  
-
-            # Ajouter l'historique des prédictions  
-            st.session_state.history.append({  
-                'Home Team': home_team,  
-                'Away Team': away_team,  
-                'Predictions': match_results  
-            })  
-
-            # Afficher l'historique des prédictions  
-            st.subheader("📝 Historique des Prédictions")  
-            history_df = pd.DataFrame(st.session_state.history)  
-            st.write(history_df)  
-
-            # Option pour télécharger les résultats  
-            csv = history_df.to_csv(index=False)  
-            st.download_button("📥 Télécharger l'historique des prédictions", csv, "predictions_history.csv", "text/csv")  
+            match_results = graph.get("match_results")  
+            st.session_state.history.append(home_team, away_team, match_results['Probability'].to_numpy().reshape(DEFAULT_MAX_GOALS, DEFAULT_MAX_GOALS))  
+
+# Affichez les résultats de la dernière prédiction ; seuls les blocs dont les entrées ont changé sont recalculés  
+results_stale = st.session_state.get('model_scores') is not None and st.session_state.get('results_key') != results_key  
+if results_stale:  
+    st.info("Les données ont changé depuis la dernière prédiction : cliquez sur « Prédire les résultats » pour mettre à jour les résultats.")  
+if st.session_state.get('model_scores') is not None and not results_stale:  
+    st.write("Scores des modèles :", st.session_state.model_scores)  
+
+    # Prédictions avec le modèle de Poisson  
+    st.write("Résultats de Poisson pour l'équipe à domicile :", graph.get("poisson_home"))  
+    st.write("Résultats de Poisson pour l'équipe à l'extérieur :", graph.get("poisson_away"))  
+
+    try:  
+        value_bets = graph.get("value_bets")  
+        st.write(f"Paris de valeur (avantage > {DEFAULT_EDGE_THRESHOLD:.0%}) :")  
+        st.dataframe(value_bets.drop(columns="match"))  
+    except ValueError as e:  
+        st.error(f"Cotes invalides : {e}")  
+
+    # Prédiction des résultats du match  
+    st.subheader("📊 Prédictions des Résultats du Match")  
+    st.write(graph.get("match_results"))  
+
+    # Visualisation des résultats de Poisson  
+    st.subheader("📊 Visualisation des Résultats de Poisson")  
+    st.write(f"Distribution des buts pour {home_team}")  
+    with timed("render.charts"):  
+        st.altair_chart(graph.get("chart_home"), use_container_width=True)  
+        st.write(f"Distribution des buts pour {away_team}")  
+        st.altair_chart(graph.get("chart_away"), use_container_width=True)  
+
+# Afficher l'historique des prédictions, page par page (fragment : changer de page ne relance que ce bloc)  
+@st.fragment  
+def prediction_history():  
+    history = st.session_state.history  
+    if len(history):  
+        st.subheader("📝 Historique des Prédictions")  
+        n_pages = -(-len(history) // DEFAULT_PAGE_SIZE)  
+        history_page = st.number_input("Page de l'historique", min_value=1, max_value=n_pages, value=1) - 1  
+        st.write(history.page(history_page, DEFAULT_PAGE_SIZE))  
+
+        # Option pour télécharger les résultats (CSV généré uniquement au clic)  
+        st.download_button("📥 Télécharger l'historique des prédictions", timed("history.to_csv")(history.to_csv), "predictions_history.csv", "text/csv")  
+
+prediction_history()  
+
+# Cotes en direct : le fragment relit chaque seconde les seules sélections modifiées depuis son dernier passage  
+@st.fragment(run_every=1)  
+def live_odds(runner):  
+    book = runner.book  
+    changes, st.session_state.feed_version = book.changes_since(st.session_state.get("feed_version", 0))  
+    if runner.error is not None:  
+        st.error(f"Flux de cotes interrompu : {runner.error}")  
+    st.caption(f"{book.updates} mises à jour reçues, {len(book)} sélections suivies, {len(changes)} modifiées depuis le dernier rafraîchissement")  
+    st.write("Paris de valeur (matchs « domicile - extérieur » connus de l'historique) :")  
+    st.dataframe(book.value_bets().head(100), hide_index=True)  
+    if len(changes):  
+        st.write("Dernières modifications :")  
+        st.dataframe(changes.head(100), hide_index=True)  
+
+odds_feed = st.text_input("📡 Flux de cotes en direct : fichier JSON lines / CSV suivi en continu, ou port TCP local", value=os.environ.get("ODDS_FEED", ""))  
+if odds_feed:  
+    st.subheader("📡 Cotes en direct")  
+    if odds_feed.isdigit() or os.path.exists(odds_feed):  
+        live_odds(start_odds_feed(odds_feed))  
+    else:  
+        st.warning("Fichier de cotes introuvable.")  
+
+# Suppression d'un fichier temporaire de résultats (sans erreur s'il a déjà disparu)  
+def remove_file(path):  
+    if os.path.exists(path):  
+        os.remove(path)  
+
+# Mode matchday : prédiction par lot à partir d'un fichier (fragment indépendant du formulaire)  
+@st.fragment  
+def matchday_batch():  
+    st.header("📂 Mode Matchday : prédiction par lot")  
+    st.caption("Colonnes attendues : " + ", ".join(FIXTURE_COLUMNS) + " (home_team et away_team facultatives)")  
+    fixtures_file = st.file_uploader("Fichier des matchs (CSV ou Parquet)", type=["csv", "parquet"])  
+    include_models = st.checkbox("Inclure les probabilités des classifieurs", value=False)  
+
+    if fixtures_file is None or not st.button("⚡ Prédire tous les matchs"):  
+        return  
+
+    file_format = "parquet" if fixtures_file.name.lower().endswith(".parquet") else "csv"  
+    try:  
+        models = None  
+        if include_models:  
+            # Entraînement sur le premier bloc, avec les mêmes étiquettes de démonstration que le mode match unique  
+            first_chunk, _ = validate_fixtures(next(iter_fixture_chunks(io.BytesIO(fixtures_file.getvalue()), DEFAULT_CHUNK_SIZE, file_format)))  
+            models = train_on_fixtures(first_chunk)  
+            if models is None:  
+                st.warning("Pas assez de matchs valides pour entraîner les classifieurs.")  
+
+        status = st.empty()  
+        preview = st.empty()  
+        n_scored = n_errors = 0  
+        first_errors = []  
+        # Les résultats sont écrits bloc par bloc sur disque pour borner la mémoire ; le fichier est servi tel quel  
+        output = tempfile.NamedTemporaryFile(mode="w+b", suffix=".csv", delete=False)  
+        try:  
+            with output:  
+                for scored, errors in score_file(fixtures_file, models=models, file_format=file_format):  
+                    scored.to_csv(output, header=(output.tell() == 0), index=False)  
+                    if n_scored == 0:  
+                        preview.dataframe(scored.head(100))  
+                    n_scored += len(scored)  
+                    n_errors += len(errors)  
+                    if len(errors) and sum(map(len, first_errors)) < 100:  
+                        first_errors.append(errors)  
+                    status.write(f"{n_scored} matchs prédits...")  
+        except BaseException:  
+            remove_file(output.name)  
+            raise  
+
+        status.success(f"{n_scored} matchs prédits.")  
+        if n_errors:  
+            st.warning(f"{n_errors} lignes invalides ignorées.")  
+            st.write(pd.concat(first_errors, ignore_index=True).head(100))  
+
+        # Lu depuis le disque au clic ; le fichier est supprimé quand Streamlit libère le bouton (ou à l'arrêt)  
+        def matchday_csv():  
+            return open(output.name, "rb")  
+        weakref.finalize(matchday_csv, remove_file, output.name)  
+        st.download_button("📥 Télécharger les prédictions du matchday", matchday_csv, "matchday_predictions.csv", "text/csv")  
+    except Exception as e:  
+        st.error(f"Erreur lors de la prédiction par lot : {e}")  
+
+matchday_batch()  
+
+# Panneau de débogage : détail des étapes de cette exécution et compteurs  
+if st.sidebar.checkbox("🐞 Temps par étape", value=False):  
+    st.sidebar.dataframe(pd.DataFrame(metrics_run.table(), columns=["étape", "ms", "appels", "part"]), hide_index=True)  
+    st.sidebar.write(metrics_run.counters_snapshot())  
+    st.sidebar.write("Cache des prédictions :", get_prediction_cache().stats())  
+    st.sidebar.write("Modèles partagés :", get_registry().stats())  
+get_metrics().finish_run()  
@@ -0,0 +1 @@
+"""Benchmarks des chemins critiques de prédiction (python -m benchmarks.run)."""
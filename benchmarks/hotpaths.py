@@ -0,0 +1,78 @@
+"""Micro-benchmarks des fonctions pures à 1, 1k et 100k matchs."""
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.timing import best_time
+from prediction.feed import OddsBook
+from prediction.markets import get_market_set, scan_value_bets
+from prediction.montecarlo import simulate_bankroll
+from prediction.odds import DEVIG_METHODS, detect_value_bet, enlever_marge, kelly_criterion, remove_margin
+from prediction.parlays import price_system
+from prediction.poisson import goal_probabilities, outcome_probabilities, scoreline_tensor
+
+SIZES = (1, 1000, 100000)
+
+
+def _odds_board(tensor, rng, per_match=50):
+    """Cotes (avec marge et bruit) de `per_match` sélections tirées au hasard pour chaque match du tenseur."""
+    markets = get_market_set(tensor.shape[-1])
+    n = len(tensor)
+    picks = rng.integers(0, len(markets), n * per_match)
+    matches = np.repeat(np.arange(n), per_match)
+    probability = markets.probabilities(tensor)[0][matches, picks]
+    names = np.array(markets.keys, dtype=object)
+    return pd.DataFrame({
+        "match": matches,
+        "market": names[picks, 0],
+        "selection": names[picks, 1],
+        "odds": 1 / np.clip(probability * rng.uniform(0.95, 1.12, len(picks)), 1e-3, 0.99)
+    })
+
+
+def _cases(n, rng):
+    home = rng.uniform(0.2, 3.0, n)
+    away = rng.uniform(0.2, 3.0, n)
+    odds = rng.uniform(1.2, 6.0, (n, 3))
+    implied = 1 / odds
+    margins = implied.sum(axis=1) - 1
+    probs = rng.uniform(0.05, 0.9, n)
+    implied_list = implied.tolist()
+    tensor = scoreline_tensor(home, away)
+    board = _odds_board(tensor, rng)
+    cases = {
+        # Équivalent de poisson_prediction pour n matchs
+        "poisson_prediction": lambda: goal_probabilities(home),
+        # Équivalent de predict_match_result pour n matchs
+        "predict_match_result": lambda: scoreline_tensor(home, away),
+        "outcome_probabilities": lambda: outcome_probabilities(tensor),
+        "enlever_marge": lambda: [enlever_marge(p, m) for p, m in zip(implied_list, margins)],
+        "kelly_criterion": lambda: kelly_criterion(odds[:, 0], probs, 1000.0, 0.2),
+        "detect_value_bet": lambda: detect_value_bet(probs, implied[:, 0]),
+        # n chemins d'un bordereau de 20 paris, une fraction de Kelly
+        "simulate_bankroll": lambda: simulate_bankroll(odds[:20, 0] if n >= 20 else [2.0] * 20, [0.55] * 20, kelly_fractions=(0.2,), n_paths=n, seed=0)
+    }
+    # n matchs x 50 sélections de marchés dérivés
+    cases["scan_value_bets"] = lambda: scan_value_bets(tensor, board)
+    # n mises à jour de cotes appliquées au carnet du flux en direct (sélections déjà connues)
+    updates = list(zip(board["match"].astype(str)[:n], board["market"][:n], board["selection"][:n], board["odds"][:n]))
+    book = OddsBook()
+    book.apply(updates)
+    cases["odds_book_apply"] = lambda: book.apply(updates)
+    # n bordereaux de 10 sélections, système 3/10
+    legs = rng.uniform(0.3, 0.8, (n, 10))
+    cases["price_system"] = lambda: price_system(legs, 1 / (legs * 0.95), "3/10")
+    # Tableau de n marchés 1X2 sans marge
+    for method in DEVIG_METHODS:
+        cases[f"remove_margin_{method}"] = lambda method=method: remove_margin(odds, method)
+    return cases
+
+
+def run(sizes=SIZES, seed=0):
+    """Retourne {"hotpaths.<fonction>.<n>": secondes par appel}."""
+    rng = np.random.default_rng(seed)
+    results = {}
+    for n in sizes:
+        for name, fn in _cases(n, rng).items():
+            results[f"hotpaths.{name}.{n}"] = best_time(fn, repeat=3 if n >= 100000 else 5)
+    return results
@@ -0,0 +1,37 @@
+"""Rejoue les deux pages Streamlit avec AppTest : rendu initial, prédiction à froid puis à chaud."""
+
+import os
+import tempfile
+
+from benchmarks.timing import wall_time
+from prediction.registry import ModelRegistry, set_registry
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = {
+    "app": ("app.py", "🔍 Prédire les résultats"),
+    "tools": ("tools.py", "Prédire le Résultat du Match")
+}
+TIMEOUT = 300
+
+
+def _click(at, label):
+    next(b for b in at.button if b.label == label).click()
+    return at.run()
+
+
+def run():
+    """Retourne {"pages.<page>.<étape>": secondes}."""
+    from streamlit.testing.v1 import AppTest
+
+    results = {}
+    with tempfile.TemporaryDirectory() as store_dir:
+        # Registre vide : la première prédiction paie l'entraînement
+        set_registry(ModelRegistry(store_dir=store_dir))
+        for page, (script, label) in PAGES.items():
+            at = AppTest.from_file(os.path.join(ROOT, script), default_timeout=TIMEOUT)
+            results[f"pages.{page}.render"], at = wall_time(at.run)
+            results[f"pages.{page}.predict_cold"], at = wall_time(lambda: _click(at, label))
+            results[f"pages.{page}.predict_warm"], at = wall_time(lambda: _click(at, label))
+            results[f"pages.{page}.rerun"], at = wall_time(at.run)
+        set_registry(None)
+    return results
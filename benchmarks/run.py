@@ -0,0 +1,105 @@
+"""Lance les benchmarks, écrit les résultats en JSON et les compare à la référence.
+
+Usage : python -m benchmarks.run [--suites hotpaths,training,pages] [--update-baseline]
+
+La référence dépend de la machine : elle est écrite dans bench_results/ (non
+versionné), sous un nom propre à l'hôte, et créée au premier --update-baseline.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench_results")
+BASELINE = os.path.join(RESULTS_DIR, f"baseline-{platform.node() or 'local'}.json")
+SUITES = ("hotpaths", "training", "pages")
+DEFAULT_THRESHOLD = 0.5
+# Écart absolu minimal d'une régression : en dessous, la gigue de l'ordonnanceur domine les mesures de quelques µs
+MIN_DELTA = 50e-6
+
+
+def run_suites(suites):
+    results = {}
+    for suite in suites:
+        module = __import__(f"benchmarks.{suite}", fromlist=["run"])
+        start = time.perf_counter()
+        results.update(module.run())
+        print(f"{suite} : {time.perf_counter() - start:.1f} s", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD, min_delta=MIN_DELTA):
+    """Liste des (clé, référence, actuel) plus lents que la référence au-delà du seuil."""
+    regressions = []
+    for key, current in sorted(results.items()):
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        if current > reference * (1 + threshold) and current - reference > min_delta:
+            regressions.append((key, reference, current))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks des chemins critiques de prédiction.")
+    parser.add_argument("--suites", default=",".join(SUITES), help="suites à lancer, séparées par des virgules")
+    parser.add_argument("--output", default="bench_results.json", help="fichier JSON des résultats")
+    parser.add_argument("--baseline", default=BASELINE, help="fichier JSON de référence")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="ralentissement relatif toléré")
+    parser.add_argument("--update-baseline", action="store_true", help="remplace la référence par ces résultats")
+    args = parser.parse_args(argv)
+
+    suites = [s for s in args.suites.split(",") if s]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"suites inconnues : {', '.join(sorted(unknown))}")
+
+    results = run_suites(suites)
+    report = {
+        "meta": {
+            "host": platform.node(), "python": platform.python_version(), "machine": platform.machine(),
+            "cpus": os.cpu_count(), "time": time.time()
+        },
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)["results"]
+        baseline.update(results)
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({"meta": report["meta"], "results": baseline}, f, indent=2, sort_keys=True)
+        print(f"Référence mise à jour : {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"Pas de référence pour cette machine ({args.baseline}) : lancez avec --update-baseline pour en créer une.")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        # Une régression doit se reproduire : les suites concernées sont relancées et chaque mesure garde son meilleur temps
+        flagged = [s for s in suites if any(key.startswith(f"{s}.") for key, _, _ in regressions)]
+        print(f"Régressions à confirmer, nouvelle mesure : {', '.join(flagged)}", file=sys.stderr)
+        for key, current in run_suites(flagged).items():
+            results[key] = min(current, results.get(key, current))
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        regressions = compare(results, baseline, args.threshold)
+    for key, reference, current in regressions:
+        print(f"RÉGRESSION {key} : {reference:.6f} s -> {current:.6f} s (x{current / reference:.2f})")
+    print(f"{len(results)} mesures, {len(regressions)} régressions (seuil +{args.threshold:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
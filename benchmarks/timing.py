@@ -0,0 +1,20 @@
+"""Outils de mesure communs aux benchmarks."""
+
+import time
+import timeit
+
+
+def best_time(fn, repeat=5, min_time=0.2):
+    """Meilleur temps par appel (secondes) de `fn`, sur `repeat` séries."""
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def wall_time(fn):
+    """Durée d'un seul appel de `fn` et son résultat."""
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
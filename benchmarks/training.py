@@ -0,0 +1,51 @@
+"""Temps d'entraînement et de prédiction des classifieurs de chaque profil."""
+
+import numpy as np
+
+from benchmarks.timing import wall_time
+from prediction.models import DEFAULT_PROFILE, PROFILES, build_models
+from prediction.strength import fit_team_strength
+
+TRAIN_SIZES = (200, 1000, 5000)
+STRENGTH_SIZES = (1000, 10000)
+N_TEAMS = 20
+N_FEATURES = 14
+N_PREDICT = 1000
+
+
+def run(sizes=TRAIN_SIZES, seed=0):
+    """Retourne {"training[.<profil>].<modèle>.<fit|predict>.<n>": secondes}, sans passer par le registre."""
+    results = run_team_strength(seed=seed)
+    rng = np.random.default_rng(seed)
+    X_predict = rng.random((N_PREDICT, N_FEATURES))
+    for n in sizes:
+        X = rng.random((n, N_FEATURES))
+        y = rng.integers(0, 2, n)
+        for profile in PROFILES:
+            # Les clés du profil par défaut restent celles d'avant l'introduction des profils
+            prefix = "training" if profile == DEFAULT_PROFILE else f"training.{profile}"
+            for name, model in build_models(profile=profile).items():
+                key = name.lower().replace(" ", "_")
+                fit_time, model = wall_time(lambda: model.fit(X, y))
+                predict_time, _ = wall_time(lambda: model.predict_proba(X_predict))
+                results[f"{prefix}.{key}.fit.{n}"] = fit_time
+                results[f"{prefix}.{key}.predict.{n}"] = predict_time
+    return results
+
+
+def run_team_strength(sizes=STRENGTH_SIZES, seed=0):
+    """Ajustement Dixon-Coles (à froid puis repris du précédent) sur une ligue de 20 équipes."""
+    # L'import de scipy ne doit pas être compté dans la première mesure
+    import scipy.optimize  # noqa: F401
+    rng = np.random.default_rng(seed)
+    results = {}
+    for n in sizes:
+        home = rng.integers(0, N_TEAMS, n)
+        away = (home + rng.integers(1, N_TEAMS, n)) % N_TEAMS
+        home_goals, away_goals = rng.poisson(1.5, n), rng.poisson(1.1, n)
+        dates = np.arange(n) // 10
+        fit_time, strength = wall_time(lambda: fit_team_strength(home, away, home_goals, away_goals, dates=dates, xi=0.0019))
+        warm_time, _ = wall_time(lambda: fit_team_strength(home, away, home_goals, away_goals, dates=dates, xi=0.0019, init=strength))
+        results[f"training.team_strength.fit.{n}"] = fit_time
+        results[f"training.team_strength.refit_warm.{n}"] = warm_time
+    return results
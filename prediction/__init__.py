@@ -0,0 +1 @@
+"""Moteur de prédiction partagé par app.py et tools.py."""
@@ -0,0 +1,332 @@
+"""Backtest walk-forward : modèles réentraînés au fil des journées, paris de valeur et mises de Kelly.
+
+Usage : python -m prediction.backtest --store match_store --backend dixon_coles --group-by season
+"""
+
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from prediction.odds import calculate_implied_prob, detect_value_bet, kelly_criterion
+from prediction.poisson import DEFAULT_MAX_GOALS, outcome_probabilities, scoreline_tensor
+from prediction.rolling import featurize_matches
+from prediction.strength import DEFAULT_XI, fit_team_strength
+
+BACKENDS = ("dixon_coles", "sgd", "logistic")
+OUTCOMES = ("domicile", "nul", "extérieur")
+# Colonnes de cotes 1X2 reconnues, par ordre de préférence (football-data.co.uk puis format libre)
+ODDS_COLUMNS = (("PSH", "PSD", "PSA"), ("B365H", "B365D", "B365A"), ("odds_home", "odds_draw", "odds_away"))
+DEFAULT_STEP_DAYS = 7
+DEFAULT_MIN_TRAIN = 200
+DEFAULT_THRESHOLD = 0.05
+DEFAULT_KELLY_FRACTION = 0.25
+CALIBRATION_BINS = 10
+
+
+def match_outcomes(home_goals, away_goals):
+    """0 victoire domicile, 1 nul, 2 victoire extérieur (même codage que le magasin historique)."""
+    home_goals, away_goals = np.asarray(home_goals), np.asarray(away_goals)
+    return np.where(home_goals > away_goals, 0, np.where(home_goals == away_goals, 1, 2))
+
+
+def season_of(dates, first_month=7):
+    """Saison sportive de chaque date (ex. "2023-2024" pour un match d'octobre 2023)."""
+    dates = pd.to_datetime(pd.Series(dates))
+    start = dates.dt.year - (dates.dt.month < first_month)
+    return (start.astype(str) + "-" + (start + 1).astype(str)).to_numpy()
+
+
+class DixonColesBackend:
+    """Forces d'équipes réajustées à chaque pas en repartant des paramètres précédents."""
+
+    def __init__(self, xi=DEFAULT_XI, max_goals=DEFAULT_MAX_GOALS):
+        self.xi = xi
+        self.max_goals = max_goals
+        self.strength = None
+
+    def update(self, matches, window, new):
+        self.strength = fit_team_strength(
+            matches["home_team"].to_numpy()[window], matches["away_team"].to_numpy()[window],
+            matches["home_goals"].to_numpy()[window], matches["away_goals"].to_numpy()[window],
+            dates=matches["date"].to_numpy()[window], xi=self.xi, init=self.strength
+        )
+
+    def predict(self, matches, rows):
+        # Une équipe absente de la fenêtre (promue) est supposée moyenne
+        s = self.strength
+        attack = np.append(s.attack, 0.0)
+        defence = np.append(s.defence, 0.0)
+        h = np.array([s._codes.get(t, -1) for t in matches["home_team"].to_numpy()[rows]])
+        a = np.array([s._codes.get(t, -1) for t in matches["away_team"].to_numpy()[rows]])
+        lam = np.exp(s.intercept + s.home_advantage + attack[h] - defence[a])
+        mu = np.exp(s.intercept + attack[a] - defence[h])
+        return outcome_probabilities(scoreline_tensor(lam, mu, self.max_goals, fold_tail=True, rho=s.rho))
+
+
+class SklearnBackend:
+    """Classifieur 1X2 sur les caractéristiques glissantes des deux équipes.
+
+    Avec `partial_fit`, seuls les nouveaux matchs sont appris à chaque pas ;
+    avec `warm_start`, le modèle est réentraîné sur la fenêtre en partant de
+    ses coefficients précédents ; sinon il est réentraîné depuis zéro.
+    """
+
+    def __init__(self, estimator, features):
+        self.estimator = estimator
+        self.features = features
+        self._mean = None
+        self._scale = None
+        self._fitted = False
+        if "warm_start" in estimator.get_params():
+            estimator.set_params(warm_start=True)
+
+    def _X(self, rows):
+        return (self.features[rows] - self._mean) / self._scale
+
+    def update(self, matches, window, new):
+        if self._mean is None:
+            # Normalisation figée sur la première fenêtre, pour que les mises à jour restent cohérentes
+            self._mean = self.features[window].mean(axis=0)
+            self._scale = self.features[window].std(axis=0) + 1e-9
+        y = match_outcomes(matches["home_goals"].to_numpy(), matches["away_goals"].to_numpy())
+        if hasattr(self.estimator, "partial_fit"):
+            rows = new if self._fitted else window
+            self.estimator.partial_fit(self._X(rows), y[rows], classes=np.arange(3))
+        else:
+            self.estimator.fit(self._X(window), y[window])
+        self._fitted = True
+
+    def predict(self, matches, rows):
+        proba = np.zeros((len(rows), 3))
+        proba[:, self.estimator.classes_] = self.estimator.predict_proba(self._X(rows))
+        return proba
+
+
+def make_backend(name, matches, seed=0, **options):
+    """Crée le modèle du backtest ; les modèles scikit-learn utilisent les caractéristiques glissantes."""
+    if name == "dixon_coles":
+        return DixonColesBackend(**options)
+    if name not in BACKENDS:
+        raise ValueError(f"backend doit valoir {', '.join(BACKENDS)}")
+    features = featurize_matches(matches)[0]
+    # Le nombre de matchs joués croît sans borne : hors de l'échelle de la première fenêtre
+    features = features.loc[:, ~features.columns.str.endswith("matchs_joues")].to_numpy()
+    if name == "sgd":
+        from sklearn.linear_model import SGDClassifier
+        return SklearnBackend(SGDClassifier(loss="log_loss", alpha=1e-3, learning_rate="constant", eta0=0.01, random_state=seed), features)
+    from sklearn.linear_model import LogisticRegression
+    return SklearnBackend(LogisticRegression(max_iter=1000), features)
+
+
+def find_odds(matches):
+    """Cotes 1X2 (N, 3) du fichier, ou None s'il n'en contient pas."""
+    for columns in ODDS_COLUMNS:
+        if all(c in matches.columns for c in columns):
+            return matches[list(columns)].to_numpy(dtype=np.float64)
+    return None
+
+
+def walk_forward(matches, backend="dixon_coles", window_days=None, step_days=DEFAULT_STEP_DAYS,
+                 min_train=DEFAULT_MIN_TRAIN, threshold=DEFAULT_THRESHOLD, kelly_fraction=DEFAULT_KELLY_FRACTION, seed=0):
+    """Rejoue les matchs dans l'ordre chronologique, par pas de `step_days` jours.
+
+    À chaque pas, le modèle est mis à jour sur les matchs déjà joués
+    (fenêtre croissante, ou limitée aux `window_days` derniers jours) puis
+    prédit les matchs du pas suivant. Si le fichier contient des cotes, un
+    pari est placé sur chaque issue retenue par detect_value_bet, misé selon
+    kelly_criterion sur une bankroll initiale de 1. Retourne un DataFrame,
+    une ligne par match prédit.
+    """
+    matches = matches.sort_values("date", kind="stable").reset_index(drop=True)
+    matches["date"] = pd.to_datetime(matches["date"])
+    model = make_backend(backend, matches, seed) if isinstance(backend, str) else backend
+    days = matches["date"].to_numpy(dtype="datetime64[D]").astype(np.int64)
+    if len(matches) <= min_train:
+        raise ValueError(f"Pas assez de matchs : {len(matches)} (min_train={min_train})")
+
+    probabilities = np.full((len(matches), 3), np.nan)
+    start = days[min_train]
+    trained_until = 0
+    for step_start in range(start, days[-1] + 1, step_days):
+        lo, hi = np.searchsorted(days, [step_start, step_start + step_days])
+        if lo == hi:
+            continue
+        window_lo = 0 if window_days is None else np.searchsorted(days, step_start - window_days)
+        window = np.arange(window_lo, lo)
+        new = np.arange(trained_until, lo)
+        if len(new):
+            model.update(matches, window, new)
+            trained_until = lo
+        probabilities[lo:hi] = model.predict(matches, np.arange(lo, hi))
+
+    predicted = ~np.isnan(probabilities[:, 0])
+    result = matches.loc[predicted, ["date", "home_team", "away_team", "home_goals", "away_goals"]].copy()
+    probabilities = probabilities[predicted]
+    for k, outcome in enumerate(OUTCOMES):
+        result[f"P({outcome})"] = probabilities[:, k]
+    result["issue"] = match_outcomes(result["home_goals"], result["away_goals"])
+
+    odds = find_odds(matches)
+    if odds is not None:
+        odds = odds[predicted]
+        valid = np.isfinite(odds) & (odds > 1)
+        safe_odds = np.where(valid, odds, 2.0)
+        value = valid & detect_value_bet(probabilities, calculate_implied_prob(safe_odds), threshold)
+        stakes = np.where(value, np.clip(kelly_criterion(safe_odds, probabilities, 1.0, kelly_fraction), 0.0, None), 0.0)
+        won = np.arange(3) == result["issue"].to_numpy()[:, None]
+        returns = np.where(won, stakes * (safe_odds - 1), -stakes).sum(axis=1)
+        # Les mises d'un pas sont des fractions de la bankroll au début du pas (intérêts composés, ruine à 0)
+        _, step = np.unique((days[predicted] - start) // step_days, return_inverse=True)
+        growth = np.maximum(1 + np.bincount(step, weights=returns), 0.0)
+        bankroll = np.concatenate([[1.0], np.cumprod(growth)[:-1]])[step]
+        result["mise"] = stakes.sum(axis=1) * bankroll
+        result["gain"] = returns * bankroll
+        result["bankroll"] = bankroll + np.bincount(step, weights=result["gain"])[step]
+    return result.reset_index(drop=True)
+
+
+def calibration_curve(probabilities, outcomes, bins=CALIBRATION_BINS):
+    """Probabilité moyenne prédite et fréquence observée par classe de probabilité (les trois issues ensemble)."""
+    p = np.asarray(probabilities).ravel()
+    observed = (np.arange(3) == np.asarray(outcomes)[:, None]).ravel()
+    bin_index = np.minimum((p * bins).astype(np.int64), bins - 1)
+    count = np.bincount(bin_index, minlength=bins)
+    with np.errstate(invalid="ignore"):
+        return pd.DataFrame({
+            "prédite": np.bincount(bin_index, weights=p, minlength=bins) / count,
+            "observée": np.bincount(bin_index, weights=observed, minlength=bins) / count,
+            "matchs": count
+        }, index=pd.Index((np.arange(bins) + 0.5) / bins, name="classe"))
+
+
+def pool_calibration(calibration):
+    """Courbe de calibration de tous les groupes réunis, à partir des courbes par groupe de run_backtests."""
+    matchs = calibration["matchs"].groupby(level="classe").sum()
+    with np.errstate(invalid="ignore"):
+        return pd.DataFrame({
+            column: (calibration[column].fillna(0) * calibration["matchs"]).groupby(level="classe").sum() / matchs
+            for column in ("prédite", "observée")
+        }).assign(matchs=matchs)
+
+
+def summarize(result, bins=CALIBRATION_BINS):
+    """ROI, yield, log-loss, score de Brier et précision d'un résultat de walk_forward.
+
+    La courbe de calibration (calibration_curve, `bins` classes) est sous la
+    clé `calibration`.
+    """
+    probabilities = result[[f"P({o})" for o in OUTCOMES]].to_numpy()
+    outcomes = result["issue"].to_numpy()
+    observed = np.arange(3) == outcomes[:, None]
+    p_observed = np.clip(probabilities[np.arange(len(outcomes)), outcomes], 1e-15, 1.0)
+    summary = {
+        "matchs": len(result),
+        "log_loss": float(-np.log(p_observed).mean()),
+        "brier": float(((probabilities - observed) ** 2).sum(axis=1).mean()),
+        "précision": float((probabilities.argmax(axis=1) == outcomes).mean())
+    }
+    if "mise" in result:
+        staked, profit = float(result["mise"].sum()), float(result["gain"].sum())
+        summary.update({
+            "paris": int((result["mise"] > 0).sum()),
+            "misé": staked,
+            "gain": profit,
+            # ROI rapporté à la bankroll initiale, yield rapporté aux mises
+            "roi": profit,
+            "bankroll_min": float(result["bankroll"].min()),
+            "yield": profit / staked if staked else None
+        })
+    summary["calibration"] = calibration_curve(probabilities, outcomes, bins)
+    return summary
+
+
+def _group_seed(key, seed):
+    """Graine stable par groupe : indépendante de l'ordre d'exécution et de PYTHONHASHSEED."""
+    return (zlib.crc32(str(key).encode()) + seed) % 2**32
+
+
+def _run_group(args):
+    """(clé, résultat de walk_forward) ; résultat None pour un groupe trop court (saison partielle...)."""
+    key, matches, options = args
+    if len(matches) <= options.get("min_train", DEFAULT_MIN_TRAIN):
+        return key, None
+    options = dict(options, seed=_group_seed(key, options.get("seed", 0)))
+    return key, walk_forward(matches, **options)
+
+
+def run_backtests(matches, group_by=None, workers=None, **options):
+    """Backtests indépendants par saison, ligue... (colonne `group_by`), répartis sur des processus.
+
+    `group_by="season"` découpe par saison sportive. Les résultats sont
+    identiques quel que soit le nombre de processus. Un groupe qui n'a pas
+    plus de `min_train` matchs n'est pas rejoué : il figure dans le résumé
+    avec son nombre de matchs et la raison dans la colonne `ignoré`, sans
+    interrompre les autres groupes. Retourne ({groupe: résultat}, résumé par
+    groupe, courbes de calibration indexées par groupe et classe).
+    """
+    if group_by is None:
+        groups = {"tout": matches}
+    else:
+        keys = season_of(matches["date"]) if group_by == "season" and "season" not in matches.columns else matches[group_by]
+        groups = {key: group for key, group in matches.groupby(np.asarray(keys), sort=True)}
+    tasks = [(key, group, options) for key, group in groups.items()]
+    if workers == 1 or len(tasks) == 1:
+        results = dict(map(_run_group, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = dict(executor.map(_run_group, tasks))
+    min_train = options.get("min_train", DEFAULT_MIN_TRAIN)
+    summaries = {
+        key: summarize(result) if result is not None else {"matchs": len(groups[key]), "ignoré": f"pas plus de min_train={min_train} matchs"}
+        for key, result in results.items()
+    }
+    curves = {key: s.pop("calibration") for key, s in summaries.items() if "calibration" in s}
+    calibration = pd.concat(curves, names=["groupe"]) if curves else pd.DataFrame(columns=["prédite", "observée", "matchs"])
+    summary = pd.DataFrame.from_dict(summaries, orient="index")
+    return {key: result for key, result in results.items() if result is not None}, summary, calibration
+
+
+def main(argv=None):
+    """Backtest en ligne de commande sur le magasin historique ou un fichier CSV."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backtest walk-forward des modèles et des mises de Kelly.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--store", help="répertoire du magasin historique")
+    source.add_argument("--csv", help="fichier CSV de matchs (date, home_team, away_team, home_goals, away_goals, cotes)")
+    parser.add_argument("--backend", choices=BACKENDS, default="dixon_coles")
+    parser.add_argument("--group-by", help="colonne de regroupement, ou season")
+    parser.add_argument("--window-days", type=int, help="fenêtre glissante en jours (croissante par défaut)")
+    parser.add_argument("--step-days", type=int, default=DEFAULT_STEP_DAYS)
+    parser.add_argument("--min-train", type=int, default=DEFAULT_MIN_TRAIN)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--kelly-fraction", type=float, default=DEFAULT_KELLY_FRACTION)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("-o", "--output", help="CSV des prédictions et des paris")
+    parser.add_argument("--calibration", help="CSV des courbes de calibration (probabilité prédite et fréquence observée par classe)")
+    args = parser.parse_args(argv)
+
+    if args.store:
+        from prediction.store import MatchStore
+        matches = MatchStore(args.store).to_frame()
+    else:
+        from prediction.store import _read_matches
+        matches = _read_matches(args.csv)
+    results, summary, calibration = run_backtests(
+        matches, group_by=args.group_by, workers=args.workers, backend=args.backend, window_days=args.window_days,
+        step_days=args.step_days, min_train=args.min_train, threshold=args.threshold, kelly_fraction=args.kelly_fraction
+    )
+    print(summary.to_string())
+    if len(calibration):
+        print(f"\nCalibration ({args.backend}, tous groupes) :")
+        print(pool_calibration(calibration).to_string(float_format="{:.3f}".format))
+    if args.calibration:
+        calibration.assign(backend=args.backend).to_csv(args.calibration)
+    if args.output and results:
+        pd.concat(results, names=["groupe"]).to_csv(args.output)
+
+
+if __name__ == "__main__":
+    main()
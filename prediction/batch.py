@@ -0,0 +1,145 @@
+"""Mode matchday : validation et prédiction par lot d'un fichier de matchs."""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from prediction.metrics import increment, timed
+from prediction.models import train_models
+from prediction.poisson import DEFAULT_MAX_GOALS, outcome_probabilities, scoreline_tensor
+from prediction.registry import get_registry
+from prediction.schema import TEAM_STATS
+
+# Disposition des colonnes fixée par le schéma partagé : domicile puis extérieur
+FIXTURE_COLUMNS = TEAM_STATS.match_columns()
+NAME_COLUMNS = ['home_team', 'away_team']
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def _is_parquet(source, file_format):
+    if file_format is not None:
+        return file_format == "parquet"
+    name = source if isinstance(source, (str, os.PathLike)) else getattr(source, "name", "")
+    return str(name).lower().endswith((".parquet", ".pq"))
+
+
+def iter_fixture_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE, file_format=None):
+    """Lit un fichier CSV ou Parquet par blocs de `chunk_size` matchs."""
+    offset = 0
+    if _is_parquet(source, file_format):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ValueError("La lecture des fichiers Parquet nécessite pyarrow") from e
+        parquet_file = pq.ParquetFile(source)
+        wanted = [c for c in NAME_COLUMNS + FIXTURE_COLUMNS if c in parquet_file.schema_arrow.names]
+        chunks = (batch.to_pandas() for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=wanted))
+    else:
+        chunks = pd.read_csv(source, chunksize=chunk_size)
+    for chunk in chunks:
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        yield chunk
+
+
+def validate_fixtures(chunk):
+    """Sépare les lignes valides des lignes invalides, sans boucle sur les lignes.
+
+    Retourne (valides, erreurs) ; `erreurs` donne, pour chaque ligne rejetée,
+    son numéro dans le fichier et la première colonne fautive.
+    """
+    missing = [c for c in FIXTURE_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"Colonnes manquantes : {', '.join(missing)}")
+    values = chunk[FIXTURE_COLUMNS].apply(pd.to_numeric, errors='coerce')
+    bad = pd.DataFrame(TEAM_STATS.out_of_bounds(values.to_numpy(dtype=np.float64)), index=values.index, columns=FIXTURE_COLUMNS)
+    rows_bad = bad.any(axis=1)
+    valid = chunk.loc[~rows_bad, [c for c in NAME_COLUMNS if c in chunk.columns]].join(values.loc[~rows_bad])
+    errors = pd.DataFrame({
+        'ligne': bad.index[rows_bad] + 1,
+        'colonne': bad.loc[rows_bad].idxmax(axis=1).to_numpy()
+    })
+    return valid, errors
+
+
+def score_fixtures(fixtures, models=None, max_goals=DEFAULT_MAX_GOALS):
+    """Prédit tous les matchs d'un bloc validé en une seule passe.
+
+    Les probabilités 1X2 et le score le plus probable viennent du moteur de
+    Poisson ; si `models` est fourni, chaque classifieur est appelé une seule
+    fois sur toutes les lignes domicile et extérieur empilées.
+    """
+    increment("rows_scored", len(fixtures))
+    home = TEAM_STATS.from_frame(fixtures, "home_")
+    away = TEAM_STATS.from_frame(fixtures, "away_")
+    goals = TEAM_STATS.names.index('goals')
+    tensor = scoreline_tensor(home[:, goals], away[:, goals], max_goals)
+    outcomes = outcome_probabilities(tensor)
+    flat = tensor.reshape(len(fixtures), -1)
+    best = flat.argmax(axis=1)
+    home_score, away_score = np.divmod(best, max_goals)
+
+    result = fixtures[[c for c in NAME_COLUMNS if c in fixtures.columns]].copy()
+    result['P(domicile)'] = outcomes[:, 0]
+    result['P(nul)'] = outcomes[:, 1]
+    result['P(extérieur)'] = outcomes[:, 2]
+    result['score_probable'] = pd.Series(home_score, index=fixtures.index).astype(str) + "-" + pd.Series(away_score, index=fixtures.index).astype(str)
+    result['P(score_probable)'] = flat[np.arange(len(fixtures)), best]
+
+    if models:
+        stacked = np.vstack([home, away])
+        for name, model in models.items():
+            with timed(f"predict_proba.{name}"), get_registry().inference():
+                proba = model.predict_proba(stacked)[:, 1]
+            result[f"{name} P(domicile)"] = proba[:len(fixtures)]
+            result[f"{name} P(extérieur)"] = proba[len(fixtures):]
+    return result
+
+
+def train_on_fixtures(fixtures, registry=None):
+    """Entraîne les classifieurs sur les lignes domicile et extérieur d'un bloc validé.
+
+    Les étiquettes sont les mêmes étiquettes de démonstration que le mode match
+    unique ; retourne None s'il n'y a pas deux classes.
+    """
+    X = np.vstack([TEAM_STATS.from_frame(fixtures, "home_"), TEAM_STATS.from_frame(fixtures, "away_")])
+    y = np.random.default_rng(0).integers(0, 2, len(X))
+    if len(np.unique(y)) < 2:
+        return None
+    return train_models(X, y, registry)
+
+
+def score_file(source, models=None, chunk_size=DEFAULT_CHUNK_SIZE, max_goals=DEFAULT_MAX_GOALS, file_format=None):
+    """Génère (résultats, erreurs) bloc par bloc ; la mémoire reste bornée par `chunk_size`."""
+    for chunk in iter_fixture_chunks(source, chunk_size, file_format):
+        with timed("batch.validate"):
+            valid, errors = validate_fixtures(chunk)
+        with timed("batch.score"):
+            scored = score_fixtures(valid, models, max_goals)
+        yield scored, errors
+
+
+def main(argv=None):
+    """Prédiction par lot en ligne de commande, sans Streamlit."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Prédit tous les matchs d'un fichier CSV ou Parquet.")
+    parser.add_argument("fixtures", help="fichier des matchs (CSV ou Parquet)")
+    parser.add_argument("-o", "--output", default="matchday_predictions.csv", help="fichier CSV de sortie")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--max-goals", type=int, default=DEFAULT_MAX_GOALS)
+    args = parser.parse_args(argv)
+
+    n_scored = n_errors = 0
+    with open(args.output, "w", newline="") as output:
+        for scored, errors in score_file(args.fixtures, chunk_size=args.chunk_size, max_goals=args.max_goals):
+            scored.to_csv(output, header=(output.tell() == 0), index=False)
+            n_scored += len(scored)
+            n_errors += len(errors)
+    print(f"{n_scored} matchs prédits, {n_errors} lignes invalides ignorées -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Cache des prédictions partagé par toutes les sessions : TTL, éviction LRU bornée en octets, SQLite facultatif."""
+
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+
+from prediction.metrics import increment
+
+DEFAULT_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", "3600"))
+DEFAULT_MAX_BYTES = int(os.environ.get("PREDICTION_CACHE_BYTES", str(64 * 2**20)))
+# Fichier SQLite partagé entre processus et redémarrages (désactivé si vide)
+DEFAULT_DB_PATH = os.environ.get("PREDICTION_CACHE_DB", "")
+
+
+def _canonical(value):
+    """Valeur JSON stable : clés triées, nombres en flottants (2 et 2.0 donnent la même clé), tableaux en listes."""
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return _canonical(value.tolist())
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value)
+    return value
+
+
+def cache_key(*parts, version=""):
+    """Empreinte canonique des entrées d'une prédiction (dictionnaires de caractéristiques...) et de la version du modèle."""
+    payload = json.dumps([version, _canonical(list(parts))], sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class PredictionCache:
+    """Résultats de prédiction indexés par cache_key, partagés entre les sessions du processus.
+
+    Les entrées expirent après `ttl` secondes ; au-delà de `max_bytes`
+    (taille sérialisée) les moins récemment utilisées sont évincées. Avec
+    `db_path`, les entrées sont aussi écrites dans une base SQLite, relue en
+    cas d'absence en mémoire. Des demandes simultanées de la même clé ne
+    lancent qu'un seul calcul : les autres attendent son résultat.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL, db_path=DEFAULT_DB_PATH):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.db_path = db_path
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.coalesced = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, expires REAL, accessed REAL, value BLOB)")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remember(self, key, blob, value, expires):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (expires, len(blob), value)
+            self._bytes += len(blob)
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, size, _) = self._entries.popitem(last=False)
+                self._bytes -= size
+                self.evictions += 1
+
+    def _from_memory(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                self._bytes -= entry[1]
+                self.expired += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _from_disk(self, key, now):
+        if self._db is None:
+            return None
+        with self._db_lock:
+            row = self._db.execute("SELECT expires, value FROM predictions WHERE key = ? AND expires > ?", (key, now)).fetchone()
+            if row is not None:
+                self._db.execute("UPDATE predictions SET accessed = ? WHERE key = ?", (now, key))
+        if row is None:
+            return None
+        expires, blob = row
+        value = pickle.loads(blob)
+        self._remember(key, blob, value, expires)
+        return value
+
+    def _to_disk(self, key, blob, expires, now):
+        if self._db is None:
+            return
+        with self._db_lock:
+            self._db.execute("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)", (key, expires, now, blob))
+            self._db.execute("DELETE FROM predictions WHERE expires <= ?", (now,))
+            # Même plafond qu'en mémoire : les lignes les moins récemment lues partent en premier
+            self._db.execute("""
+                DELETE FROM predictions WHERE key IN (
+                    SELECT key FROM (SELECT key, SUM(LENGTH(value)) OVER (ORDER BY accessed DESC) AS total FROM predictions)
+                    WHERE total > ?
+                )""", (self.max_bytes,))
+
+    def get(self, key):
+        """Valeur en cache (mémoire puis disque) ou None."""
+        now = time.time()
+        entry = self._from_memory(key, now)
+        if entry is not None:
+            self.hits += 1
+            increment("prediction_cache_hits")
+            return entry[2]
+        value = self._from_disk(key, now)
+        if value is not None:
+            self.disk_hits += 1
+            increment("prediction_cache_hits")
+        return value
+
+    def put(self, key, value):
+        now = time.time()
+        expires = now + self.ttl
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._remember(key, blob, value, expires)
+        self._to_disk(key, blob, expires, now)
+
+    def get_or_compute(self, key, compute):
+        """Valeur en cache, sinon `compute()` (un seul appel pour des demandes simultanées de `key`).
+
+        Un résultat None ou une exception ne sont pas mis en cache.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            self.coalesced += 1
+            increment("prediction_cache_coalesced")
+            return future.result()
+
+        self.misses += 1
+        increment("prediction_cache_misses")
+        try:
+            value = compute()
+            if value is not None:
+                self.put(key, value)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+        return value
+
+    def stats(self):
+        """Compteurs et taux de succès, pour dimensionner le cache."""
+        lookups = self.hits + self.disk_hits + self.coalesced + self.misses
+        with self._lock:
+            entries, size = len(self._entries), self._bytes
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "hit_ratio": (lookups - self.misses) / lookups if lookups else None
+        }
+
+    def clear(self):
+        """Vide le cache mémoire (la base SQLite est conservée)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prediction_cache():
+    """Cache de prédictions partagé par toutes les sessions du processus."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PredictionCache()
+        return _cache
+
+
+def set_prediction_cache(cache):
+    """Remplace le cache partagé (taille, TTL ou base SQLite dédiés)."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
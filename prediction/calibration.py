@@ -0,0 +1,69 @@
+"""Calibration de Platt sur un échantillon réservé, à la place de la validation croisée interne de SVC."""
+
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+
+
+class PlattCalibratedClassifier(ClassifierMixin, BaseEstimator):
+    """Classifieur dont les scores sont convertis en probabilités par une sigmoïde.
+
+    `estimator` est entraîné une seule fois sur (1 - calibration_size) des
+    données ; la sigmoïde est ajustée sur le reste. `SVC(probability=True)`
+    entraîne au contraire cinq modèles supplémentaires pour sa calibration.
+    Avec plus de deux classes, une sigmoïde est ajustée par classe sur son
+    score (un contre tous) et les probabilités sont renormalisées.
+    """
+
+    def __init__(self, estimator, calibration_size=0.2, random_state=0):
+        self.estimator = estimator
+        self.calibration_size = calibration_size
+        self.random_state = random_state
+
+    def _scores(self, X):
+        """Scores (N, 1) en binaire, (N, K) un contre tous avec K classes."""
+        if hasattr(self.estimator_, "decision_function"):
+            scores = np.asarray(self.estimator_.decision_function(X))
+        else:
+            scores = self.estimator_.predict_proba(X)
+            if scores.shape[1] == 2:
+                scores = scores[:, 1]
+        return scores.reshape(len(scores), -1)
+
+    def fit(self, X, y):
+        y = np.asarray(y)
+        try:
+            X_fit, X_cal, y_fit, y_cal = train_test_split(
+                X, y, test_size=self.calibration_size, random_state=self.random_state, stratify=y
+            )
+        except ValueError:
+            X_fit, X_cal, y_fit, y_cal = train_test_split(X, y, test_size=self.calibration_size, random_state=self.random_state)
+        self.estimator_ = clone(self.estimator).fit(X_fit, y_fit)
+        self.classes_ = self.estimator_.classes_
+        scores = self._scores(X_cal)
+        if scores.shape[1] != (1 if len(self.classes_) == 2 else len(self.classes_)):
+            raise ValueError(f"{type(self.estimator_).__name__} ne fournit pas un score par classe")
+        # Binaire : une sigmoïde sur le score de la classe positive ; sinon une par classe
+        positives = [self.classes_[1]] if scores.shape[1] == 1 else self.classes_
+        self.calibrators_ = [
+            LogisticRegression(C=1e6).fit(scores[:, [k]], y_cal == positive) for k, positive in enumerate(positives)
+        ]
+        return self
+
+    def __setstate__(self, state):
+        # Modèles binaires enregistrés dans le registre avant la calibration par classe
+        if "calibrator_" in state:
+            state["calibrators_"] = [state.pop("calibrator_")]
+        super().__setstate__(state)
+
+    def predict_proba(self, X):
+        scores = self._scores(X)
+        proba = np.column_stack([c.predict_proba(scores[:, [k]])[:, 1] for k, c in enumerate(self.calibrators_)])
+        if proba.shape[1] == 1:
+            return np.hstack([1 - proba, proba])
+        total = proba.sum(axis=1, keepdims=True)
+        return np.divide(proba, total, out=np.full_like(proba, 1 / proba.shape[1]), where=total > 0)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
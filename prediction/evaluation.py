@@ -0,0 +1,154 @@
+"""Évaluation concurrente des modèles avec mesure des temps d'entraînement et de prédiction."""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from prediction.metrics import get_metrics
+from prediction.models import PROFILES, build_models
+from prediction.registry import get_registry
+
+DEFAULT_TIMEOUT = 120.0
+
+
+def allocate_cores(models, total_cores=None):
+    """Répartit les cœurs entre les modèles pour éviter la sursouscription.
+
+    Les modèles configurés avec `n_jobs` se partagent les cœurs laissés libres
+    par les modèles mono-cœur ; retourne {nom: n_jobs ou None}.
+    """
+    total = max(1, total_cores or os.cpu_count() or 1)
+    parallel = [name for name, model in models.items() if model.get_params().get('n_jobs') is not None]
+    spare = max(total - (len(models) - len(parallel)), 0)
+    share = max(1, spare // len(parallel)) if parallel else 1
+    return {name: (share if name in parallel else None) for name in models}
+
+
+def split_dataset(X, y, test_size=0.2, random_state=42):
+    """Découpe (X, y) en ensembles d'entraînement et de test."""
+    from sklearn.model_selection import train_test_split
+    return train_test_split(X, y, test_size=test_size, random_state=random_state)
+
+
+def fit_and_score(name, model, registry, X_train, y_train, X_test, y_test):
+    """Entraîne un modèle via le registre et mesure son accuracy, sa log-loss et ses temps."""
+    from sklearn.metrics import accuracy_score
+    start = time.perf_counter()
+    model = registry.fit(name, model, X_train, y_train)
+    fit_time = time.perf_counter() - start
+    # Le modèle est partagé entre les sessions : le nombre de prédictions simultanées est borné par le registre
+    with registry.inference():
+        start = time.perf_counter()
+        y_pred = model.predict(X_test)
+        predict_time = time.perf_counter() - start
+        proba = model.predict_proba(X_test) if hasattr(model, "predict_proba") else None
+    metrics = get_metrics()
+    metrics.record(f"fit.{name}", fit_time)
+    metrics.record(f"predict.{name}", predict_time)
+    return {"accuracy": accuracy_score(y_test, y_pred), "log_loss": _log_loss(model, proba, y_train, y_test), "fit_time": fit_time, "predict_time": predict_time}
+
+
+def _log_loss(model, proba, y_train, y_test):
+    """Log-loss sur toutes les classes vues (entraînement et test) ; None si elle n'est pas calculable.
+
+    Une classe absente de l'entraînement a une probabilité nulle : la
+    log-loss la pénalise au lieu d'échouer, et l'accuracy reste rapportée.
+    """
+    from sklearn.metrics import log_loss
+    classes = np.asarray(model.classes_)
+    if proba is None or proba.shape[1] != len(classes):
+        return None
+    labels = np.unique(np.concatenate([np.asarray(y_train), np.asarray(y_test)]))
+    full = np.zeros((len(proba), len(labels)))
+    full[:, np.searchsorted(labels, classes)] = proba
+    try:
+        return log_loss(y_test, full, labels=labels)
+    except ValueError:
+        return None
+
+
+def compare_profiles(X, y, profiles=None, registry=None):
+    """Temps d'entraînement et log-loss de chaque modèle de chaque profil, sur un même découpage de (X, y).
+
+    Retourne une liste de dictionnaires (profil, modèle, fit_time, log_loss,
+    accuracy) ; un modèle en échec a un champ `error`.
+    """
+    from prediction.registry import ModelRegistry
+    # Registre sans disque ni mémoire partagée : les temps mesurés sont ceux d'un entraînement réel
+    registry = registry or ModelRegistry(store_dir=None, max_entries=0)
+    X_train, X_test, y_train, y_test = split_dataset(X, y)
+    rows = []
+    for profile in profiles or PROFILES:
+        for name, model in build_models(profile=profile).items():
+            row = {"profil": profile, "modèle": name}
+            try:
+                row.update(fit_and_score(name, model, registry, X_train, y_train, X_test, y_test))
+            except Exception as e:
+                row["error"] = str(e)
+            rows.append(row)
+    return rows
+
+
+def _fit_and_score_started(started, name, *args):
+    """fit_and_score qui note l'instant où le modèle commence réellement à s'entraîner."""
+    started[name] = time.monotonic()
+    return fit_and_score(name, *args)
+
+
+def iter_evaluate_models(X_train, y_train, X_test, y_test, models=None, total_cores=None, timeout=DEFAULT_TIMEOUT, registry=None):
+    """Entraîne et évalue les modèles en parallèle, en les rendant au fil de l'eau.
+
+    Génère des couples (nom, résultat) dans l'ordre de fin ; `résultat` contient
+    accuracy, log_loss, fit_time, predict_time, n_jobs et status ("ok", "erreur" ou
+    "timeout"). Chaque modèle dispose de `timeout` secondes à partir du début de
+    son propre entraînement. Un thread ne pouvant pas être interrompu, le
+    dépassement arrête seulement l'attente : l'entraînement en cours se termine
+    en arrière-plan (et occupe ses cœurs jusque-là) et son résultat est ignoré.
+    Les modèles de `models` ne sont pas modifiés : n_jobs est fixé sur des clones.
+    """
+    from sklearn.base import clone
+    models = models if models is not None else build_models()
+    registry = registry or get_registry()
+    n_jobs = allocate_cores(models, total_cores)
+    models = {
+        name: clone(model).set_params(n_jobs=n_jobs[name]) if n_jobs[name] is not None else model
+        for name, model in models.items()
+    }
+
+    started = {}
+    executor = ThreadPoolExecutor(max_workers=max(1, len(models)))
+    # Les temps mesurés dans les threads du pool remontent au rerun de la page appelante
+    fit_and_score_in_run = get_metrics().propagate(_fit_and_score_started)
+    futures = {
+        executor.submit(fit_and_score_in_run, started, name, model, registry, X_train, y_train, X_test, y_test): name
+        for name, model in models.items()
+    }
+    pending = set(futures)
+    try:
+        while pending:
+            now = time.monotonic()
+            expired = {f for f in pending if futures[f] in started and started[futures[f]] + timeout <= now}
+            for future in expired:
+                future.cancel()
+                yield futures[future], {"accuracy": None, "n_jobs": n_jobs[futures[future]], "status": "timeout"}
+            pending -= expired
+            if not pending:
+                break
+            deadlines = [started[futures[f]] + timeout for f in pending if futures[f] in started]
+            # Un modèle pas encore démarré n'a pas d'échéance : on revient vérifier régulièrement
+            wait_for = max(0.0, min(deadlines) - now) if deadlines else min(timeout, 1.0)
+            done, pending = wait(pending, timeout=min(wait_for, 1.0), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = futures[future]
+                try:
+                    result = future.result()
+                    result["status"] = "ok"
+                except Exception as e:
+                    result = {"accuracy": None, "status": "erreur", "error": str(e)}
+                result["n_jobs"] = n_jobs[name]
+                yield name, result
+    finally:
+        # Les modèles abandonnés finissent en arrière-plan ; leur résultat est ignoré
+        executor.shutdown(wait=False, cancel_futures=True)
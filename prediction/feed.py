@@ -0,0 +1,389 @@
+"""Flux de cotes en direct : ingestion asyncio, carnet de cotes en tableaux et recalcul incrémental des paris de valeur.
+
+Usage : python -m prediction.feed --file cotes.jsonl
+        python -m prediction.feed --port 9009
+
+Chaque message est une ligne JSON {"match": ..., "market": ..., "selection": ..., "odds": ...}
+ou une ligne CSV match,market,selection,odds ; market et selection suivent MarketSet.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from prediction.markets import DEFAULT_EDGE_THRESHOLD, get_market_set
+from prediction.poisson import DEFAULT_MAX_GOALS
+
+DEFAULT_CAPACITY = 4096
+DEFAULT_BATCH_SIZE = 8192
+DEFAULT_MAX_LATENCY = 0.05
+DEFAULT_POLL_INTERVAL = 0.05
+
+
+def parse_line(line):
+    """(match, marché, sélection, cote) d'une ligne JSON ou CSV ; None si la ligne est vide ou illisible."""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        if line[0] == "{":
+            message = json.loads(line)
+            # Identifiants numériques en JSON (1, 2.5...) : mêmes clés que les chaînes des lignes CSV
+            return str(message["match"]), str(message["market"]), str(message["selection"]), float(message["odds"])
+        match, market, selection, odds = line.rsplit(",", 3)
+        return match, market, selection, float(odds)
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+class BookDelta:
+    """Sélections modifiées par un lot de mises à jour, et marges des marchés concernés."""
+
+    __slots__ = ("version", "slots", "odds", "implied", "edge", "value", "groups", "margins")
+
+    def __init__(self, version, slots, odds, implied, edge, value, groups, margins):
+        self.version = version
+        self.slots = slots
+        self.odds = odds
+        self.implied = implied
+        self.edge = edge
+        self.value = value
+        self.groups = groups
+        self.margins = margins
+
+    def __len__(self):
+        return len(self.slots)
+
+
+class OddsBook:
+    """Dernière cote de chaque (match, marché, sélection), dans des tableaux préalloués.
+
+    Chaque sélection occupe une case ; les sélections d'un même (match,
+    marché) forment un groupe dont la marge (somme des probabilités
+    implicites - 1) est tenue à jour par différences. Un lot de mises à jour
+    ne recalcule que les cases reçues et les marges de leurs groupes.
+    `probabilities(match)` donne le tenseur (G, G) des scores d'un match (ou
+    None) : les probabilités des marchés dérivés en sont tirées pour repérer
+    les paris de valeur.
+    """
+
+    def __init__(self, probabilities=None, threshold=DEFAULT_EDGE_THRESHOLD, capacity=DEFAULT_CAPACITY,
+                 max_goals=DEFAULT_MAX_GOALS):
+        self.probabilities = probabilities
+        self.threshold = threshold
+        self.markets = get_market_set(max_goals)
+        self.keys = []
+        self.groups = []
+        self._slots = {}
+        self._group_ids = {}
+        self._match_probabilities = {}
+        self._lock = threading.Lock()
+        self.version = 0
+        self.updates = 0
+        self._allocate(capacity, capacity)
+
+    def _allocate(self, slots, groups):
+        """Tableaux par case et par groupe, agrandis (en doublant) quand les capacités sont atteintes."""
+        def grow(name, size, fill, dtype=np.float64):
+            old = getattr(self, name, None)
+            if old is not None and len(old) >= size:
+                return
+            array = np.full(size, fill, dtype=dtype)
+            if old is not None:
+                array[:len(old)] = old
+            setattr(self, name, array)
+
+        grow("odds", slots, 0.0)
+        grow("group", slots, 0, np.int64)
+        grow("p_win", slots, np.nan)
+        grow("p_refund", slots, 0.0)
+        grow("changed_at", slots, 0, np.int64)
+        grow("inverse_sum", groups, 0.0)
+        grow("group_changed_at", groups, 0, np.int64)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _model(self, match):
+        """(P(gain), P(remboursement)) de toutes les sélections d'un match, calculées une fois par match."""
+        if match not in self._match_probabilities:
+            tensor = self.probabilities(match) if self.probabilities is not None else None
+            self._match_probabilities[match] = None if tensor is None else tuple(p[0] for p in self.markets.probabilities(tensor))
+        return self._match_probabilities[match]
+
+    def _slot(self, match, market, selection):
+        key = (match, market, selection)
+        slot = self._slots.get(key)
+        if slot is not None:
+            return slot
+        group = self._group_ids.get((match, market))
+        if group is None:
+            group = self._group_ids[(match, market)] = len(self.groups)
+            self.groups.append((match, market))
+        slot = self._slots[key] = len(self.keys)
+        self.keys.append(key)
+        if slot >= len(self.odds) or group >= len(self.inverse_sum):
+            self._allocate(2 * len(self.odds), 2 * len(self.inverse_sum))
+        self.group[slot] = group
+        model = self._model(match)
+        column = self.markets.index.get((market, selection))
+        if model is not None and column is not None:
+            self.p_win[slot], self.p_refund[slot] = model[0][column], model[1][column]
+        return slot
+
+    def set_match_probabilities(self, match, tensor):
+        """Remplace les probabilités du modèle pour un match (nouveau tenseur des scores)."""
+        with self._lock:
+            self._match_probabilities[match] = tuple(p[0] for p in self.markets.probabilities(tensor))
+            win, refund = self._match_probabilities[match]
+            slots = [s for key, s in self._slots.items() if key[0] == match]
+            for slot in slots:
+                column = self.markets.index.get(self.keys[slot][1:])
+                if column is not None:
+                    self.p_win[slot], self.p_refund[slot] = win[column], refund[column]
+            self.version += 1
+            self.changed_at[slots] = self.version
+
+    def apply(self, updates):
+        """Applique un lot de (match, marché, sélection, cote) ; retourne le BookDelta des cases modifiées."""
+        with self._lock:
+            slots = np.fromiter((self._slot(m, k, s) for m, k, s, _ in updates), dtype=np.int64, count=len(updates))
+            odds = np.fromiter((o for _, _, _, o in updates), dtype=np.float64, count=len(updates))
+            valid = odds > 1
+            slots, odds = slots[valid], odds[valid]
+            # Plusieurs prix pour une même case dans le lot : seul le dernier compte
+            last = len(slots) - 1 - np.unique(slots[::-1], return_index=True)[1]
+            slots, odds = slots[last], odds[last]
+
+            previous = self.odds[slots]
+            groups = self.group[slots]
+            delta = 1 / odds - np.where(previous > 1, 1 / np.where(previous > 1, previous, 1.0), 0.0)
+            np.add.at(self.inverse_sum, groups, delta)
+            self.odds[slots] = odds
+
+            self.version += 1
+            self.updates += len(updates)
+            self.changed_at[slots] = self.version
+            changed_groups = np.unique(groups)
+            self.group_changed_at[changed_groups] = self.version
+            implied = 1 / odds
+            edge = self.p_win[slots] * odds + self.p_refund[slots] - 1
+            return BookDelta(
+                self.version, slots, odds, implied, edge, edge > self.threshold,
+                changed_groups, self.inverse_sum[changed_groups] - 1
+            )
+
+    def changes_since(self, version=0):
+        """Sélections modifiées après `version` (toutes par défaut), pour une interface qui se met à jour par différences."""
+        with self._lock:
+            n = len(self.keys)
+            slots = np.flatnonzero(self.changed_at[:n] > version)
+            return self._table(slots), self.version
+
+    def _table(self, slots):
+        odds = self.odds[slots]
+        groups = self.group[slots]
+        edge = self.p_win[slots] * odds + self.p_refund[slots] - 1
+        keys = [self.keys[s] for s in slots]
+        return pd.DataFrame({
+            "match": [k[0] for k in keys],
+            "market": [k[1] for k in keys],
+            "selection": [k[2] for k in keys],
+            "odds": odds,
+            "implied_probability": 1 / odds,
+            # Probabilité sans marge (retrait proportionnel au sein du marché)
+            "fair_probability": 1 / odds / self.inverse_sum[groups],
+            "margin": self.inverse_sum[groups] - 1,
+            "probability": self.p_win[slots],
+            "edge": edge,
+            "value": edge > self.threshold
+        }, index=pd.Index(slots, name="slot"))
+
+    def value_bets(self):
+        """Paris de valeur du carnet entier, classés par avantage."""
+        table, _ = self.changes_since(0)
+        return table[table["value"]].sort_values("edge", ascending=False)
+
+
+async def tail_file(path, poll_interval=DEFAULT_POLL_INTERVAL, from_start=True, stop=None):
+    """Lignes ajoutées à un fichier (équivalent de tail -f), par paquets : une liste par lecture.
+
+    Seules les lignes complètes sont rendues : une ligne en cours d'écriture
+    attend son retour à la ligne. Avec `from_start=False`, la fin d'une ligne
+    commencée avant l'ouverture est ignorée.
+    """
+    with open(path, "rb") as f:
+        skip_partial = False
+        if not from_start:
+            end = f.seek(0, os.SEEK_END)
+            if end:
+                f.seek(end - 1)
+                skip_partial = f.read(1) != b"\n"
+        pending = b""
+        while stop is None or not stop.is_set():
+            chunk = f.read(1 << 20)
+            if not chunk:
+                await asyncio.sleep(poll_interval)
+                continue
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            if skip_partial and lines:
+                del lines[0]
+                skip_partial = False
+            if lines:
+                yield [line.decode(errors="replace") for line in lines]
+
+
+async def socket_lines(host="127.0.0.1", port=9009, stop=None):
+    """Lignes envoyées par les clients TCP connectés à (host, port), tous clients confondus, par paquets."""
+    chunks = asyncio.Queue(maxsize=1024)
+
+    async def handle(reader, writer):
+        pending = b""
+        try:
+            while chunk := await reader.read(1 << 16):
+                lines = (pending + chunk).split(b"\n")
+                pending = lines.pop()
+                if lines:
+                    await chunks.put([line.decode(errors="replace") for line in lines])
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    try:
+        while stop is None or not stop.is_set():
+            try:
+                yield await asyncio.wait_for(chunks.get(), timeout=0.5)
+            except asyncio.TimeoutError:
+                continue
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+async def ingest(source, book, on_delta=None, batch_size=DEFAULT_BATCH_SIZE, max_latency=DEFAULT_MAX_LATENCY):
+    """Consomme une source asynchrone de lignes (ou de listes de lignes) et applique les prix au carnet par lots.
+
+    Un lot part dès `batch_size` lignes ou `max_latency` secondes après
+    sa première ligne ; `on_delta` reçoit le BookDelta de chaque lot.
+    """
+    items = source.__aiter__()
+    pending = None
+    done = False
+    while not done:
+        try:
+            item = await (pending if pending is not None else items.__anext__())
+        except StopAsyncIteration:
+            return
+        pending = None
+        batch = [item] if isinstance(item, str) else list(item)
+        deadline = time.perf_counter() + max_latency
+        while len(batch) < batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            following = asyncio.ensure_future(items.__anext__())
+            ready, _ = await asyncio.wait({following}, timeout=remaining)
+            if not ready:
+                # L'élément attendu ouvrira le lot suivant
+                pending = following
+                break
+            try:
+                item = following.result()
+            except StopAsyncIteration:
+                done = True
+                break
+            if isinstance(item, str):
+                batch.append(item)
+            else:
+                batch.extend(item)
+        updates = [u for u in map(parse_line, batch) if u is not None]
+        if updates:
+            delta = book.apply(updates)
+            if on_delta is not None:
+                on_delta(delta)
+
+
+def strength_probabilities(strength):
+    """Probabilités des matchs « domicile - extérieur » selon les forces d'équipes (None si une équipe est inconnue)."""
+    def probabilities(match):
+        home, _, away = match.partition(" - ")
+        if home in strength._codes and away in strength._codes:
+            return strength.scoreline_tensor(home, away, fold_tail=True)[0]
+        return None
+    return probabilities
+
+
+class FeedRunner:
+    """Ingestion dans un thread de fond avec sa propre boucle asyncio (une par processus Streamlit)."""
+
+    def __init__(self, make_source, book):
+        self.book = book
+        self.error = None
+        self._make_source = make_source
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="odds-feed", daemon=True)
+
+    def _run(self):
+        try:
+            asyncio.run(ingest(self._make_source(self._stop), self.book))
+        except Exception as e:
+            self.error = e
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+
+def main(argv=None):
+    """Suit un flux de cotes et affiche le débit et les nouveaux paris de valeur."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ingestion d'un flux de cotes et détection des paris de valeur.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="fichier de cotes suivi comme tail -f")
+    source.add_argument("--port", type=int, help="port TCP local sur lequel les producteurs envoient leurs lignes")
+    parser.add_argument("--store", help="magasin historique : probabilités des matchs « domicile - extérieur » par Dixon-Coles")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_EDGE_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    probabilities = None
+    if args.store:
+        from prediction.store import MatchStore
+        from prediction.strength import fit_from_store
+        probabilities = strength_probabilities(fit_from_store(MatchStore(args.store)))
+
+    book = OddsBook(probabilities, threshold=args.threshold)
+    stats = {"last": time.perf_counter(), "updates": 0}
+
+    def report(delta):
+        now = time.perf_counter()
+        for slot in delta.slots[delta.value]:
+            match, market, selection = book.keys[slot]
+            print(f"valeur : {match} {market} {selection} @ {book.odds[slot]:.2f}")
+        if now - stats["last"] >= 1:
+            print(f"{book.updates - stats['updates']} mises à jour en {now - stats['last']:.1f} s, {len(book)} sélections")
+            stats["last"], stats["updates"] = now, book.updates
+
+    lines = tail_file(args.file) if args.file else socket_lines(port=args.port)
+    try:
+        asyncio.run(ingest(lines, book, report))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Graphe de calcul incrémental : chaque bloc déclare ses entrées et n'est recalculé que s'il est sale."""
+
+from collections import Counter
+
+import numpy as np
+
+from prediction.metrics import timed
+
+
+def _same(old, new):
+    try:
+        if isinstance(old, np.ndarray) or isinstance(new, np.ndarray):
+            return np.array_equal(old, new)
+        return bool(old == new)
+    except Exception:
+        return False
+
+
+class ComputeGraph:
+    """Graphe de dépendances entre entrées (valeurs des widgets) et nœuds calculés.
+
+    `get(nom)` ne recalcule un nœud que si l'une de ses dépendances a changé
+    depuis son dernier calcul ; les autres nœuds gardent leur valeur.
+    """
+
+    def __init__(self):
+        self._nodes = {}
+        self._values = {}
+        self._versions = {}
+        self._computed_with = {}
+        self.recomputed = Counter()
+
+    def node(self, name, inputs=()):
+        """Décorateur : enregistre `fn(*valeurs des entrées)` comme nœud `name`."""
+        def register(fn):
+            self._nodes[name] = (fn, tuple(inputs))
+            self._computed_with.pop(name, None)
+            return fn
+        return register
+
+    def set_input(self, name, value):
+        """Met à jour une entrée ; ses dépendants ne deviennent sales que si la valeur change."""
+        if name in self._nodes:
+            raise ValueError(f"{name} est un nœud calculé, pas une entrée")
+        if name in self._values and _same(self._values[name], value):
+            return
+        self._values[name] = value
+        self._versions[name] = self._versions.get(name, 0) + 1
+
+    def set_inputs(self, **values):
+        for name, value in values.items():
+            self.set_input(name, value)
+
+    def _dependency_versions(self, name):
+        return tuple(self._version(dep) for dep in self._nodes[name][1])
+
+    def _version(self, name):
+        if name in self._nodes:
+            self.get(name)
+        elif name not in self._values:
+            raise KeyError(f"Entrée non définie : {name}")
+        return self._versions[name]
+
+    def is_dirty(self, name):
+        """Vrai si le nœud doit être recalculé au prochain `get`."""
+        return self._computed_with.get(name) != self._dependency_versions(name)
+
+    def get(self, name):
+        """Valeur d'une entrée ou d'un nœud, recalculé seulement si nécessaire."""
+        if name not in self._nodes:
+            if name not in self._values:
+                raise KeyError(f"Entrée non définie : {name}")
+            return self._values[name]
+        fn, inputs = self._nodes[name]
+        versions = self._dependency_versions(name)
+        if self._computed_with.get(name) != versions:
+            with timed(f"graph.{name}"):
+                value = fn(*(self._values[dep] for dep in inputs))
+            if name not in self._values or not _same(self._values[name], value):
+                self._versions[name] = self._versions.get(name, 0) + 1
+            self._values[name] = value
+            self._computed_with[name] = versions
+            self.recomputed[name] += 1
+        return self._values[name]
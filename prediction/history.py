@@ -0,0 +1,201 @@
+"""Historique compact des prédictions : tampon circulaire en mémoire et débordement SQLite."""
+
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from prediction.poisson import DEFAULT_MAX_GOALS, outcome_probabilities
+
+DEFAULT_CAPACITY = 200
+DEFAULT_PAGE_SIZE = 20
+DEFAULT_CSV_CHUNK = 1000
+
+
+class PredictionHistory:
+    """Historique en colonnes : chaque matrice de scores est stockée sur G*G flottants.
+
+    Les `capacity` prédictions les plus récentes restent en mémoire ; les plus
+    anciennes sont déplacées dans un fichier SQLite local (`spill_path`).
+    Un fichier créé automatiquement est supprimé par close(), ou à défaut
+    quand l'historique est libéré (fin de la session) ou à l'arrêt du processus.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, max_goals=DEFAULT_MAX_GOALS, spill_path=None):
+        if capacity < 1:
+            raise ValueError("capacity doit être au moins 1")
+        self.capacity = capacity
+        self.max_goals = max_goals
+        self._owns_spill = spill_path is None
+        self.spill_path = spill_path or os.path.join(tempfile.gettempdir(), f"prediction_history_{uuid.uuid4().hex}.sqlite")
+        self._scorelines = np.zeros((capacity, max_goals * max_goals))
+        self._timestamps = np.zeros(capacity)
+        self._home_teams = np.empty(capacity, dtype=object)
+        self._away_teams = np.empty(capacity, dtype=object)
+        self._count = 0
+        self._db = None
+        self._lock = threading.Lock()
+        self._cleanup = weakref.finalize(self, _remove_spill, self.spill_path) if self._owns_spill else None
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def spilled(self):
+        """Nombre de prédictions déplacées sur disque."""
+        return max(0, self._count - self.capacity)
+
+    def _connection(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.spill_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS history ("
+                "id INTEGER PRIMARY KEY, timestamp REAL, home_team TEXT, away_team TEXT, scoreline BLOB)"
+            )
+        return self._db
+
+    def append(self, home_team, away_team, scoreline, timestamp=None):
+        """Ajoute une prédiction ; la plus ancienne en mémoire part sur disque si le tampon est plein."""
+        scoreline = np.asarray(scoreline, dtype=np.float64)
+        if scoreline.shape != (self.max_goals, self.max_goals):
+            raise ValueError(f"La matrice de scores doit être de taille {self.max_goals}x{self.max_goals}")
+        with self._lock:
+            slot = self._count % self.capacity
+            if self._count >= self.capacity:
+                db = self._connection()
+                with db:
+                    db.execute(
+                        "INSERT INTO history VALUES (?, ?, ?, ?, ?)",
+                        (self._count - self.capacity, self._timestamps[slot], self._home_teams[slot],
+                         self._away_teams[slot], self._scorelines[slot].tobytes())
+                    )
+            self._scorelines[slot] = scoreline.ravel()
+            self._timestamps[slot] = time.time() if timestamp is None else timestamp
+            self._home_teams[slot] = home_team
+            self._away_teams[slot] = away_team
+            self._count += 1
+
+    def _rows(self, start, stop):
+        """Colonnes des prédictions d'identifiants [start, stop), depuis le disque puis la mémoire."""
+        with self._lock:
+            start, stop = max(0, start), min(stop, self._count)
+            spilled = self.spilled
+            parts = []
+            if start < min(stop, spilled):
+                rows = self._connection().execute(
+                    "SELECT id, timestamp, home_team, away_team, scoreline FROM history WHERE id >= ? AND id < ? ORDER BY id",
+                    (start, min(stop, spilled))
+                ).fetchall()
+                ids, timestamps, home, away, blobs = zip(*rows)
+                parts.append((
+                    np.array(ids), np.array(timestamps), np.array(home, dtype=object), np.array(away, dtype=object),
+                    np.frombuffer(b"".join(blobs), dtype=np.float64).reshape(len(rows), -1)
+                ))
+            if max(start, spilled) < stop:
+                ids = np.arange(max(start, spilled), stop)
+                slots = ids % self.capacity
+                parts.append((ids, self._timestamps[slots], self._home_teams[slots], self._away_teams[slots], self._scorelines[slots]))
+        if not parts:
+            return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0, dtype=object), np.empty(0, dtype=object), np.empty((0, self.max_goals ** 2))
+        return tuple(np.concatenate(column) for column in zip(*parts))
+
+    def _frame(self, start, stop, scorelines=False):
+        ids, timestamps, home, away, flat = self._rows(start, stop)
+        outcomes = outcome_probabilities(flat.reshape(-1, self.max_goals, self.max_goals))
+        best = flat.argmax(axis=1) if len(flat) else np.empty(0, dtype=np.int64)
+        frame = pd.DataFrame({
+            'id': ids,
+            'Date': pd.to_datetime(timestamps, unit='s'),
+            'Home Team': home,
+            'Away Team': away,
+            'P(domicile)': outcomes[:, 0],
+            'P(nul)': outcomes[:, 1],
+            'P(extérieur)': outcomes[:, 2],
+            'Score probable': [f"{b // self.max_goals}-{b % self.max_goals}" for b in best]
+        })
+        if scorelines:
+            labels = [f"{h}-{a}" for h in range(self.max_goals) for a in range(self.max_goals)]
+            frame = pd.concat([frame, pd.DataFrame(flat, columns=labels)], axis=1)
+        return frame
+
+    def page(self, page=0, page_size=DEFAULT_PAGE_SIZE):
+        """Page `page` (0 = plus récentes) de l'historique, la plus récente en premier."""
+        stop = self._count - page * page_size
+        return self._frame(stop - page_size, stop).iloc[::-1].reset_index(drop=True)
+
+    def iter_csv(self, start=0, chunk_size=DEFAULT_CSV_CHUNK):
+        """Génère le CSV des prédictions à partir de l'identifiant `start`, bloc par bloc."""
+        stop = self._count
+        for chunk_start in range(start, max(start, stop), chunk_size):
+            frame = self._frame(chunk_start, min(chunk_start + chunk_size, stop), scorelines=True)
+            yield frame.to_csv(index=False, header=(chunk_start == start))
+
+    def to_csv(self, start=0):
+        """CSV complet de l'historique, en fichier binaire lu au fil de l'eau (à passer tel quel à st.download_button).
+
+        Chaque bloc de iter_csv n'est produit et encodé qu'au moment où il est
+        lu : l'historique débordé sur disque n'est jamais rechargé d'un coup.
+        """
+        return _CsvStream(self.iter_csv(start))
+
+    def close(self):
+        """Ferme le fichier de débordement et le supprime s'il a été créé automatiquement."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+            if self._cleanup is not None:
+                self._cleanup()
+
+
+def _remove_spill(path):
+    """Supprime un fichier de débordement (appelé au plus une fois par weakref.finalize)."""
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class _CsvStream(io.RawIOBase):
+    """Fichier binaire en lecture seule sur un générateur de blocs de texte CSV."""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._pending = memoryview(b"")
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._pending = memoryview(chunk.encode())
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        self._position += n
+        return n
+
+    def readall(self):
+        head = bytes(self._pending)
+        self._pending = memoryview(b"")
+        data = head + b"".join(chunk.encode() for chunk in self._chunks)
+        self._position += len(data)
+        return data
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        # st.download_button rembobine le fichier avant de le lire : seul le début est accessible
+        if offset != 0 or whence != io.SEEK_SET or self._position:
+            raise io.UnsupportedOperation("flux CSV non rembobinable")
+        return 0
+
+    def tell(self):
+        return self._position
@@ -0,0 +1,66 @@
+"""Budget de temps d'import des modules de prédiction (démarrage à froid d'un worker).
+
+Usage : python -m prediction.importtime [--budget SECONDES]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+DEFAULT_BUDGET = 1.0
+RENDER_MODULES = (
+    "prediction.batch",
+    "prediction.evaluation",
+    "prediction.models",
+    "prediction.odds",
+    "prediction.poisson",
+    "prediction.registry"
+)
+# Modules qui ne doivent pas être chargés par un simple import du package
+LAZY_MODULES = ("altair", "matplotlib", "scipy", "sklearn", "streamlit", "xgboost")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+for name in sys.argv[2:]:
+    __import__(name)
+elapsed = time.perf_counter() - start
+lazy = sys.argv[1].split(",")
+print(json.dumps({"seconds": elapsed, "loaded": sorted(m for m in lazy if m in sys.modules)}))
+"""
+
+
+def measure_import_time(modules=RENDER_MODULES, repeat=3):
+    """Meilleur temps d'import (en secondes) de `modules` dans un interpréteur neuf."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE, ",".join(LAZY_MODULES), *modules],
+            cwd=root, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output)
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vérifie le budget de temps d'import du package prediction.")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="budget en secondes")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    result = measure_import_time(repeat=args.repeat)
+    print(f"Import des modules de prédiction : {result['seconds']:.3f} s (budget {args.budget:.3f} s)")
+    ok = result["seconds"] <= args.budget
+    if result["loaded"]:
+        print(f"Modules lourds chargés à l'import : {', '.join(result['loaded'])}")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
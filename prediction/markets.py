@@ -0,0 +1,145 @@
+"""Marchés dérivés de la matrice des scores et recherche des paris de valeur."""
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from prediction.poisson import DEFAULT_MAX_GOALS
+
+DEFAULT_EDGE_THRESHOLD = 0.05
+DEFAULT_KELLY_FRACTION = 0.25
+TOTAL_LINES = (0.5, 1.5, 2.5, 3.5, 4.5)
+HANDICAP_LINES = tuple(np.arange(-2.5, 2.75, 0.25).round(2))
+ODDS_COLUMNS = ["match", "market", "selection", "odds"]
+
+
+def _handicap_weights(diff, line):
+    """(part gagnée, part remboursée) d'un pari handicap asiatique sur l'écart de buts `diff`.
+
+    Les lignes au quart (ex. -0.75) sont misées pour moitié sur les deux
+    lignes voisines au demi (ex. -0.5 et -1).
+    """
+    if (line * 4) % 2:
+        win_low, refund_low = _handicap_weights(diff, line - 0.25)
+        win_high, refund_high = _handicap_weights(diff, line + 0.25)
+        return (win_low + win_high) / 2, (refund_low + refund_high) / 2
+    margin = diff + line
+    return (margin > 0).astype(np.float64), (margin == 0).astype(np.float64)
+
+
+class MarketSet:
+    """Masques (G*G, S) de toutes les sélections : part de la mise gagnée et part remboursée par score."""
+
+    def __init__(self, max_goals=DEFAULT_MAX_GOALS):
+        self.max_goals = max_goals
+        home, away = np.indices((max_goals, max_goals))
+        home, away = home.ravel(), away.ravel()
+        diff, total = home - away, home + away
+        keys, win, refund = [], [], []
+
+        def add(market, selection, won, refunded=None):
+            keys.append((market, selection))
+            win.append(np.asarray(won, dtype=np.float64))
+            refund.append(np.zeros(len(home)) if refunded is None else refunded)
+
+        add("1X2", "1", diff > 0)
+        add("1X2", "X", diff == 0)
+        add("1X2", "2", diff < 0)
+        add("Double chance", "1X", diff >= 0)
+        add("Double chance", "12", diff != 0)
+        add("Double chance", "X2", diff <= 0)
+        for line in TOTAL_LINES:
+            add(f"Over/Under {line}", "over", total > line)
+            add(f"Over/Under {line}", "under", total < line)
+        add("BTTS", "yes", (home > 0) & (away > 0))
+        add("BTTS", "no", (home == 0) | (away == 0))
+        for h in range(max_goals):
+            for a in range(max_goals):
+                add("Correct score", f"{h}-{a}", (home == h) & (away == a))
+        # La ligne est celle de l'équipe à domicile ; l'extérieur reçoit la ligne opposée
+        for line in HANDICAP_LINES:
+            label = f"Asian handicap {line:+g}" if line else "Asian handicap 0"
+            add(label, "home", *_handicap_weights(diff, line))
+            add(label, "away", *_handicap_weights(-diff, -line))
+
+        self.keys = keys
+        self.index = {key: i for i, key in enumerate(keys)}
+        self.win = np.column_stack(win)
+        self.refund = np.column_stack(refund)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def probabilities(self, tensor):
+        """(P(gain), P(remboursement)) de chaque sélection : deux produits matriciels (N, S)."""
+        flat = np.asarray(tensor, dtype=np.float64).reshape(-1, self.max_goals * self.max_goals)
+        return flat @ self.win, flat @ self.refund
+
+    def table(self, tensor):
+        """Probabilités de gain de toutes les sélections, une ligne par (match, marché, sélection)."""
+        win, _ = self.probabilities(tensor)
+        n = len(win)
+        return pd.DataFrame({
+            "match": np.repeat(np.arange(n), len(self)),
+            "market": [m for _ in range(n) for m, _ in self.keys],
+            "selection": [s for _ in range(n) for _, s in self.keys],
+            "probability": win.ravel()
+        })
+
+
+@lru_cache(maxsize=8)
+def get_market_set(max_goals=DEFAULT_MAX_GOALS):
+    """Masques des marchés, construits une seule fois par taille de matrice."""
+    return MarketSet(max_goals)
+
+
+def scan_value_bets(tensor, odds, threshold=DEFAULT_EDGE_THRESHOLD, kelly_fraction=DEFAULT_KELLY_FRACTION):
+    """Paris de valeur d'un ensemble de matchs, classés par avantage puis par mise de Kelly.
+
+    `tensor` est le tenseur (N, G, G) des scores ; `odds` un DataFrame
+    (match, market, selection, odds) où `match` est l'indice du match dans le
+    tenseur. L'avantage est l'espérance de gain par unité misée
+    (P(gain) x cote + P(remboursement) - 1) ; seules les cotes dont
+    l'avantage dépasse `threshold` sont retournées, avec la fraction de
+    bankroll à miser selon Kelly (fractionné par `kelly_fraction`).
+    """
+    tensor = np.asarray(tensor, dtype=np.float64)
+    if tensor.ndim == 2:
+        tensor = tensor[None]
+    markets = get_market_set(tensor.shape[-1])
+    missing = [c for c in ODDS_COLUMNS if c not in odds.columns]
+    if missing:
+        raise ValueError(f"Colonnes manquantes : {', '.join(missing)}")
+
+    # Jointure sur les couples (marché, sélection) distincts seulement, pas ligne par ligne
+    market_codes, market_names = pd.factorize(odds["market"])
+    selection_codes, selection_names = pd.factorize(odds["selection"])
+    lookup = np.array([[markets.index.get((str(m), str(s)), -1) for s in selection_names] for m in market_names], dtype=np.int64)
+    cols = lookup.reshape(len(market_names), len(selection_names))[market_codes, selection_codes]
+    if np.any(cols < 0):
+        unknown = dict.fromkeys(zip(market_codes[cols < 0], selection_codes[cols < 0]))
+        raise ValueError("Marchés inconnus : " + ", ".join(f"{market_names[m]} / {selection_names[s]}" for m, s in unknown))
+    rows = odds["match"].to_numpy(dtype=np.int64)
+    if len(rows) and (rows.min() < 0 or rows.max() >= len(tensor)):
+        raise ValueError("Indice de match hors du tenseur")
+    prices = odds["odds"].to_numpy(dtype=np.float64)
+    if np.any(prices <= 1):
+        raise ValueError("Les cotes décimales doivent être supérieures à 1")
+
+    win, refund = markets.probabilities(tensor)
+    p_win, p_refund = win[rows, cols], refund[rows, cols]
+    edge = p_win * prices + p_refund - 1
+    kelly = kelly_fraction * edge / (prices - 1)
+    keep = np.flatnonzero(edge > threshold)
+    keep = keep[np.lexsort((-kelly[keep], -edge[keep]))]
+    return pd.DataFrame({
+        "match": rows[keep],
+        "market": market_names[market_codes[keep]],
+        "selection": selection_names[selection_codes[keep]],
+        "odds": prices[keep],
+        "probability": p_win[keep],
+        "implied_probability": 1 / prices[keep],
+        "edge": edge[keep],
+        "kelly_stake": kelly[keep]
+    })
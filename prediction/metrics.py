@@ -0,0 +1,317 @@
+"""Instrumentation : temps par étape, compteurs et export local des métriques.
+
+Usage : python -m prediction.metrics metrics.jsonl --prometheus metrics.prom
+"""
+
+import bisect
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+# Fichier JSON lines où chaque exécution de page ajoute une ligne (désactivé si vide)
+METRICS_FILE = os.environ.get("METRICS_FILE", "")
+# Bornes des classes de l'histogramme, en millisecondes
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+STAGE_BUCKETS = LATENCY_BUCKETS + (2500, 5000, 10000, 30000, 60000)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyHistogram:
+    """Histogramme des latences à classes fixes, sûr entre threads."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._total = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        ms = seconds * 1000
+        index = bisect.bisect_left(self.buckets, ms)
+        with self._lock:
+            self._counts[index] += 1
+            self._total += ms
+
+    def quantile(self, q, counts=None):
+        """Borne supérieure de la classe contenant le quantile `q` (en ms)."""
+        counts = counts or self._counts
+        n = sum(counts)
+        if n == 0:
+            return None
+        rank = np.searchsorted(np.cumsum(counts), q * n)
+        return self.buckets[rank] if rank < len(self.buckets) else float("inf")
+
+    def summary(self):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._total
+        n = sum(counts)
+        return {
+            "count": n,
+            "mean_ms": total / n if n else None,
+            "p50_ms": self.quantile(0.5, counts),
+            "p95_ms": self.quantile(0.95, counts),
+            "p99_ms": self.quantile(0.99, counts),
+            "buckets_ms": [*self.buckets, "inf"],
+            "counts": counts
+        }
+
+
+class RunRecord:
+    """Étapes et compteurs d'une exécution de page (un rerun Streamlit)."""
+
+    def __init__(self, page):
+        self.page = page
+        self.started = time.time()
+        self._clock = time.perf_counter()
+        self.stages = []
+        self.counters = Counter()
+        # Les threads de travail rattachés au rerun (voir Metrics.propagate) y écrivent aussi
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.stages.append((stage, seconds))
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def counters_snapshot(self):
+        with self._lock:
+            return dict(self.counters)
+
+    def breakdown(self):
+        """Temps total (s) et nombre d'appels par étape, dans l'ordre de première apparition."""
+        totals = {}
+        with self._lock:
+            stages = list(self.stages)
+        for name, seconds in stages:
+            total, calls = totals.get(name, (0.0, 0))
+            totals[name] = (total + seconds, calls + 1)
+        return totals
+
+    def table(self):
+        """Lignes (étape, ms, appels, part du temps écoulé) pour l'affichage du panneau de débogage.
+
+        Les étapes peuvent être imbriquées (un nœud du graphe dans un rendu) :
+        les parts ne s'additionnent donc pas forcément à 100 %.
+        """
+        breakdown = self.breakdown()
+        elapsed = max(time.perf_counter() - self._clock, 1e-9)
+        return [
+            {"étape": name, "ms": seconds * 1000, "appels": calls, "part": seconds / elapsed}
+            for name, (seconds, calls) in sorted(breakdown.items(), key=lambda item: -item[1][0])
+        ]
+
+    def to_dict(self):
+        return {
+            "page": self.page,
+            "time": self.started,
+            "stages": {name: total for name, (total, _) in self.breakdown().items()},
+            "counters": self.counters_snapshot()
+        }
+
+
+class Metrics:
+    """Métriques du processus, partagées par toutes les sessions.
+
+    Chaque étape alimente un histogramme par nom d'étape ; l'exécution en
+    cours dans le thread (voir start_run) garde en plus le détail du rerun.
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = Counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def start_run(self, page):
+        """Commence l'enregistrement d'un rerun de `page` dans le thread courant."""
+        self._local.run = RunRecord(page)
+        return self._local.run
+
+    def current_run(self):
+        return getattr(self._local, "run", None)
+
+    @contextlib.contextmanager
+    def attach(self, run):
+        """Rattache le thread courant au rerun `run` (étapes mesurées dans un thread de travail)."""
+        previous = self.current_run()
+        self._local.run = run
+        try:
+            yield run
+        finally:
+            self._local.run = previous
+
+    def propagate(self, fn):
+        """`fn` exécutée dans le rerun du thread appelant, quel que soit le thread qui l'exécute (pools de threads)."""
+        run = self.current_run()
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with self.attach(run):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def finish_run(self, path=None):
+        """Termine le rerun courant et l'ajoute au fichier JSON lines `path` (METRICS_FILE par défaut)."""
+        run = self.current_run()
+        self._local.run = None
+        path = METRICS_FILE if path is None else path
+        if run is not None and path:
+            line = json.dumps(run.to_dict(), ensure_ascii=False)
+            with self._lock, open(path, "a") as f:
+                f.write(line + "\n")
+        return run
+
+    def record(self, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = LatencyHistogram(STAGE_BUCKETS)
+        histogram.record(seconds)
+        run = self.current_run()
+        if run is not None:
+            run.add(stage, seconds)
+
+    def increment(self, name, n=1):
+        """Ajoute `n` au compteur `name` (succès du cache de modèles, lignes traitées...)."""
+        with self._lock:
+            self._counters[name] += n
+        run = self.current_run()
+        if run is not None:
+            run.count(name, n)
+
+    def timed(self, stage):
+        """Contexte (ou décorateur) qui chronomètre l'étape `stage`."""
+        return _Timer(self, stage)
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def stage_summary(self):
+        """{étape: résumé de l'histogramme} pour toutes les étapes vues par le processus."""
+        with self._lock:
+            histograms = dict(self._histograms)
+        return {stage: h.summary() for stage, h in sorted(histograms.items())}
+
+    def to_prometheus(self):
+        """Métriques au format texte Prometheus (quantiles approchés par les classes de l'histogramme)."""
+        return format_prometheus(
+            {stage: (s["count"], s["mean_ms"], [s[f"p{round(q * 100)}_ms"] for q in QUANTILES])
+             for stage, s in self.stage_summary().items()},
+            self.counters()
+        )
+
+    def write_prometheus(self, path):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp, path)
+
+
+class _Timer:
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.stage, time.perf_counter() - self._start)
+        return False
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Timer(self.metrics, self.stage):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+def format_prometheus(stages, counters):
+    """Texte Prometheus : `stages` = {étape: (nombre, moyenne ms, [p50, p95, p99] ms)}."""
+    lines = [
+        "# HELP prediction_stage_seconds Durée des étapes des pages",
+        "# TYPE prediction_stage_seconds summary"
+    ]
+    for stage, (count, mean_ms, quantiles) in stages.items():
+        for q, value in zip(QUANTILES, quantiles):
+            if value is not None:
+                lines.append(f'prediction_stage_seconds{{stage="{stage}",quantile="{q}"}} {value / 1000:.6g}')
+        lines.append(f'prediction_stage_seconds_count{{stage="{stage}"}} {count}')
+        lines.append(f'prediction_stage_seconds_sum{{stage="{stage}"}} {(mean_ms or 0) * count / 1000:.6g}')
+    for name, value in sorted(counters.items()):
+        lines.append(f"# TYPE prediction_{name}_total counter")
+        lines.append(f"prediction_{name}_total {value}")
+    return "\n".join(lines) + "\n"
+
+
+def summarize_runs(path):
+    """Quantiles exacts par étape sur toutes les exécutions d'un fichier JSON lines (toutes sessions)."""
+    durations = {}
+    counters = Counter()
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            run = json.loads(line)
+            for stage, seconds in run["stages"].items():
+                durations.setdefault(stage, []).append(seconds * 1000)
+            counters.update(run.get("counters", {}))
+    stages = {
+        stage: (len(values), float(np.mean(values)), np.percentile(values, [q * 100 for q in QUANTILES]).tolist())
+        for stage, values in sorted(durations.items())
+    }
+    return stages, dict(counters)
+
+
+_metrics = Metrics()
+
+
+def get_metrics():
+    """Métriques partagées par toutes les sessions du processus."""
+    return _metrics
+
+
+def timed(stage):
+    """Chronomètre `stage` avec les métriques partagées : `with timed(...)` ou `@timed(...)`."""
+    return _metrics.timed(stage)
+
+
+def increment(name, n=1):
+    _metrics.increment(name, n)
+
+
+def main(argv=None):
+    """Agrège un fichier JSON lines de métriques : p50/p95/p99 par étape."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Agrège les temps par étape enregistrés par les pages.")
+    parser.add_argument("runs", help="fichier JSON lines (METRICS_FILE)")
+    parser.add_argument("--prometheus", help="écrit aussi le résumé au format texte Prometheus")
+    args = parser.parse_args(argv)
+
+    stages, counters = summarize_runs(args.runs)
+    print(f"{'étape':<40} {'n':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for stage, (count, _, (p50, p95, p99)) in stages.items():
+        print(f"{stage:<40} {count:>6} {p50:>10.2f} {p95:>10.2f} {p99:>10.2f}")
+    for name, value in sorted(counters.items()):
+        print(f"{name} : {value}")
+    if args.prometheus:
+        with open(args.prometheus, "w") as f:
+            f.write(format_prometheus(stages, counters))
+
+
+if __name__ == "__main__":
+    main()
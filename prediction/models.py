@@ -0,0 +1,107 @@
+"""Définition des classifieurs utilisés par les deux pages, par profil d'entraînement.
+
+Les bibliothèques de modèles (scikit-learn, xgboost) ne sont importées qu'à la
+construction du premier modèle, pas à l'import du module.
+"""
+
+import hashlib
+
+from prediction.registry import get_registry
+
+
+def _logistic_regression():
+    from sklearn.linear_model import LogisticRegression
+    return LogisticRegression(max_iter=1000)
+
+
+def _random_forest():
+    from sklearn.ensemble import RandomForestClassifier
+    return RandomForestClassifier(n_estimators=100, n_jobs=-1)
+
+
+def _xgboost():
+    from xgboost import XGBClassifier
+    return XGBClassifier(use_label_encoder=False, eval_metric='mlogloss', n_jobs=-1)
+
+
+def _svm():
+    from sklearn.svm import SVC
+    return SVC(probability=True)
+
+
+def _logistic_regression_fast():
+    from sklearn.linear_model import LogisticRegression
+    return LogisticRegression(solver="liblinear", tol=1e-3)
+
+
+def _random_forest_small():
+    from sklearn.ensemble import RandomForestClassifier
+    return RandomForestClassifier(n_estimators=50, min_samples_leaf=2, n_jobs=-1)
+
+
+def _hist_gradient_boosting():
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    return HistGradientBoostingClassifier(max_iter=200, early_stopping=True, validation_fraction=0.1, n_iter_no_change=10, random_state=0)
+
+
+def _linear_svm_calibrated():
+    from sklearn.svm import LinearSVC
+    from prediction.calibration import PlattCalibratedClassifier
+    return PlattCalibratedClassifier(LinearSVC())
+
+
+def _svm_calibrated():
+    from sklearn.svm import SVC
+    from prediction.calibration import PlattCalibratedClassifier
+    return PlattCalibratedClassifier(SVC())
+
+
+MODEL_FACTORIES = {
+    "Logistic Regression": _logistic_regression,
+    "Random Forest": _random_forest,
+    "XGBoost": _xgboost,
+    "SVM": _svm
+}
+
+# "accurate" garde les quatre modèles historiques ; "fast" et "balanced" remplacent la
+# validation croisée interne de SVC par une calibration sur un échantillon réservé
+PROFILES = {
+    "fast": {
+        "Logistic Regression": _logistic_regression_fast,
+        "Gradient Boosting": _hist_gradient_boosting,
+        "SVM": _linear_svm_calibrated
+    },
+    "balanced": {
+        "Logistic Regression": _logistic_regression,
+        "Random Forest": _random_forest_small,
+        "Gradient Boosting": _hist_gradient_boosting,
+        "SVM": _svm_calibrated
+    },
+    "accurate": MODEL_FACTORIES
+}
+DEFAULT_PROFILE = "accurate"
+
+
+# Fonction pour construire les modèles (non entraînés)
+def build_models(names=None, profile=DEFAULT_PROFILE):
+    """Retourne les classifieurs demandés du profil (par défaut tous), non entraînés."""
+    try:
+        factories = PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Profil inconnu : {profile} ({', '.join(PROFILES)})") from None
+    return {name: factories[name]() for name in (names or factories)}
+
+
+def profile_version(profile=DEFAULT_PROFILE):
+    """Empreinte courte des modèles d'un profil (classes et hyperparamètres) : change dès qu'un modèle change."""
+    h = hashlib.sha256()
+    for name, model in build_models(profile=profile).items():
+        h.update(repr((name, type(model).__name__, sorted(model.get_params().items()))).encode())
+    return h.hexdigest()[:16]
+
+
+# Fonction pour entraîner les modèles via le registre
+def train_models(X_train, y_train, registry=None, profile=DEFAULT_PROFILE):
+    """Entraîne (ou recharge depuis le registre) les classifieurs du profil."""
+    registry = registry or get_registry()
+    return {name: registry.fit(name, model, X_train, y_train) for name, model in build_models(profile=profile).items()}
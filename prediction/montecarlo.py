@@ -0,0 +1,85 @@
+"""Simulation Monte Carlo de la bankroll sous mise de Kelly fractionnaire."""
+
+import numpy as np
+import pandas as pd
+
+from prediction.odds import kelly_criterion
+
+DEFAULT_PATHS = 1_000_000
+DEFAULT_CHUNK_SIZE = 100_000
+DEFAULT_RUIN_LEVEL = 0.1
+KELLY_FRACTIONS = (0.2, 0.4, 0.6, 0.8, 1.0)
+DRAWDOWN_QUANTILES = (0.5, 0.9, 0.99)
+FINAL_QUANTILES = (0.05, 0.5, 0.95)
+
+
+def kelly_stake_fractions(cotes, probabilites, kelly_fraction):
+    """Part de la bankroll misée sur chaque pari (0 si l'avantage est négatif)."""
+    fractions = kelly_criterion(np.asarray(cotes, dtype=np.float64), np.asarray(probabilites, dtype=np.float64), 1.0, kelly_fraction)
+    return np.clip(fractions, 0.0, 0.999)
+
+
+def simulate_bankroll(cotes, probabilites, kelly_fractions=KELLY_FRACTIONS, n_paths=DEFAULT_PATHS, n_rounds=1,
+                      true_probabilites=None, ruin_level=DEFAULT_RUIN_LEVEL, chunk_size=DEFAULT_CHUNK_SIZE, seed=None):
+    """Simule `n_paths` séquences du bordereau (`cotes`, `probabilites`) répété `n_rounds` fois.
+
+    La mise suit kelly_criterion sur la bankroll courante, donc chaque pari
+    multiplie la bankroll par un facteur fixe : la trajectoire est une somme
+    cumulée de log-facteurs, calculée par blocs de `chunk_size` chemins. Les
+    issues sont tirées avec `true_probabilites` (par défaut les probabilités
+    estimées) et partagées entre toutes les fractions de Kelly.
+
+    Retourne un DataFrame indexé par fraction de Kelly : probabilité de ruine
+    (bankroll sous `ruin_level` fois la mise de départ à un moment), quantiles
+    du drawdown maximal, taux de croissance moyen par pari et quantiles de la
+    bankroll finale (en multiple de la bankroll initiale).
+    """
+    cotes = np.tile(np.asarray(cotes, dtype=np.float64), n_rounds)
+    probabilites = np.tile(np.asarray(probabilites, dtype=np.float64), n_rounds)
+    true_probabilites = probabilites if true_probabilites is None else np.tile(np.asarray(true_probabilites, dtype=np.float64), n_rounds)
+    if cotes.shape != probabilites.shape or cotes.shape != true_probabilites.shape:
+        raise ValueError("Les cotes et les probabilités doivent avoir la même longueur")
+    if np.any(cotes <= 1):
+        raise ValueError("Les cotes décimales doivent être supérieures à 1")
+    n_bets = len(cotes)
+    rng = np.random.default_rng(seed)
+
+    # Log-facteurs de croissance (gain, perte) de chaque pari pour chaque fraction
+    stakes = np.stack([kelly_stake_fractions(cotes, probabilites, f) for f in kelly_fractions])
+    log_win = np.log1p(stakes * (cotes - 1)).astype(np.float32)
+    log_loss = np.log1p(-stakes).astype(np.float32)
+    log_ruin = np.float32(np.log(ruin_level))
+
+    n_fractions = len(kelly_fractions)
+    final = np.empty((n_fractions, n_paths), dtype=np.float32)
+    drawdown = np.empty((n_fractions, n_paths), dtype=np.float32)
+    ruined = np.zeros(n_fractions, dtype=np.int64)
+    thresholds = true_probabilites.astype(np.float32)[:, None]
+    for start in range(0, n_paths, chunk_size):
+        stop = min(start + chunk_size, n_paths)
+        wins = rng.random((n_bets, stop - start), dtype=np.float32) < thresholds
+        # Trajectoires parcourues pari par pari sur des tableaux (fractions, chemins) préalloués
+        log_bankroll = np.zeros((n_fractions, stop - start), dtype=np.float32)
+        peak = np.zeros_like(log_bankroll)
+        worst_drawdown = np.zeros_like(log_bankroll)
+        lowest = np.zeros_like(log_bankroll)
+        for b in range(n_bets):
+            log_bankroll += np.where(wins[b], log_win[:, b, None], log_loss[:, b, None])
+            np.maximum(peak, log_bankroll, out=peak)
+            np.minimum(worst_drawdown, log_bankroll - peak, out=worst_drawdown)
+            np.minimum(lowest, log_bankroll, out=lowest)
+        final[:, start:stop] = log_bankroll
+        drawdown[:, start:stop] = worst_drawdown
+        ruined += np.count_nonzero(lowest <= log_ruin, axis=1)
+
+    report = {
+        "Probabilité de ruine": ruined / n_paths,
+        "Croissance par pari": final.mean(axis=1, dtype=np.float64) / n_bets
+    }
+    drawdown_quantiles = -np.expm1(np.quantile(drawdown, [1 - q for q in DRAWDOWN_QUANTILES], axis=1))
+    for q, values in zip(DRAWDOWN_QUANTILES, drawdown_quantiles):
+        report[f"Drawdown max p{int(q * 100)}"] = values
+    final_quantiles = np.exp(np.quantile(final, FINAL_QUANTILES, axis=1))
+    for q, values in zip(FINAL_QUANTILES, final_quantiles):
+        report[f"Bankroll finale p{int(q * 100)}"] = values
+    return pd.DataFrame(report, index=pd.Index(kelly_fractions, name="Fraction de Kelly"))
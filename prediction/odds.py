@@ -0,0 +1,135 @@
+"""Outils de cotes : probabilités implicites, marge du bookmaker, value bets et mise de Kelly."""
+
+import numpy as np
+
+
+def cotes_vers_probabilite(cote):
+    """Convertit une cote décimale en probabilité implicite."""
+    return 1 / cote
+
+
+def calculate_implied_prob(odds):
+    """Probabilité implicite d'une cote décimale (alias de cotes_vers_probabilite)."""
+    return cotes_vers_probabilite(odds)
+
+
+def enlever_marge(probabilites, marge):
+    """Enlève la marge du bookmaker des probabilités."""
+    total_probabilite = sum(probabilites)
+    facteur_correction = (1 - marge) / total_probabilite
+    return [p * facteur_correction for p in probabilites]
+
+
+def detect_value_bet(predicted_prob, implied_prob, threshold=0.05):
+    """Vrai si la probabilité estimée dépasse la probabilité implicite de plus de `threshold`."""
+    return predicted_prob > (implied_prob + threshold)
+
+
+def kelly_criterion(cote, probabilite, bankroll, kelly_fraction):
+    """Calcule la mise de Kelly."""
+    probabilite_avantage = probabilite * cote - 1
+    fraction = kelly_fraction * probabilite_avantage / (cote - 1)
+    return bankroll * fraction
+
+
+DEVIG_METHODS = ("proportional", "additive", "power", "shin")
+
+
+def pad_odds(markets):
+    """Tableau (marchés x issues) à partir de listes de cotes de longueurs différentes, complété par NaN."""
+    width = max((len(m) for m in markets), default=0)
+    odds = np.full((len(markets), width), np.nan)
+    for i, market in enumerate(markets):
+        odds[i, :len(market)] = market
+    return odds
+
+
+def _newton(f, x, lo, hi, tol, max_iter):
+    """Résout f(x) = 0 (f décroissante) pour tous les marchés à la fois, avec des itérations de Newton.
+
+    `f(x, lignes)` retourne (valeur, dérivée) ; un pas qui sort de
+    l'intervalle [lo, hi] encadrant la racine est remplacé par une bissection.
+    """
+    active = np.ones(x.shape, dtype=bool)
+    for _ in range(max_iter):
+        value, slope = f(x[active], active)
+        converged = np.abs(value) <= tol
+        xa, la, ha = x[active], lo[active], hi[active]
+        la = np.where(value > 0, xa, la)
+        ha = np.where(value < 0, xa, ha)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = xa - value / slope
+        bisect = ~np.isfinite(step) | (step <= la) | (step >= ha)
+        step = np.where(bisect, (la + ha) / 2, step)
+        x[active] = np.where(converged, xa, step)
+        lo[active], hi[active] = la, ha
+        if converged.all():
+            break
+        active[active] = ~converged
+    return x
+
+
+def remove_margin(odds, method="proportional", mask=None, tol=1e-12, max_iter=50):
+    """Probabilités sans marge pour un tableau de cotes décimales (marchés x issues).
+
+    Les cases hors de `mask` (par défaut : NaN ou cotes nulles) sont ignorées,
+    ce qui permet de mélanger des marchés à 2 et 3 issues. Les méthodes
+    puissance et Shin sont résolues par des itérations de Newton menées sur
+    tous les marchés en même temps. Retourne (probabilités, marge par marché).
+    """
+    if method not in DEVIG_METHODS:
+        raise ValueError(f"method doit valoir {', '.join(DEVIG_METHODS)}")
+    odds = np.atleast_2d(np.asarray(odds, dtype=np.float64))
+    if mask is None:
+        mask = np.isfinite(odds) & (odds > 0)
+    if np.any(odds[mask] <= 1):
+        raise ValueError("Les cotes décimales doivent être supérieures à 1")
+    implied = np.where(mask, 1 / np.where(mask, odds, 1.0), 0.0)
+    booksum = implied.sum(axis=1)
+    overround = booksum - 1
+    if method == "proportional":
+        fair = implied / booksum[:, None]
+    elif method == "additive":
+        # Marge retirée à parts égales ; les issues qui deviendraient négatives sont mises à zéro
+        n = mask.sum(axis=1)
+        fair = np.where(mask, np.clip(implied - (overround / n)[:, None], 0.0, None), 0.0)
+        fair /= fair.sum(axis=1)[:, None]
+    elif method == "power":
+        # p_i = pi_i^k avec k tel que sum p_i = 1, résolu sur log(sum p_i) pour éviter les débordements
+        log_implied = np.log(np.where(mask, implied, 1.0))
+
+        def f(k, rows):
+            exponents = np.where(mask[rows], k[:, None] * log_implied[rows], -np.inf)
+            top = exponents.max(axis=1)
+            weights = np.exp(exponents - top[:, None])
+            total = weights.sum(axis=1)
+            return np.log(total) + top, (weights * log_implied[rows]).sum(axis=1) / total
+
+        n = len(odds)
+        k = _newton(f, np.ones(n), np.full(n, -np.inf), np.full(n, np.inf), tol, max_iter)
+        fair = np.where(mask, np.exp(k[:, None] * log_implied), 0.0)
+    else:
+        # Modèle de Shin : z est la part des parieurs initiés, choisie pour que sum p_i = 1 ;
+        # sans marge (booksum <= 1), z vaut 0 et l'on revient au cas proportionnel
+        a = implied ** 2 / booksum[:, None]
+
+        def shin_probabilities(z, a):
+            root = np.sqrt(z[:, None] ** 2 + 4 * (1 - z[:, None]) * a)
+            return root, (root - z[:, None]) / (2 * (1 - z[:, None]))
+
+        def f(z, rows):
+            root, p = shin_probabilities(z, a[rows])
+            d_root = (z[:, None] - 2 * a[rows]) / np.where(root > 0, root, 1.0)
+            dp = ((d_root - 1) * (1 - z[:, None]) + (root - z[:, None])) / (2 * (1 - z[:, None]) ** 2)
+            m = mask[rows]
+            return np.where(m, p, 0.0).sum(axis=1) - 1, np.where(m, dp, 0.0).sum(axis=1)
+
+        margin = overround > 0
+        z = np.zeros(len(odds))
+        z[margin] = _newton(
+            lambda z, rows: f(z, np.flatnonzero(margin)[rows]), np.zeros(margin.sum()),
+            np.zeros(margin.sum()), np.ones(margin.sum()), tol, max_iter
+        )
+        fair = np.where(mask, shin_probabilities(z, a)[1], 0.0)
+        fair[~margin] = implied[~margin] / booksum[~margin, None]
+    return fair, overround
@@ -0,0 +1,227 @@
+"""Paris combinés et paris systèmes : distribution des sélections gagnantes, retour espéré et variance.
+
+Un bordereau est une suite de blocs indépendants. Un bloc est un mélange de
+scénarios (probabilité, sélections gagnantes) : deux scénarios pour une
+sélection seule, un par score pour plusieurs sélections du même match. Les
+combinaisons de k sélections sont comptées par les coefficients de
+polynômes multipliés bloc après bloc, sans énumérer les 2^N sous-ensembles.
+"""
+
+from math import comb
+
+import numpy as np
+import pandas as pd
+
+from prediction.markets import get_market_set
+
+# Paris systèmes usuels : (nombre de sélections, tailles des combinaisons jouées)
+SYSTEMS = {
+    "Trixie": (3, (2, 3)),
+    "Patent": (3, (1, 2, 3)),
+    "Yankee": (4, (2, 3, 4)),
+    "Lucky 15": (4, (1, 2, 3, 4)),
+    "Canadian": (5, (2, 3, 4, 5)),
+    "Lucky 31": (5, (1, 2, 3, 4, 5)),
+    "Heinz": (6, (2, 3, 4, 5, 6)),
+    "Lucky 63": (6, (1, 2, 3, 4, 5, 6)),
+    "Super Heinz": (7, (2, 3, 4, 5, 6, 7)),
+    "Goliath": (8, (2, 3, 4, 5, 6, 7, 8)),
+}
+
+
+def system_sizes(system, n_legs):
+    """Tailles des combinaisons d'un système : "combiné", "3/8", nom usuel (Yankee...) ou liste de tailles."""
+    if isinstance(system, str):
+        if system == "combiné":
+            return (n_legs,)
+        if system in SYSTEMS:
+            legs, sizes = SYSTEMS[system]
+            if legs != n_legs:
+                raise ValueError(f"{system} se joue sur {legs} sélections, pas {n_legs}")
+            return sizes
+        k, _, n = system.partition("/")
+        if not (k.isdigit() and n.isdigit()):
+            raise ValueError(f"Système inconnu : {system}")
+        if int(n) != n_legs:
+            raise ValueError(f"Le système {system} demande {n} sélections, pas {n_legs}")
+        system = (int(k),)
+    sizes = tuple(sorted(set(int(k) for k in system)))
+    if not sizes or sizes[0] < 1 or sizes[-1] > n_legs:
+        raise ValueError(f"Tailles de combinaison entre 1 et {n_legs} attendues")
+    return sizes
+
+
+def winning_legs_distribution(probabilities):
+    """Loi du nombre de sélections gagnantes (N, L) -> (N, L + 1) pour des sélections indépendantes, en O(L²)."""
+    p = np.atleast_2d(np.asarray(probabilities, dtype=np.float64))
+    p = np.where(np.isnan(p), 0.0, p)
+    dist = np.zeros((len(p), p.shape[1] + 1))
+    dist[:, 0] = 1.0
+    for leg in range(p.shape[1]):
+        q = p[:, leg, None]
+        dist[:, 1:] = dist[:, 1:] * (1 - q) + dist[:, :-1] * q
+        dist[:, 0] *= 1 - q[:, 0]
+    return dist
+
+
+def independent_blocks(probabilities, odds):
+    """Blocs (poids, gagnantes, cotes) de sélections indépendantes ; une cote NaN marque une case vide."""
+    p = np.atleast_2d(np.asarray(probabilities, dtype=np.float64))
+    odds = np.atleast_2d(np.asarray(odds, dtype=np.float64))
+    if p.shape != odds.shape:
+        raise ValueError("Les cotes et les probabilités doivent avoir la même forme")
+    present = np.isfinite(odds)
+    if np.any(odds[present] <= 1):
+        raise ValueError("Les cotes décimales doivent être supérieures à 1")
+    if np.any((p[present] < 0) | (p[present] > 1)):
+        raise ValueError("Les probabilités doivent être comprises entre 0 et 1")
+    # Case vide : un seul scénario certain, sans sélection gagnante (bloc neutre)
+    p = np.where(present, p, 0.0)
+    weights = np.stack([p, np.where(present, 1 - p, 1.0)], axis=-1)
+    wins = np.zeros(p.shape + (2, 1), dtype=bool)
+    wins[..., 0, 0] = present
+    return weights, wins, np.where(present, odds, 0.0)[..., None]
+
+
+def same_game_block(tensor, selections, odds):
+    """Bloc de plusieurs sélections d'un même match, corrélées par la matrice des scores.
+
+    `selections` est une liste de (marché, sélection) de MarketSet. Seules
+    les sélections entièrement gagnées ou perdues selon le score sont
+    acceptées (pas de remboursement ni de demi-gain).
+    """
+    tensor = np.asarray(tensor, dtype=np.float64)
+    markets = get_market_set(tensor.shape[-1])
+    missing = [key for key in selections if tuple(key) not in markets.index]
+    if missing:
+        raise ValueError("Marchés inconnus : " + ", ".join(f"{m} / {s}" for m, s in missing))
+    columns = [markets.index[tuple(key)] for key in selections]
+    win, refund = markets.win[:, columns], markets.refund[:, columns]
+    partial = np.any((win != np.round(win)) | (refund > 0), axis=0)
+    if np.any(partial):
+        raise ValueError("Sélections avec remboursement possible : " + ", ".join(
+            f"{m} / {s}" for (m, s), bad in zip(selections, partial) if bad))
+    odds = np.asarray(odds, dtype=np.float64)
+    if len(odds) != len(columns) or np.any(odds <= 1):
+        raise ValueError("Une cote décimale supérieure à 1 est attendue par sélection")
+    return tensor.ravel(), win.astype(bool), odds
+
+
+def stack_slips(slips):
+    """Empile des bordereaux (listes de blocs (poids, gagnantes, cotes)) en tableaux complétés par des blocs neutres."""
+    n_blocks = max(len(slip) for slip in slips)
+    n_scenarios = max(len(w) for slip in slips for w, _, _ in slip)
+    n_legs = max(len(o) for slip in slips for _, _, o in slip)
+    weights = np.zeros((len(slips), n_blocks, n_scenarios))
+    weights[:, :, 0] = 1.0
+    wins = np.zeros((len(slips), n_blocks, n_scenarios, n_legs), dtype=bool)
+    odds = np.zeros((len(slips), n_blocks, n_legs))
+    for i, slip in enumerate(slips):
+        for b, (w, won, o) in enumerate(slip):
+            weights[i, b] = 0.0
+            weights[i, b, :len(w)] = w
+            wins[i, b, :len(w), :len(o)] = won
+            odds[i, b, :len(o)] = o
+    return weights, wins, odds
+
+
+def slip_polynomials(weights, wins, odds, max_size=None):
+    """Polynômes générateurs d'un lot de bordereaux (M, B blocs, S scénarios, L sélections).
+
+    Retourne (loi du nombre de sélections gagnantes (M, D + 1), E[retour des
+    combinaisons de taille k] (M, D + 1), E[retour taille a x retour taille b]
+    (M, D + 1, D + 1)), avec une mise de 1 par combinaison. Conditionnellement
+    à un scénario les sélections sont certaines, donc le retour des
+    combinaisons de taille k est le k-ième coefficient de prod(1 + cote x) sur
+    les sélections gagnantes ; les blocs indépendants se multiplient. La
+    première loi coûte O(N²), les moments d'ordre deux O(N x D²) où D est
+    `max_size` (la plus grande taille de combinaison utile).
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    wins = np.asarray(wins, dtype=bool)
+    odds = np.asarray(odds, dtype=np.float64)
+    n_slips, n_blocks, _, n_legs = wins.shape
+    degree = n_blocks * n_legs
+    size = degree if max_size is None else min(max_size, degree)
+
+    # Polynôme de chaque scénario : prod(1 + cote x) sur ses sélections gagnantes
+    paid = wins * odds[:, :, None, :]
+    scenario = np.zeros(wins.shape[:3] + (n_legs + 1,))
+    scenario[..., 0] = 1.0
+    for leg in range(n_legs):
+        scenario[..., 1:] = scenario[..., 1:] + paid[..., leg, None] * scenario[..., :-1]
+    block_count = np.einsum("mbs,mbsk->mbk", weights, wins.sum(axis=-1)[..., None] == np.arange(n_legs + 1))
+    block_return = np.einsum("mbs,mbsk->mbk", weights, scenario)
+    block_second = np.einsum("mbs,mbsi,mbsj->mbij", weights, scenario, scenario)
+
+    # Les bordereaux sont sur le dernier axe : les décalages de coefficients restent des blocs contigus
+    block_count = np.moveaxis(block_count, 0, -1)
+    block_return = np.moveaxis(block_return, 0, -1)
+    block_second = np.moveaxis(block_second, 0, -1)
+    count = np.zeros((degree + 1, n_slips))
+    count[0] = 1.0
+    returns = np.zeros((size + 1, n_slips))
+    returns[0] = 1.0
+    second = np.zeros((size + 1, size + 1, n_slips))
+    second[0, 0] = 1.0
+    for b in range(n_blocks):
+        # Degré atteint avant ce bloc : les coefficients au-delà sont encore nuls
+        top = b * n_legs
+        count_next = np.zeros_like(count)
+        returns_next = np.zeros_like(returns)
+        second_next = np.zeros_like(second)
+        for i in range(n_legs + 1):
+            count_next[i:i + top + 1] += count[:top + 1] * block_count[b, i]
+            if i > size:
+                continue
+            rows = min(top, size - i) + 1
+            returns_next[i:i + rows] += returns[:rows] * block_return[b, i]
+            for j in range(min(n_legs, size) + 1):
+                cols = min(top, size - j) + 1
+                second_next[i:i + rows, j:j + cols] += second[:rows, :cols] * block_second[b, i, j]
+        count, returns, second = count_next, returns_next, second_next
+    return count.T, returns.T, np.moveaxis(second, -1, 0)
+
+
+def price_slips(weights, wins, odds, sizes=None):
+    """Mise, retour espéré, écart type et probabilité de retour de chaque bordereau d'un lot.
+
+    `sizes` liste les tailles de combinaison jouées (1 de mise par
+    combinaison) ; None joue le combiné de toutes les sélections de chaque
+    bordereau.
+    """
+    # Nombre de sélections réelles de chaque bordereau : une sélection a une cote non nulle
+    n_legs = (np.asarray(odds) > 0).sum(axis=(1, 2))
+    max_size = int(n_legs.max()) if sizes is None else max(sizes)
+    count, returns, second = slip_polynomials(weights, wins, odds, max_size)
+    played = np.zeros(returns.shape, dtype=bool)
+    if sizes is None:
+        played[np.arange(len(n_legs)), n_legs] = True
+    else:
+        played[:, list(sizes)] = True
+    stake = np.array([sum(comb(int(n), k) for k in np.flatnonzero(row)) for n, row in zip(n_legs, played)], dtype=np.float64)
+    expected = (returns * played).sum(axis=1)
+    variance = np.einsum("mi,mij,mj->m", played, second, played) - expected ** 2
+    # Au moins une combinaison payée dès que la plus petite taille jouée est atteinte
+    smallest = played.argmax(axis=1)
+    paid = np.cumsum(count[:, ::-1], axis=1)[:, ::-1][np.arange(len(count)), smallest]
+    return pd.DataFrame({
+        "Sélections": n_legs,
+        "Mise": stake,
+        "Retour espéré": expected,
+        "Gain espéré": expected - stake,
+        "Rendement": expected / stake - 1,
+        "Écart type": np.sqrt(np.maximum(variance, 0.0)),
+        "P(retour > 0)": paid
+    })
+
+
+def price_system(probabilities, odds, system="combiné"):
+    """Paris systèmes sur des sélections indépendantes : une ligne par bordereau (M, N), NaN pour les cases vides."""
+    weights, wins, odds = independent_blocks(probabilities, odds)
+    if isinstance(system, str) and system == "combiné":
+        return price_slips(weights, wins, odds)
+    n_legs = (odds > 0).sum(axis=(1, 2))
+    if np.any(n_legs != n_legs.max()):
+        raise ValueError("Un système demande le même nombre de sélections sur chaque bordereau")
+    return price_slips(weights, wins, odds, system_sizes(system, int(n_legs.max())))
@@ -0,0 +1,62 @@
+"""Moteur de Poisson vectorisé : matrices de scores pour N matchs à la fois."""
+
+import numpy as np
+
+DEFAULT_MAX_GOALS = 6
+
+
+def goal_probabilities(expected_goals, max_goals=DEFAULT_MAX_GOALS, fold_tail=False):
+    """Probabilités P(k buts), k < max_goals, pour chaque espérance de buts.
+
+    Retourne un tableau (N, max_goals). Avec `fold_tail`, la masse
+    P(k >= max_goals) est ajoutée à la dernière case.
+    """
+    lam = np.atleast_1d(np.asarray(expected_goals, dtype=np.float64))
+    if max_goals < 1:
+        raise ValueError("max_goals doit être au moins 1")
+    if np.any(lam < 0) or not np.all(np.isfinite(lam)):
+        raise ValueError("Les espérances de buts doivent être positives et finies")
+    # Récurrence p(k) = p(k-1) * lam / k, sans boucle Python
+    ratios = np.empty((lam.shape[0], max_goals))
+    ratios[:, 0] = 1.0
+    ratios[:, 1:] = lam[:, None] / np.arange(1, max_goals)
+    probs = np.exp(-lam)[:, None] * np.cumprod(ratios, axis=1)
+    if fold_tail:
+        probs[:, -1] += np.clip(1.0 - probs.sum(axis=1), 0.0, None)
+    return probs
+
+
+def scoreline_tensor(home_expected_goals, away_expected_goals, max_goals=DEFAULT_MAX_GOALS, fold_tail=False, rho=0.0):
+    """Tenseur (N, G, G) des probabilités de score domicile x extérieur.
+
+    Un `rho` non nul applique la correction de Dixon-Coles aux scores 0-0,
+    1-0, 0-1 et 1-1.
+    """
+    home = goal_probabilities(home_expected_goals, max_goals, fold_tail)
+    away = goal_probabilities(away_expected_goals, max_goals, fold_tail)
+    if home.shape[0] != away.shape[0]:
+        raise ValueError("Les tableaux domicile et extérieur doivent avoir la même longueur")
+    tensor = home[:, :, None] * away[:, None, :]
+    if np.any(rho) and max_goals >= 2:
+        lam = np.broadcast_to(np.asarray(home_expected_goals, dtype=np.float64), home.shape[:1])
+        mu = np.broadcast_to(np.asarray(away_expected_goals, dtype=np.float64), away.shape[:1])
+        tensor[:, 0, 0] *= np.maximum(1 - lam * mu * rho, 0.0)
+        tensor[:, 0, 1] *= np.maximum(1 + lam * rho, 0.0)
+        tensor[:, 1, 0] *= np.maximum(1 + mu * rho, 0.0)
+        tensor[:, 1, 1] *= np.maximum(1 - rho, 0.0)
+    return tensor
+
+
+def outcome_probabilities(tensor):
+    """Probabilités (N, 3) victoire domicile / nul / victoire extérieur."""
+    tensor = np.asarray(tensor)
+    if tensor.ndim == 2:
+        tensor = tensor[None]
+    goals = tensor.shape[-1]
+    home_win = np.tril(np.ones((goals, goals), dtype=bool), k=-1)
+    draw = np.eye(goals, dtype=bool)
+    return np.stack([
+        tensor[:, home_win].sum(axis=1),
+        tensor[:, draw].sum(axis=1),
+        tensor[:, home_win.T].sum(axis=1),
+    ], axis=1)
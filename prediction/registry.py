@@ -0,0 +1,279 @@
+"""Registre des modèles entraînés : pool partagé en lecture seule, budget mémoire et stockage sur disque."""
+
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import numpy as np
+
+from prediction.metrics import increment
+
+DEFAULT_STORE_DIR = os.environ.get("MODEL_STORE_DIR", "model_store")
+DEFAULT_MAX_ENTRIES = int(os.environ.get("MODEL_CACHE_SIZE", "32"))
+# Budget des modèles en mémoire privée du processus (les tableaux projetés depuis le disque n'y comptent pas)
+DEFAULT_MAX_BYTES = int(os.environ.get("MODEL_CACHE_BYTES", str(512 * 2**20)))
+# Prédictions simultanées autorisées, toutes sessions confondues
+DEFAULT_MAX_INFERENCE = int(os.environ.get("MODEL_MAX_INFERENCE", str(os.cpu_count() or 1)))
+
+# Paramètres sans effet sur le modèle entraîné, exclus de l'empreinte
+_RUNTIME_PARAMS = {"n_jobs", "nthread", "verbose", "verbosity"}
+
+
+def fingerprint(name, estimator, X, y):
+    """Empreinte des données d'entraînement et des hyperparamètres d'un modèle."""
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.ascontiguousarray(y)
+    h = hashlib.sha256()
+    h.update(name.encode())
+    h.update(type(estimator).__name__.encode())
+    params = {k: v for k, v in estimator.get_params().items() if k not in _RUNTIME_PARAMS}
+    h.update(repr(sorted(params.items())).encode())
+    h.update(repr((X.shape, y.shape, str(y.dtype))).encode())
+    h.update(X.tobytes())
+    h.update(y.tobytes())
+    return h.hexdigest()
+
+
+def _mapped_bytes(obj, depth=4):
+    """Octets des tableaux projetés (np.memmap) atteignables depuis `obj` : attributs, listes et dictionnaires."""
+    if isinstance(obj, np.memmap):
+        return obj.nbytes
+    if depth == 0 or isinstance(obj, (str, bytes, np.ndarray)):
+        return 0
+    if isinstance(obj, dict):
+        children = obj.values()
+    elif isinstance(obj, (list, tuple)):
+        children = obj
+    elif hasattr(obj, "__dict__"):
+        children = vars(obj).values()
+    else:
+        return 0
+    return sum(_mapped_bytes(child, depth - 1) for child in children)
+
+
+def process_memory():
+    """Mémoire résidente du processus en octets : totale, privée (anonyme) et projetée depuis des fichiers."""
+    try:
+        with open("/proc/self/status") as f:
+            fields = dict(line.split(":", 1) for line in f if line.startswith(("VmRSS", "RssAnon", "RssFile")))
+        kib = {k: int(v.split()[0]) * 1024 for k, v in fields.items()}
+        return {"rss": kib.get("VmRSS"), "rss_anon": kib.get("RssAnon"), "rss_file": kib.get("RssFile")}
+    except (OSError, ValueError):
+        import resource
+        # Hors Linux : pic de mémoire résidente seulement
+        return {"rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024, "rss_anon": None, "rss_file": None}
+
+
+class ModelRegistry:
+    """Pool des modèles entraînés, indexés par empreinte et partagés en lecture seule par toutes les sessions.
+
+    Les modèles sont persistés dans `store_dir` puis rechargés avec leurs
+    tableaux projetés en mémoire (mmap en copie à l'écriture, le fichier
+    n'est jamais modifié) : les processus qui servent l'application
+    partagent ces pages au lieu d'en garder chacun une copie. En mémoire,
+    les moins récemment utilisés sont évincés au-delà de `max_entries`
+    modèles ou de `max_bytes` octets privés (le dernier modèle est toujours
+    gardé). Des demandes simultanées d'un même modèle ne l'entraînent
+    qu'une fois, et `inference()` limite à `max_inference` les
+    prédictions simultanées.
+    """
+
+    def __init__(self, store_dir=DEFAULT_STORE_DIR, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES,
+                 max_inference=DEFAULT_MAX_INFERENCE):
+        self.store_dir = store_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_inference = max_inference
+        self._models = OrderedDict()
+        self._bytes = 0
+        self._mapped = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._inference = threading.BoundedSemaphore(max_inference)
+        self._active = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.inference_waits = 0
+        if store_dir:
+            os.makedirs(store_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.store_dir, f"{key}.joblib")
+
+    def _remember(self, key, model, size):
+        """Garde `model` ; `size` est la taille de son artefact (projection comprise)."""
+        mapped = _mapped_bytes(model)
+        private = max(size - mapped, 0)
+        with self._lock:
+            old = self._models.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+                self._mapped -= old[2]
+            self._models[key] = (model, private, mapped)
+            self._bytes += private
+            self._mapped += mapped
+            while self._models and (len(self._models) > self.max_entries or (self._bytes > self.max_bytes and len(self._models) > 1)):
+                _, (_, private, mapped) = self._models.popitem(last=False)
+                self._bytes -= private
+                self._mapped -= mapped
+                self.evictions += 1
+
+    def _load(self, key):
+        import joblib
+        path = self._path(key)
+        # Copie à l'écriture : les pages restent partagées tant que personne n'écrit, et les
+        # bibliothèques qui exigent un tampon modifiable (libsvm) acceptent les tableaux
+        model = joblib.load(path, mmap_mode="c")
+        self._remember(key, model, os.path.getsize(path))
+        return model
+
+    def get(self, key):
+        """Retourne le modèle associé à `key` (mémoire puis disque) ou None."""
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                return entry[0]
+        if self.store_dir and os.path.exists(self._path(key)):
+            try:
+                return self._load(key)
+            except Exception:
+                # Artefact corrompu ou incompatible : on le réentraînera
+                return None
+        return None
+
+    def put(self, key, model):
+        """Ajoute un modèle entraîné au pool et l'écrit sur disque ; retourne l'exemplaire partagé.
+
+        Avec un stockage sur disque, l'exemplaire partagé est celui relu avec
+        ses tableaux projetés : la copie entraînée en mémoire est libérée.
+        """
+        if self.store_dir:
+            import joblib
+            tmp = f"{self._path(key)}.{os.getpid()}.tmp"
+            joblib.dump(model, tmp)
+            os.replace(tmp, self._path(key))
+            try:
+                return self._load(key)
+            except Exception:
+                pass
+        if self.max_entries > 0:
+            self._remember(key, model, len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)))
+        return model
+
+    def fit(self, name, estimator, X, y):
+        """Retourne `estimator` entraîné sur (X, y), depuis le pool si possible (un seul entraînement par empreinte)."""
+        key = fingerprint(name, estimator, X, y)
+        model = self.get(key)
+        with self._lock:
+            if model is None:
+                # Revérifié sous le verrou : un entraînement a pu se terminer depuis self.get
+                entry = self._models.get(key)
+                model = entry[0] if entry is not None else None
+            if model is not None:
+                self.hits += 1
+            else:
+                future = self._inflight.get(key)
+                owner = future is None
+                if owner:
+                    future = self._inflight[key] = Future()
+                else:
+                    self.coalesced += 1
+        if model is not None:
+            increment("model_cache_hits")
+            return model
+        if not owner:
+            increment("model_cache_coalesced")
+            return future.result()
+
+        try:
+            # Le modèle a pu être écrit sur disque puis évincé de la mémoire juste avant
+            model = self.get(key)
+            with self._lock:
+                if model is not None:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            if model is not None:
+                increment("model_cache_hits")
+            else:
+                increment("model_cache_misses")
+                model = self.put(key, estimator.fit(X, y))
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(model)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+        return model
+
+    @contextmanager
+    def inference(self):
+        """Réserve l'une des `max_inference` places de prédiction simultanée (attend si toutes sont prises)."""
+        if not self._inference.acquire(blocking=False):
+            with self._lock:
+                self.inference_waits += 1
+            increment("model_inference_waits")
+            self._inference.acquire()
+        with self._lock:
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+            self._inference.release()
+
+    def stats(self):
+        """Mémoire des modèles de ce processus (privée et projetée), compteurs et mémoire résidente."""
+        with self._lock:
+            stats = {
+                "models": len(self._models),
+                "private_bytes": self._bytes,
+                "mapped_bytes": self._mapped,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "coalesced": self.coalesced,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "inference_active": self._active,
+                "max_inference": self.max_inference,
+                "inference_waits": self.inference_waits
+            }
+        stats.update(process_memory())
+        return stats
+
+    def clear(self):
+        """Vide le pool en mémoire (les artefacts sur disque sont conservés)."""
+        with self._lock:
+            self._models.clear()
+            self._bytes = 0
+            self._mapped = 0
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Registre partagé par toutes les sessions du processus."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
+
+
+def set_registry(registry):
+    """Remplace le registre partagé (benchmarks, répertoire de stockage dédié)."""
+    global _registry
+    with _registry_lock:
+        _registry = registry
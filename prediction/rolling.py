@@ -0,0 +1,185 @@
+"""Caractéristiques glissantes des équipes, mises à jour match par match (sans regard vers le futur)."""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_WINDOW = 5
+DEFAULT_HALFLIFE = 5.0
+# Statistiques par équipe (noms de app.py) ; les points sont déduits du score
+BASE_STATS = ("goals", "encais")
+OPTIONAL_STATS = ("xG", "tirs_cadres", "possession")
+# Colonnes domicile / extérieur acceptées pour chaque statistique optionnelle
+STAT_COLUMNS = {
+    "xG": (("home_xG", "away_xG"),),
+    "tirs_cadres": (("home_tirs_cadres", "away_tirs_cadres"), ("HST", "AST")),
+    "possession": (("home_possession", "away_possession"),)
+}
+
+
+class RollingFeatureEngine:
+    """Moyennes glissantes et moyennes exponentielles par équipe, en O(1) par match.
+
+    Chaque équipe a un tampon circulaire préalloué des `window` derniers
+    matchs et une somme courante ; un nouveau match remplace la valeur la plus
+    ancienne du tampon au lieu de recalculer la fenêtre. Une statistique
+    manquante (NaN) est ignorée : la moyenne porte sur les valeurs présentes
+    de la fenêtre et la moyenne exponentielle garde sa valeur précédente. Elle
+    ne vaut NaN que si aucune valeur n'est connue.
+    """
+
+    def __init__(self, teams, stats=BASE_STATS, window=DEFAULT_WINDOW, halflife=DEFAULT_HALFLIFE):
+        self.teams = list(teams)
+        self.stats = tuple(stats) + ("points",)
+        if self.stats[:2] != BASE_STATS:
+            raise ValueError("Les statistiques doivent commencer par goals et encais")
+        self.window = window
+        self.alpha = 1 - 0.5 ** (1 / halflife)
+        n_teams, n_stats = len(self.teams), len(self.stats)
+        self._codes = {team: i for i, team in enumerate(self.teams)}
+        self._buffer = np.zeros((n_teams, window, n_stats))
+        self._sums = np.zeros((n_teams, n_stats))
+        self._ewm = np.zeros((n_teams, n_stats))
+        # Valeurs présentes dans la fenêtre, et statistiques déjà vues une fois (moyenne exponentielle amorcée)
+        self._valid = np.zeros((n_teams, n_stats), dtype=np.int64)
+        self._seen = np.zeros((n_teams, n_stats), dtype=bool)
+        self._position = np.zeros(n_teams, dtype=np.int64)
+        self._count = np.zeros(n_teams, dtype=np.int64)
+
+    @property
+    def feature_names(self):
+        """Noms des caractéristiques : moyennes sur la fenêtre, forme récente, moyennes exponentielles."""
+        rolling = [s for s in self.stats if s != "points"]
+        return rolling + ["forme_recente"] + [f"{s}_ewm" for s in self.stats] + ["matchs_joues"]
+
+    def code(self, team):
+        try:
+            return self._codes[team]
+        except KeyError:
+            raise KeyError(f"Équipe inconnue : {team}") from None
+
+    def snapshot(self, codes):
+        """Caractéristiques courantes (avant le prochain match) des équipes `codes`."""
+        codes = np.atleast_1d(codes)
+        features = np.empty((len(codes), len(self.feature_names)))
+        for row, code in zip(features, codes):
+            self._write_snapshot(code, row)
+        return features
+
+    def _write_snapshot(self, code, row):
+        n_stats = len(self.stats)
+        count = self._count[code]
+        sums, valid = self._sums[code], self._valid[code]
+        row[:n_stats - 1] = sums[:-1] / np.maximum(valid[:-1], 1)
+        row[n_stats - 1] = sums[-1]
+        row[n_stats:2 * n_stats] = self._ewm[code]
+        if count:
+            # Équipe déjà vue mais statistique jamais renseignée : inconnue plutôt que nulle
+            row[:n_stats - 1][valid[:-1] == 0] = np.nan
+            row[n_stats:2 * n_stats][~self._seen[code]] = np.nan
+        row[-1] = count
+
+    def _record(self, code, values):
+        position = self._position[code]
+        present = np.isfinite(values)
+        if self._count[code] >= self.window:
+            old = self._buffer[code, position]
+            old_present = np.isfinite(old)
+            self._sums[code] += np.where(present, values, 0.0) - np.where(old_present, old, 0.0)
+            self._valid[code] += present.astype(np.int64) - old_present
+        else:
+            self._sums[code] += np.where(present, values, 0.0)
+            self._valid[code] += present
+        self._buffer[code, position] = values
+        self._position[code] = (position + 1) % self.window
+        ewm, seen = self._ewm[code], self._seen[code]
+        ewm[:] = np.where(~present, ewm, np.where(seen, ewm + self.alpha * (values - ewm), values))
+        seen |= present
+        self._count[code] += 1
+
+    def update(self, home, away, home_values, away_values):
+        """Intègre un match : `*_values` suit l'ordre de `stats` sans les points."""
+        values = np.empty((2, len(self.stats)))
+        values[0, :-1] = home_values
+        values[1, :-1] = away_values
+        goal_diff = values[0, 0] - values[0, 1]
+        values[:, -1] = (3.0, 0.0) if goal_diff > 0 else (1.0, 1.0) if goal_diff == 0 else (0.0, 3.0)
+        self._record(home, values[0])
+        self._record(away, values[1])
+
+    def recent(self, team, stat="goals"):
+        """Dernières valeurs (au plus `window`) d'une statistique, de la plus ancienne à la plus récente."""
+        code = self.code(team)
+        filled = min(self._count[code], self.window)
+        order = (self._position[code] - filled + np.arange(filled)) % self.window
+        return self._buffer[code, order, self.stats.index(stat)]
+
+    def featurize(self, home_codes, away_codes, home_values, away_values):
+        """Une passe linéaire sur des matchs triés par date.
+
+        Retourne les caractéristiques (N, F) de chaque équipe telles qu'elles
+        étaient juste avant chaque match, puis intègre le match.
+        """
+        n = len(home_codes)
+        home_features = np.empty((n, len(self.feature_names)))
+        away_features = np.empty_like(home_features)
+        for i in range(n):
+            self._write_snapshot(home_codes[i], home_features[i])
+            self._write_snapshot(away_codes[i], away_features[i])
+            self.update(home_codes[i], away_codes[i], home_values[i], away_values[i])
+        return home_features, away_features
+
+
+def _stat_columns(available):
+    """Colonnes domicile / extérieur de chaque statistique présente parmi les colonnes `available`."""
+    columns = {"goals": ("home_goals", "away_goals"), "encais": ("away_goals", "home_goals")}
+    for stat in OPTIONAL_STATS:
+        for home, away in STAT_COLUMNS[stat]:
+            if home in available and away in available:
+                columns[stat] = (home, away)
+                break
+    return columns
+
+
+def _featurize(teams, home_codes, away_codes, column, columns, window, halflife):
+    engine = RollingFeatureEngine(teams, stats=tuple(columns), window=window, halflife=halflife)
+    home_values = np.column_stack([np.asarray(column(h), dtype=np.float64) for h, _ in columns.values()])
+    away_values = np.column_stack([np.asarray(column(a), dtype=np.float64) for _, a in columns.values()])
+    home_features, away_features = engine.featurize(home_codes, away_codes, home_values, away_values)
+    return engine, np.hstack([home_features, away_features])
+
+
+def _prefixed(names):
+    return [f"home_{n}" for n in names] + [f"away_{n}" for n in names]
+
+
+def featurize_matches(matches, window=DEFAULT_WINDOW, halflife=DEFAULT_HALFLIFE):
+    """Caractéristiques pré-match (home_*/away_*) de chaque ligne d'un DataFrame de matchs.
+
+    `matches` suit le format du magasin historique (date, home_team,
+    away_team, home_goals, away_goals, statistiques facultatives) ; les lignes
+    sont traitées dans l'ordre chronologique. Retourne (caractéristiques, moteur).
+    """
+    matches = matches.sort_values("date", kind="stable")
+    teams = sorted(set(matches["home_team"]) | set(matches["away_team"]))
+    codes = {team: i for i, team in enumerate(teams)}
+    engine, features = _featurize(
+        teams, matches["home_team"].map(codes).to_numpy(), matches["away_team"].map(codes).to_numpy(),
+        lambda name: matches[name].to_numpy(), _stat_columns(set(matches.columns)), window, halflife
+    )
+    features = pd.DataFrame(features, columns=_prefixed(engine.feature_names), index=matches.index)
+    return features.sort_index(), engine
+
+
+def featurize_store(store, before=None, window=DEFAULT_WINDOW, halflife=DEFAULT_HALFLIFE):
+    """Même passe sur le magasin historique (matchs joués avant `before`), sans passer par un DataFrame.
+
+    Retourne (caractéristiques (N, 2F), noms des colonnes, moteur) ; le moteur
+    contient alors l'état courant de chaque équipe.
+    """
+    rows = store.date_range(None, before)
+    available = set(store.feature_columns) | {"home_goals", "away_goals"}
+    engine, features = _featurize(
+        store.teams, store.column("home_team", rows), store.column("away_team", rows),
+        lambda name: store.column(name, rows), _stat_columns(available), window, halflife
+    )
+    return features, _prefixed(engine.feature_names), engine
@@ -0,0 +1,115 @@
+"""Schéma typé des caractéristiques d'équipe, partagé par les deux pages, le mode matchday et le service.
+
+L'ordre des colonnes est fixé une fois pour toutes : un vecteur de match est
+[caractéristiques domicile, caractéristiques extérieur], en float64 contigu.
+"""
+
+from operator import itemgetter
+
+import numpy as np
+
+# Bornes des caractéristiques d'une équipe (identiques aux champs de app.py)
+TEAM_BOUNDS = {
+    'goals': (0.0, 5.0),
+    'xG': (0.0, 5.0),
+    'encais': (0.0, 5.0),
+    'possession': (0.0, 100.0),
+    'tirs_par_match': (0, 30),
+    'passes_cles_par_match': (0, 50),
+    'tirs_cadres': (0, 15),
+    'touches_surface': (0, 300),
+    'duels_defensifs': (0, 100),
+    'passes_reussies': (0.0, 100.0),
+    'forme_recente': (0, 15),
+    'victories': (0, 20),
+    'fautes_commises': (0, 30),
+    'interceptions': (0, 30)
+}
+
+# Statistiques d'équipe de tools.py (clés de st.session_state.data sans le suffixe _A / _B)
+TOOLS_BOUNDS = {
+    name: (0.0, np.inf) for name in (
+        'score_rating', 'buts_par_match', 'buts_concedes_par_match', 'possession_moyenne', 'expected_but',
+        'expected_concedes', 'tirs_cadres', 'grandes_chances', 'passes_reussies', 'corners', 'interceptions',
+        'tacles_reussis', 'fautes', 'cartons_jaunes', 'cartons_rouges'
+    )
+}
+
+
+class FeatureSchema:
+    """Colonnes d'une équipe : noms, bornes et disposition des vecteurs de match."""
+
+    __slots__ = ("names", "bounds", "lower", "upper", "_getter")
+
+    def __init__(self, bounds):
+        self.names = tuple(bounds)
+        self.bounds = dict(bounds)
+        self.lower = np.array([low for low, _ in self.bounds.values()], dtype=np.float64)
+        self.upper = np.array([high for _, high in self.bounds.values()], dtype=np.float64)
+        self._getter = itemgetter(*self.names)
+
+    @property
+    def width(self):
+        return len(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def subset(self, names):
+        """Schéma réduit à `names`, dans cet ordre."""
+        return FeatureSchema({name: self.bounds[name] for name in names})
+
+    def columns(self, prefix="", suffix=""):
+        return [f"{prefix}{name}{suffix}" for name in self.names]
+
+    def match_columns(self, sides=("home_", "away_"), suffixes=("", "")):
+        """Colonnes d'un vecteur de match : domicile puis extérieur."""
+        return [c for prefix, suffix in zip(sides, suffixes) for c in self.columns(prefix, suffix)]
+
+    def vector(self, values, prefix="", suffix=""):
+        """Vecteur (F,) d'une équipe depuis un dictionnaire (clés `prefix` + nom + `suffix`)."""
+        getter = self._getter if not (prefix or suffix) else itemgetter(*self.columns(prefix, suffix))
+        try:
+            row = getter(values)
+        except KeyError as e:
+            raise ValueError(f"Caractéristique manquante : {e.args[0]}") from None
+        try:
+            return np.array(row if len(self.names) > 1 else (row,), dtype=np.float64)
+        except (TypeError, ValueError):
+            raise ValueError("Les caractéristiques d'une équipe doivent être numériques") from None
+
+    def matrix(self, teams):
+        """Matrice (N, F) d'une liste de dictionnaires d'équipe."""
+        return np.stack([self.vector(team) for team in teams]) if len(teams) else np.empty((0, self.width))
+
+    def match_vector(self, values, suffixes=("_A", "_B")):
+        """Vecteur (1, 2F) d'un match décrit par un seul dictionnaire (clés suffixées, comme dans tools.py)."""
+        return np.concatenate([self.vector(values, suffix=suffix) for suffix in suffixes])[None]
+
+    def from_frame(self, frame, prefix=""):
+        """Matrice (N, F) contiguë des colonnes `prefix` + nom d'un DataFrame."""
+        missing = [c for c in self.columns(prefix) if c not in frame.columns]
+        if missing:
+            raise ValueError(f"Colonnes manquantes : {', '.join(missing)}")
+        return np.ascontiguousarray(frame[self.columns(prefix)].to_numpy(dtype=np.float64))
+
+    def check(self, X, sides=2):
+        """Vérifie que X a la largeur du schéma (`sides` équipes par ligne) ; retourne X en float64 2D."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None]
+        if X.ndim != 2 or X.shape[1] != sides * self.width:
+            raise ValueError(f"{X.shape[-1]} colonnes au lieu de {sides * self.width} ({sides} x {self.width} caractéristiques)")
+        return X
+
+    def out_of_bounds(self, X, sides=2):
+        """Masque (N, sides * F) des valeurs hors bornes (NaN compris)."""
+        X = self.check(X, sides)
+        lower, upper = np.tile(self.lower, sides), np.tile(self.upper, sides)
+        return ~((X >= lower) & (X <= upper))
+
+
+TEAM_STATS = FeatureSchema(TEAM_BOUNDS)
+TOOLS_TEAM_STATS = FeatureSchema(TOOLS_BOUNDS)
+# Critères de la régression logistique de tools.py
+TOOLS_LR_STATS = TOOLS_TEAM_STATS.subset(['score_rating', 'buts_par_match', 'buts_concedes_par_match', 'possession_moyenne', 'expected_but'])
@@ -0,0 +1,274 @@
+"""Service HTTP local de prédiction, avec regroupement des requêtes en micro-lots.
+
+Usage : python -m prediction.service --port 8000 --train matchs.csv
+
+POST /predict   {"home_data": {...}, "away_data": {...}} (ou une liste d'au plus --queue-size tels objets)
+GET  /latency   histogramme des latences et taille moyenne des lots
+GET  /health
+"""
+
+import copy
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from prediction.metrics import LatencyHistogram
+from prediction.poisson import DEFAULT_MAX_GOALS, outcome_probabilities, scoreline_tensor
+from prediction.schema import TEAM_STATS
+
+DEFAULT_MAX_BATCH = 256
+DEFAULT_MAX_WAIT = 0.002
+DEFAULT_QUEUE_SIZE = 4096
+DEFAULT_REQUEST_TIMEOUT = 5.0
+
+_GOALS = TEAM_STATS.names.index('goals')
+
+
+class ServiceOverloaded(Exception):
+    """File d'attente pleine : le client doit réessayer plus tard."""
+
+
+def team_vector(data, side):
+    """Caractéristiques d'une équipe (dictionnaire au format de app.py) dans l'ordre du schéma TEAM_STATS."""
+    if not isinstance(data, dict):
+        raise ValueError(f"{side} doit être un objet")
+    # Le JSON reçu est vérifié champ par champ pour nommer la valeur fautive
+    values = []
+    for name, (low, high) in TEAM_STATS.bounds.items():
+        value = data.get(name)
+        if not isinstance(value, (int, float)) or isinstance(value, bool) or not low <= value <= high:
+            raise ValueError(f"{side}.{name} doit être un nombre entre {low} et {high}")
+        values.append(float(value))
+    return values
+
+
+def parse_match(match):
+    """(vecteur domicile, vecteur extérieur) d'un match {"home_data": ..., "away_data": ...}."""
+    if not isinstance(match, dict):
+        raise ValueError("chaque match doit être un objet")
+    return team_vector(match.get("home_data"), "home_data"), team_vector(match.get("away_data"), "away_data")
+
+
+class MicroBatcher:
+    """Regroupe les requêtes concurrentes et les prédit ensemble.
+
+    Un thread unique vide la file : il attend la première requête, puis
+    au plus `max_wait` secondes ou `max_batch` requêtes, et appelle une seule
+    fois le moteur de Poisson et `predict_proba` de chaque modèle pour tout le
+    lot. La file est bornée : au-delà de `queue_size` requêtes en attente,
+    `submit` lève ServiceOverloaded au lieu d'accumuler du retard.
+    """
+
+    def __init__(self, models=None, max_batch=DEFAULT_MAX_BATCH, max_wait=DEFAULT_MAX_WAIT,
+                 queue_size=DEFAULT_QUEUE_SIZE, max_goals=DEFAULT_MAX_GOALS):
+        self.models = models or {}
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_goals = max_goals
+        self.queue_size = queue_size
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._stopped = threading.Event()
+        self.batches = 0
+        self.requests = 0
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def submit(self, home, away):
+        """Ajoute un match (vecteurs domicile et extérieur) ; retourne un Future du résultat."""
+        future = Future()
+        try:
+            self._queue.put_nowait((home, away, future))
+        except queue.Full:
+            raise ServiceOverloaded() from None
+        return future
+
+    def _collect(self):
+        try:
+            batch = [self._queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get_nowait() if remaining <= 0 else self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+            try:
+                results = self.predict(np.array([b[0] for b in batch]), np.array([b[1] for b in batch]))
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
+            self.batches += 1
+            self.requests += len(batch)
+
+    def predict(self, home, away):
+        """Prédictions (liste de dictionnaires) pour des matrices (N, F) domicile et extérieur."""
+        tensor = scoreline_tensor(home[:, _GOALS], away[:, _GOALS], self.max_goals)
+        outcomes = outcome_probabilities(tensor)
+        n = len(home)
+        classifiers = {}
+        if self.models:
+            stacked = np.vstack([home, away])
+            for name, model in self.models.items():
+                classifiers[name] = model.predict_proba(stacked)[:, 1]
+        return [{
+            "scores": tensor[i].tolist(),
+            "probabilities": {"domicile": float(outcomes[i, 0]), "nul": float(outcomes[i, 1]), "exterieur": float(outcomes[i, 2])},
+            "classifiers": {
+                name: {"domicile": float(proba[i]), "exterieur": float(proba[n + i])} for name, proba in classifiers.items()
+            }
+        } for i in range(n)]
+
+
+def warm_up(models):
+    """Premier appel de chaque modèle à vide, pour que la première requête ne paie pas l'initialisation."""
+    dummy = TEAM_STATS.lower[None]
+    models = dict(models)
+    for name, model in models.items():
+        # Les lots sont petits : le parallélisme interne coûte plus qu'il ne rapporte.
+        # Le modèle vient du registre partagé : on règle une copie, pas l'exemplaire des autres sessions
+        if model.get_params().get('n_jobs') not in (None, 1):
+            model = models[name] = copy.deepcopy(model).set_params(n_jobs=1)
+        model.predict_proba(dummy)
+    return models
+
+
+def load_models(train_file=None):
+    """Pool de modèles du service : entraînés (ou rechargés du registre) sur un fichier de matchs."""
+    if train_file is None:
+        return {}
+    from prediction.batch import iter_fixture_chunks, train_on_fixtures, validate_fixtures
+    fixtures, _ = validate_fixtures(next(iter_fixture_chunks(train_file)))
+    return warm_up(train_on_fixtures(fixtures) or {})
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    """Point d'entrée HTTP ; `server.batcher` et `server.latency` sont fournis par make_server."""
+
+    protocol_version = "HTTP/1.1"
+    # En-têtes et corps partent en deux écritures : sans TCP_NODELAY, chaque réponse attend l'ACK retardé
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload, headers=()):
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, {"status": "ok", "models": list(self.server.batcher.models)})
+        elif self.path == "/latency":
+            batcher = self.server.batcher
+            summary = self.server.latency.summary()
+            summary["mean_batch_size"] = batcher.requests / batcher.batches if batcher.batches else None
+            self._send(200, summary)
+        else:
+            self._send(404, {"error": "chemin inconnu"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send(404, {"error": "chemin inconnu"})
+            return
+        start = time.perf_counter()
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            single = isinstance(payload, dict)
+            matches = [payload] if single else payload
+            if not isinstance(matches, list) or not matches:
+                raise ValueError("le corps doit être un objet ou une liste non vide")
+            vectors = [parse_match(m) for m in matches]
+        except (ValueError, UnicodeDecodeError) as e:
+            self._send(400, {"error": str(e)})
+            return
+        # Une liste plus longue que la file ne pourrait jamais y entrer, même serveur inactif
+        if len(vectors) > self.server.batcher.queue_size:
+            self._send(413, {"error": f"au plus {self.server.batcher.queue_size} matchs par requête"})
+            return
+        try:
+            futures = [self.server.batcher.submit(home, away) for home, away in vectors]
+            results = [f.result(timeout=self.server.request_timeout) for f in futures]
+        except ServiceOverloaded:
+            self._send(503, {"error": "service surchargé"}, [("Retry-After", "1")])
+            return
+        except Exception as e:
+            self._send(500, {"error": str(e)})
+            return
+        self._send(200, results[0] if single else results)
+        self.server.latency.record(time.perf_counter() - start)
+
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # File de connexions en attente du noyau, pour absorber les rafales de clients
+    request_queue_size = 1024
+
+
+def make_server(host="127.0.0.1", port=8000, models=None, max_batch=DEFAULT_MAX_BATCH, max_wait=DEFAULT_MAX_WAIT,
+                queue_size=DEFAULT_QUEUE_SIZE, max_goals=DEFAULT_MAX_GOALS, request_timeout=DEFAULT_REQUEST_TIMEOUT):
+    """Crée le serveur HTTP et démarre son thread de micro-lots (sans lancer serve_forever)."""
+    server = PredictionServer((host, port), PredictionHandler)
+    server.batcher = MicroBatcher(models, max_batch, max_wait, queue_size, max_goals).start()
+    server.latency = LatencyHistogram()
+    server.request_timeout = request_timeout
+    return server
+
+
+def main(argv=None):
+    """Lance le service de prédiction sur localhost."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Service HTTP local de prédiction de matchs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--train", help="fichier de matchs (CSV ou Parquet) pour entraîner les classifieurs")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT * 1000)
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE)
+    parser.add_argument("--max-goals", type=int, default=DEFAULT_MAX_GOALS)
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, load_models(args.train), args.max_batch,
+                         args.max_wait_ms / 1000, args.queue_size, args.max_goals)
+    print(f"Service de prédiction sur http://{args.host}:{args.port} ({len(server.batcher.models)} modèles)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""Historique des matchs en colonnes .npy mappées en mémoire, indexé par équipe et par date.
+
+Usage : python -m prediction.store saison1.csv saison2.csv --store match_store
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from prediction.rolling import featurize_store
+
+DEFAULT_STORE_DIR = os.environ.get("MATCH_STORE_DIR", "match_store")
+REQUIRED_COLUMNS = ["date", "home_team", "away_team", "home_goals", "away_goals"]
+# Noms de colonnes des fichiers de type football-data.co.uk
+COLUMN_ALIASES = {"Date": "date", "HomeTeam": "home_team", "AwayTeam": "away_team", "FTHG": "home_goals", "FTAG": "away_goals"}
+SIDES = ("home", "away", "any")
+
+HOME_WIN, DRAW, AWAY_WIN = 0, 1, 2
+
+
+def to_day(value):
+    """Convertit une date (chaîne, datetime, datetime64) en nombre de jours depuis 1970-01-01."""
+    if isinstance(value, (int, np.integer)):
+        return np.int64(value)
+    return np.datetime64(pd.Timestamp(value).date(), "D").astype(np.int64)
+
+
+def _read_matches(path):
+    matches = pd.read_csv(path).rename(columns=COLUMN_ALIASES)
+    missing = [c for c in REQUIRED_COLUMNS if c not in matches.columns]
+    if missing:
+        raise ValueError(f"{path} : colonnes manquantes : {', '.join(missing)}")
+    matches["date"] = parse_dates(matches["date"])
+    return matches
+
+
+def parse_dates(values):
+    """Dates ISO (2023-01-02) telles quelles ; les autres (02/01/23, format football-data) au jour d'abord.
+
+    `dayfirst` n'est appliqué qu'aux dates non ISO : pandas l'applique sinon
+    aussi aux dates ISO et inverse jour et mois.
+    """
+    values = pd.Series(values).astype(str).str.strip()
+    iso = values.str.match(r"^\d{4}-\d{2}-\d{2}")
+    dates = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    if iso.any():
+        dates[iso] = pd.to_datetime(values[iso], format="ISO8601")
+    if (~iso).any():
+        dates[~iso] = pd.to_datetime(values[~iso], dayfirst=True, format="mixed")
+    return dates
+
+
+def _team_index(codes, rows, dates, n_teams):
+    """Index CSR : pour chaque équipe, ses lignes (et leurs dates) dans l'ordre chronologique."""
+    order = np.lexsort((rows, codes))
+    offsets = np.zeros(n_teams + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes, minlength=n_teams), out=offsets[1:])
+    return offsets, rows[order], dates[rows[order]]
+
+
+def build_store(matches, store_dir=DEFAULT_STORE_DIR):
+    """Écrit `matches` (DataFrame) dans `store_dir` et retourne le MatchStore ouvert."""
+    matches = matches.sort_values("date", kind="stable").reset_index(drop=True)
+    teams = sorted(set(matches["home_team"].astype(str)) | set(matches["away_team"].astype(str)))
+    codes = {team: i for i, team in enumerate(teams)}
+    # Statistiques numériques du match (tirs, cotes...) : connues après coup, elles ne servent qu'aux moyennes glissantes
+    feature_columns = [
+        c for c in matches.columns
+        if c not in REQUIRED_COLUMNS and pd.api.types.is_numeric_dtype(matches[c])
+    ]
+    n = len(matches)
+    rows = np.arange(n, dtype=np.int64)
+    arrays = {
+        "date": matches["date"].to_numpy(dtype="datetime64[D]").astype(np.int64),
+        "home_team": matches["home_team"].astype(str).map(codes).to_numpy(dtype=np.int32),
+        "away_team": matches["away_team"].astype(str).map(codes).to_numpy(dtype=np.int32),
+        "home_goals": matches["home_goals"].to_numpy(dtype=np.int16),
+        "away_goals": matches["away_goals"].to_numpy(dtype=np.int16),
+        # Matrice (matchs x caractéristiques) en C-order : une plage de dates en est une vue sans copie
+        "features": np.ascontiguousarray(matches[feature_columns].to_numpy(dtype=np.float64)).reshape(n, len(feature_columns))
+    }
+    for side in SIDES:
+        if side == "any":
+            side_codes = np.concatenate([arrays["home_team"], arrays["away_team"]])
+            side_rows = np.concatenate([rows, rows])
+        else:
+            side_codes, side_rows = arrays[f"{side}_team"], rows
+        offsets, index_rows, index_dates = _team_index(side_codes, side_rows, arrays["date"], len(teams))
+        arrays[f"{side}_offsets"] = offsets
+        arrays[f"{side}_rows"] = index_rows
+        arrays[f"{side}_dates"] = index_dates
+
+    os.makedirs(store_dir, exist_ok=True)
+    for name, array in arrays.items():
+        tmp = os.path.join(store_dir, f"{name}.tmp.npy")
+        np.save(tmp, array)
+        os.replace(tmp, os.path.join(store_dir, f"{name}.npy"))
+    # Les métadonnées sont écrites en dernier : un magasin sans meta.json est incomplet
+    meta = {"teams": teams, "feature_columns": feature_columns, "n_matches": n}
+    tmp = os.path.join(store_dir, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp, os.path.join(store_dir, "meta.json"))
+    return MatchStore(store_dir)
+
+
+def ingest_csv(paths, store_dir=DEFAULT_STORE_DIR, append=True):
+    """Ajoute des fichiers CSV de matchs au magasin (reconstruit en une passe).
+
+    Un match déjà présent (même date et mêmes équipes) n'est gardé qu'une
+    fois : la version du fichier le plus récemment ingéré l'emporte.
+    """
+    frames = [_read_matches(path) for path in paths]
+    if append and os.path.exists(os.path.join(store_dir, "meta.json")):
+        frames.insert(0, MatchStore(store_dir).to_frame())
+    matches = pd.concat(frames, ignore_index=True)
+    matches["date"] = matches["date"].astype("datetime64[ns]").dt.normalize()
+    matches["home_team"] = matches["home_team"].astype(str)
+    matches["away_team"] = matches["away_team"].astype(str)
+    matches = matches.drop_duplicates(["date", "home_team", "away_team"], keep="last")
+    return build_store(matches, store_dir)
+
+
+class MatchStore:
+    """Lecture du magasin : colonnes mappées en mémoire, requêtes par équipe et date en O(log n)."""
+
+    def __init__(self, store_dir=DEFAULT_STORE_DIR):
+        with open(os.path.join(store_dir, "meta.json")) as f:
+            meta = json.load(f)
+        self.store_dir = store_dir
+        self.teams = meta["teams"]
+        self.feature_columns = meta["feature_columns"]
+        self._codes = {team: i for i, team in enumerate(self.teams)}
+        self._arrays = {}
+
+    def __len__(self):
+        return len(self._array("date"))
+
+    def _array(self, name):
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.store_dir, f"{name}.npy"), mmap_mode="r")
+        return self._arrays[name]
+
+    def team_code(self, team):
+        try:
+            return self._codes[team]
+        except KeyError:
+            raise KeyError(f"Équipe inconnue : {team}") from None
+
+    def column(self, name, rows=None):
+        """Colonne `name` (date, équipes, buts ou caractéristique), entière ou pour les lignes `rows`."""
+        if name in self.feature_columns:
+            values = self._array("features")[:, self.feature_columns.index(name)]
+        else:
+            values = self._array(name)
+        return values if rows is None else values[rows]
+
+    def date_range(self, start=None, end=None):
+        """Tranche des matchs joués dans [start, end) — les lignes sont triées par date."""
+        dates = self._array("date")
+        lo = 0 if start is None else int(np.searchsorted(dates, to_day(start), "left"))
+        hi = len(dates) if end is None else int(np.searchsorted(dates, to_day(end), "left"))
+        return slice(lo, hi)
+
+    def team_matches(self, team, side="any", before=None, after=None, last=None):
+        """Lignes des matchs de `team` (à domicile, à l'extérieur ou les deux) dans [after, before).
+
+        `before` est exclu, ce qui évite toute fuite du match à prédire ; avec
+        `last`, seuls les `last` matchs les plus récents sont gardés. Le résultat
+        est une vue de l'index, obtenue par deux recherches dichotomiques.
+        """
+        if side not in SIDES:
+            raise ValueError(f"side doit valoir {', '.join(SIDES)}")
+        code = self.team_code(team)
+        offsets = self._array(f"{side}_offsets")
+        start, stop = int(offsets[code]), int(offsets[code + 1])
+        rows = self._array(f"{side}_rows")[start:stop]
+        dates = self._array(f"{side}_dates")[start:stop]
+        lo = 0 if after is None else int(np.searchsorted(dates, to_day(after), "left"))
+        hi = len(dates) if before is None else int(np.searchsorted(dates, to_day(before), "left"))
+        if last is not None:
+            lo = max(lo, hi - last)
+        return rows[lo:hi]
+
+    def features(self, rows=slice(None)):
+        """Matrice des caractéristiques ; pour une tranche (ex. date_range) c'est une vue sans copie."""
+        return self._array("features")[rows]
+
+    def outcomes(self, rows=slice(None)):
+        """Résultat de chaque match : 0 victoire domicile, 1 nul, 2 victoire extérieur."""
+        home = self._array("home_goals")[rows].astype(np.int16)
+        away = self._array("away_goals")[rows].astype(np.int16)
+        return np.where(home > away, HOME_WIN, np.where(home == away, DRAW, AWAY_WIN)).astype(np.int8)
+
+    def training_set(self, start=None, end=None):
+        """(X, y) pour train_models : y vaut 1 si l'équipe à domicile gagne.
+
+        Les colonnes numériques du magasin sont des statistiques du match
+        lui-même (tirs, corners, cotes...) : X n'en contient que les moyennes
+        glissantes des matchs précédents (featurize_store), calculées sur tout
+        l'historique antérieur à `end`. Les matchs où une équipe n'a encore
+        aucun match joué, ou avec une statistique manquante, sont écartés.
+        """
+        rows = self.date_range(start, end)
+        features, names, _ = featurize_store(self, before=end)
+        X = features[rows]
+        played = [names.index("home_matchs_joues"), names.index("away_matchs_joues")]
+        keep = np.all(np.isfinite(X), axis=1) & np.all(X[:, played] > 0, axis=1)
+        return np.ascontiguousarray(X[keep]), (self.outcomes(rows)[keep] == HOME_WIN).astype(np.int8)
+
+    def to_frame(self, rows=slice(None)):
+        """Matchs sous forme de DataFrame (pour l'export ou la réingestion)."""
+        teams = np.array(self.teams, dtype=object)
+        frame = pd.DataFrame({
+            "date": self._array("date")[rows].astype("datetime64[D]"),
+            "home_team": teams[self._array("home_team")[rows]],
+            "away_team": teams[self._array("away_team")[rows]],
+            "home_goals": np.asarray(self._array("home_goals")[rows]),
+            "away_goals": np.asarray(self._array("away_goals")[rows])
+        })
+        features = np.asarray(self.features(rows))
+        for j, name in enumerate(self.feature_columns):
+            frame[name] = features[:, j]
+        return frame
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ingère des fichiers CSV de matchs dans le magasin historique.")
+    parser.add_argument("csv", nargs="+", help="fichiers CSV (date, home_team, away_team, home_goals, away_goals, ...)")
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR, help="répertoire du magasin")
+    parser.add_argument("--replace", action="store_true", help="remplace le magasin au lieu de le compléter")
+    args = parser.parse_args(argv)
+
+    store = ingest_csv(args.csv, args.store, append=not args.replace)
+    print(f"{len(store)} matchs, {len(store.teams)} équipes -> {args.store}")
+
+
+if __name__ == "__main__":
+    main()
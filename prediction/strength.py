@@ -0,0 +1,159 @@
+"""Forces d'équipes (attaque, défense, avantage du terrain) avec correction de Dixon-Coles.
+
+Ajustement par maximum de vraisemblance pondérée : log-vraisemblance et
+gradient analytique entièrement vectorisés, optimisés par L-BFGS-B.
+"""
+
+import numpy as np
+
+from prediction.poisson import DEFAULT_MAX_GOALS, scoreline_tensor
+
+RHO_BOUNDS = (-0.25, 0.25)
+# Décroissance temporelle par jour (demi-vie d'environ un an)
+DEFAULT_XI = 0.0019
+_EPS = 1e-12
+
+
+class TeamStrength:
+    """Paramètres ajustés : log λ_dom = intercept + home + attack[dom] - defence[ext]."""
+
+    def __init__(self, teams, attack, defence, home_advantage, intercept, rho=0.0, log_likelihood=None, n_iter=None):
+        self.teams = list(teams)
+        self.attack = np.asarray(attack, dtype=np.float64)
+        self.defence = np.asarray(defence, dtype=np.float64)
+        self.home_advantage = float(home_advantage)
+        self.intercept = float(intercept)
+        self.rho = float(rho)
+        self.log_likelihood = log_likelihood
+        self.n_iter = n_iter
+        self._codes = {team: i for i, team in enumerate(self.teams)}
+
+    def codes(self, teams):
+        try:
+            return np.array([self._codes[team] for team in np.atleast_1d(teams)], dtype=np.int64)
+        except KeyError as e:
+            raise KeyError(f"Équipe inconnue : {e.args[0]}") from None
+
+    def expected_goals(self, home_teams, away_teams):
+        """Espérances de buts (domicile, extérieur) de chaque match."""
+        h, a = self.codes(home_teams), self.codes(away_teams)
+        lam = np.exp(self.intercept + self.home_advantage + self.attack[h] - self.defence[a])
+        mu = np.exp(self.intercept + self.attack[a] - self.defence[h])
+        return lam, mu
+
+    def scoreline_tensor(self, home_teams, away_teams, max_goals=DEFAULT_MAX_GOALS, fold_tail=False):
+        """Tenseur (N, G, G) des scores, prêt pour le moteur de Poisson et les marchés dérivés."""
+        lam, mu = self.expected_goals(home_teams, away_teams)
+        return scoreline_tensor(lam, mu, max_goals, fold_tail, rho=self.rho)
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame({"Attaque": self.attack, "Défense": self.defence}, index=pd.Index(self.teams, name="Équipe"))
+
+
+def time_decay_weights(dates, xi, reference=None):
+    """Poids exp(-xi * âge en jours) ; `dates` en jours (entiers) ou datetime64."""
+    days = np.asarray(dates)
+    if np.issubdtype(days.dtype, np.datetime64):
+        days = days.astype("datetime64[D]").astype(np.int64)
+    reference = days.max() if reference is None else reference
+    return np.exp(-xi * (reference - days).astype(np.float64))
+
+
+def _unpack(theta, n_teams):
+    attack = theta[:n_teams] - theta[:n_teams].mean()
+    defence = theta[n_teams:2 * n_teams] - theta[n_teams:2 * n_teams].mean()
+    return attack, defence, theta[2 * n_teams], theta[2 * n_teams + 1], theta[2 * n_teams + 2]
+
+
+def negative_log_likelihood(theta, h, a, x, y, w, n_teams, dixon_coles=True):
+    """(-log-vraisemblance, gradient) pondérés ; attaque et défense sont centrées."""
+    attack, defence, home, intercept, rho = _unpack(theta, n_teams)
+    log_lam = intercept + home + attack[h] - defence[a]
+    log_mu = intercept + attack[a] - defence[h]
+    lam, mu = np.exp(log_lam), np.exp(log_mu)
+
+    # Poisson (les termes log(x!) sont constants et omis)
+    ll = w * (x * log_lam - lam + y * log_mu - mu)
+    g_lam = w * (x - lam)
+    g_mu = w * (y - mu)
+    g_rho = 0.0
+
+    if dixon_coles:
+        s00 = (x == 0) & (y == 0)
+        s01 = (x == 0) & (y == 1)
+        s10 = (x == 1) & (y == 0)
+        s11 = (x == 1) & (y == 1)
+        t00 = np.maximum(1 - lam[s00] * mu[s00] * rho, _EPS)
+        t01 = np.maximum(1 + lam[s01] * rho, _EPS)
+        t10 = np.maximum(1 + mu[s10] * rho, _EPS)
+        t11 = max(1 - rho, _EPS)
+        ll[s00] += w[s00] * np.log(t00)
+        ll[s01] += w[s01] * np.log(t01)
+        ll[s10] += w[s10] * np.log(t10)
+        ll[s11] += w[s11] * np.log(t11)
+        d00 = w[s00] * lam[s00] * mu[s00] / t00
+        g_lam[s00] -= d00 * rho
+        g_mu[s00] -= d00 * rho
+        g_lam[s01] += w[s01] * lam[s01] * rho / t01
+        g_mu[s10] += w[s10] * mu[s10] * rho / t10
+        g_rho = (-d00.sum() + (w[s01] * lam[s01] / t01).sum() + (w[s10] * mu[s10] / t10).sum()
+                 - w[s11].sum() / t11)
+
+    # Répartition des dérivées sur les paramètres de chaque équipe, puis projection (centrage)
+    g_attack = np.bincount(h, g_lam, n_teams) + np.bincount(a, g_mu, n_teams)
+    g_defence = -np.bincount(a, g_lam, n_teams) - np.bincount(h, g_mu, n_teams)
+    grad = np.concatenate([
+        g_attack - g_attack.mean(),
+        g_defence - g_defence.mean(),
+        [g_lam.sum(), g_lam.sum() + g_mu.sum(), g_rho]
+    ])
+    return -ll.sum(), -grad
+
+
+def fit_team_strength(home_teams, away_teams, home_goals, away_goals, dates=None, xi=0.0,
+                      dixon_coles=True, init=None, max_iter=500, tol=1e-9):
+    """Ajuste attaque, défense, avantage du terrain et rho sur des matchs passés.
+
+    `xi` > 0 pondère les matchs par exp(-xi * âge en jours) (nécessite `dates`).
+    `init` (un TeamStrength précédent) sert de point de départ quand de
+    nouveaux matchs arrivent : les équipes connues reprennent leurs paramètres.
+    """
+    from scipy.optimize import minimize
+
+    teams, codes = np.unique(np.concatenate([np.asarray(home_teams), np.asarray(away_teams)]), return_inverse=True)
+    n = len(home_goals)
+    h, a = codes[:n].astype(np.int64), codes[n:].astype(np.int64)
+    x = np.asarray(home_goals, dtype=np.float64)
+    y = np.asarray(away_goals, dtype=np.float64)
+    w = np.ones(n) if not xi else time_decay_weights(dates, xi)
+    n_teams = len(teams)
+
+    theta = np.zeros(2 * n_teams + 3)
+    theta[2 * n_teams + 1] = np.log(max((np.average(x, weights=w) + np.average(y, weights=w)) / 2, _EPS))
+    if init is not None:
+        known = [(i, init._codes[team]) for i, team in enumerate(teams.tolist()) if team in init._codes]
+        if known:
+            new, old = np.array(known).T
+            theta[new] = init.attack[old]
+            theta[n_teams + new] = init.defence[old]
+        theta[2 * n_teams:] = [init.home_advantage, init.intercept, init.rho if dixon_coles else 0.0]
+
+    bounds = [(None, None)] * (2 * n_teams + 2) + [RHO_BOUNDS if dixon_coles else (0.0, 0.0)]
+    result = minimize(
+        negative_log_likelihood, theta, args=(h, a, x, y, w, n_teams, dixon_coles),
+        jac=True, method="L-BFGS-B", bounds=bounds, options={"maxiter": max_iter, "ftol": tol}
+    )
+    attack, defence, home, intercept, rho = _unpack(result.x, n_teams)
+    return TeamStrength(teams.tolist(), attack, defence, home, intercept, rho, -result.fun, result.nit)
+
+
+def fit_from_store(store, before=None, xi=DEFAULT_XI, dixon_coles=True, init=None):
+    """Ajuste les forces sur les matchs du magasin historique joués avant `before`."""
+    rows = store.date_range(None, before)
+    teams = np.array(store.teams, dtype=object)
+    return fit_team_strength(
+        teams[store.column("home_team", rows)], teams[store.column("away_team", rows)],
+        store.column("home_goals", rows), store.column("away_goals", rows),
+        dates=store.column("date", rows), xi=xi, dixon_coles=dixon_coles, init=init
+    )
@@ -0,0 +1,22 @@
+"""Tests de la calibration de Platt."""
+
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.svm import LinearSVC
+
+from prediction.calibration import PlattCalibratedClassifier
+
+
+def test_multiclass_one_vs_rest():
+    X, y = make_classification(400, n_informative=4, n_classes=3, random_state=0)
+    model = PlattCalibratedClassifier(LinearSVC()).fit(X, y)
+    proba = model.predict_proba(X)
+    assert proba.shape == (400, 3)
+    assert np.allclose(proba.sum(axis=1), 1)
+    assert (model.predict(X) == y).mean() > 0.5
+
+
+def test_binary_keeps_two_columns():
+    X, y = make_classification(200, random_state=0)
+    proba = PlattCalibratedClassifier(LinearSVC()).fit(X, y).predict_proba(X)
+    assert proba.shape == (200, 2)
@@ -0,0 +1,34 @@
+"""Tests du flux de cotes."""
+
+import asyncio
+import threading
+
+from prediction.feed import parse_line, tail_file
+
+
+def test_parse_line_numeric_market_matches_csv():
+    assert parse_line('{"match": "A - B", "market": 1, "selection": 2, "odds": 1.9}') == parse_line("A - B,1,2,1.9")
+
+
+def test_tail_file_yields_complete_lines_only(tmp_path):
+    path = tmp_path / "cotes.csv"
+    path.write_text("A - B,1X2,1,2.0\nA - B,1X2,X,3.")
+
+    async def collect():
+        stop = threading.Event()
+        lines = []
+
+        async def append():
+            await asyncio.sleep(0.1)
+            with open(path, "a") as f:
+                f.write("4\nA - B,1X2,2,3.5\nA - B,1X")
+
+        task = asyncio.ensure_future(append())
+        async for chunk in tail_file(str(path), poll_interval=0.01, from_start=False, stop=stop):
+            lines.extend(chunk)
+            stop.set()
+        await task
+        return lines
+
+    # Fin de la ligne commencée avant l'ouverture ignorée, dernière ligne incomplète en attente
+    assert asyncio.run(collect()) == ["A - B,1X2,2,3.5"]
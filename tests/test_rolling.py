@@ -0,0 +1,37 @@
+"""Tests des caractéristiques glissantes."""
+
+import numpy as np
+import pandas as pd
+
+from prediction.rolling import RollingFeatureEngine, featurize_matches
+
+
+def test_missing_stat_does_not_poison_later_matches():
+    matches = pd.DataFrame({
+        "date": pd.date_range("2023-01-01", periods=8, freq="7D"),
+        "home_team": ["A", "B"] * 4,
+        "away_team": ["B", "A"] * 4,
+        "home_goals": [1, 2, 0, 1, 3, 1, 2, 0],
+        "away_goals": [0, 1, 1, 1, 0, 2, 2, 1],
+        "home_xG": [1.2, 1.5, np.nan, 0.9, 2.1, 1.0, 1.4, 0.7],
+        "away_xG": [0.4, 1.1, 0.8, 1.0, 0.3, 1.6, 1.3, 0.9]
+    })
+    features, engine = featurize_matches(matches, window=3)
+    # Après le match sans xG, les moyennes de A restent définies
+    assert np.isfinite(features.iloc[3:].to_numpy()).all()
+    # Moyenne de xG de A sur la fenêtre (matchs 4, 5, 6) : NaN du match 3 sorti, valeurs présentes seulement
+    assert np.isclose(features.loc[6, "home_xG"], np.mean([1.0, 2.1, 1.6]))
+    # Fenêtre contenant le NaN : moyenne des deux valeurs présentes (matchs 1, 2 et 3 de A)
+    assert np.isclose(features.loc[3, "away_xG"], np.mean([1.2, 1.1]))
+
+
+def test_stat_never_seen_is_nan_after_first_match():
+    engine = RollingFeatureEngine(["A", "B"], stats=("goals", "encais", "xG"))
+    assert np.isfinite(engine.snapshot([0])).all()
+    engine.update(0, 1, [1.0, 0.0, np.nan], [0.0, 1.0, 0.5])
+    row = dict(zip(engine.feature_names, engine.snapshot([0])[0]))
+    assert np.isnan(row["xG"]) and np.isnan(row["xG_ewm"])
+    assert row["goals"] == 1.0 and row["forme_recente"] == 3.0
+    engine.update(1, 0, [1.0, 1.0, 0.2], [1.0, 1.0, 0.8])
+    row = dict(zip(engine.feature_names, engine.snapshot([0])[0]))
+    assert row["xG"] == 0.8 and row["xG_ewm"] == 0.8
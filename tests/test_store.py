@@ -0,0 +1,29 @@
+"""Tests du magasin de matchs."""
+
+import numpy as np
+import pandas as pd
+
+from prediction.store import MatchStore, ingest_csv, parse_dates, to_day
+
+
+def test_parse_dates_iso_and_day_first():
+    dates = parse_dates(["2023-01-02", "02/01/23", "13/08/2022"])
+    assert dates.tolist() == [pd.Timestamp("2023-01-02"), pd.Timestamp("2023-01-02"), pd.Timestamp("2022-08-13")]
+
+
+def test_ingest_iso_dates_keeps_chronological_order(tmp_path):
+    path = tmp_path / "matchs.csv"
+    pd.DataFrame({
+        "date": ["2023-01-02", "2023-01-10", "2023-02-01"],
+        "home_team": ["A", "B", "A"],
+        "away_team": ["B", "A", "B"],
+        "home_goals": [1, 0, 2],
+        "away_goals": [0, 0, 1]
+    }).to_csv(path, index=False)
+    store = ingest_csv([str(path)], store_dir=str(tmp_path / "store"), append=False)
+    assert isinstance(store, MatchStore)
+    assert store.column("date").tolist() == [to_day(d) for d in ("2023-01-02", "2023-01-10", "2023-02-01")]
+    assert store.column("home_goals").tolist() == [1, 0, 2]
+    # Le premier match de A est bien le 2 janvier, pas le 1er février
+    rows = store.team_matches("A", before="2023-01-05")
+    assert np.asarray(rows).tolist() == [0]
@@ -1,10 +1,15 @@
 import streamlit as st  
 import numpy as np  
-from scipy.stats import poisson  
-from sklearn.linear_model import LogisticRegression  
-from sklearn.ensemble import RandomForestClassifier  
 import pandas as pd  
-import matplotlib.pyplot as plt  
+from prediction.cache import cache_key, get_prediction_cache  
+from prediction.graph import ComputeGraph  
+from prediction.metrics import get_metrics, timed  
+from prediction.montecarlo import KELLY_FRACTIONS, simulate_bankroll  
+from prediction.odds import DEVIG_METHODS, cotes_vers_probabilite, kelly_criterion, remove_margin  
+from prediction.parlays import SYSTEMS, price_system, winning_legs_distribution  
+from prediction.poisson import DEFAULT_MAX_GOALS, scoreline_tensor  
+from prediction.registry import fingerprint, get_registry  
+from prediction.schema import TOOLS_LR_STATS, TOOLS_TEAM_STATS  
 
 # Initialisation des données par défaut  
 if 'data' not in st.session_state:  
@@ -48,22 +53,61 @@ if 'data' not in st.session_state:
         "head_to_head": {"victoires_A": 0, "nuls": 0, "victoires_B": 0},  
     }  
 
-# Fonctions pour les outils de paris  
-def cotes_vers_probabilite(cote):  
-    """Convertit une cote décimale en probabilité implicite."""  
-    return 1 / cote  
+NOMS_METHODES_MARGE = {"proportional": "Proportionnelle", "additive": "Additive", "power": "Puissance", "shin": "Shin"}  
 
-def enlever_marge(probabilites, marge):  
-    """Enlève la marge du bookmaker des probabilités."""  
-    total_probabilite = sum(probabilites)  
-    facteur_correction = (1 - marge) / total_probabilite  
-    return [p * facteur_correction for p in probabilites]  
+# Graphe de calcul des blocs de la page : chaque sortie déclare les entrées dont elle dépend  
+def build_tools_graph():  
+    graph = ComputeGraph()  
 
-def kelly_criterion(cote, probabilite, bankroll, kelly_fraction):  
-    """Calcule la mise de Kelly."""  
-    probabilite_avantage = probabilite * cote - 1  
-    fraction = kelly_fraction * probabilite_avantage / (cote - 1)  
-    return bankroll * fraction  
+    @graph.node("poisson_matrix", ["expected_but_A", "expected_but_B"])  
+    def poisson_matrix(expected_but_A, expected_but_B):  
+        matrix = scoreline_tensor(expected_but_A, expected_but_B, DEFAULT_MAX_GOALS)[0]  
+        return pd.DataFrame(matrix * 100, columns=[f"Équipe B: {i}" for i in range(DEFAULT_MAX_GOALS)], index=[f"Équipe A: {i}" for i in range(DEFAULT_MAX_GOALS)])  
+
+    @graph.node("probabilite_implicite", ["cote_decimale"])  
+    def probabilite_implicite(cote_decimale):  
+        return cotes_vers_probabilite(cote_decimale)  
+
+    @graph.node("value_bet", ["cote_value_bet", "probabilite_estimee"])  
+    def value_bet(cote_value_bet, probabilite_estimee):  
+        return probabilite_estimee > cotes_vers_probabilite(cote_value_bet)  
+
+    @graph.node("pari_combine", ["selections_combine", "systeme_combine"])  
+    def pari_combine(selections_combine, systeme_combine):  
+        cotes, probabilites = np.array(selections_combine, dtype=float).T  
+        resultat = price_system(probabilites[None], cotes[None], systeme_combine).iloc[0]  
+        return resultat, winning_legs_distribution(probabilites[None])[0]  
+
+    @graph.node("mise_kelly", ["cote_kelly", "probabilite_kelly", "bankroll", "kelly_fraction"])  
+    def mise_kelly(cote_kelly, probabilite_kelly, bankroll, kelly_fraction):  
+        return kelly_criterion(cote_kelly, probabilite_kelly, bankroll, kelly_fraction)  
+
+    @graph.node("tableau_sans_marge", ["cotes", "methode_marge"])  
+    def tableau_sans_marge(cotes, methode_marge):  
+        return remove_margin(cotes, methode_marge)  
+
+    return graph  
+
+# Prédictions d'un modèle du registre, partagées entre les sessions qui saisissent les mêmes données  
+def predire_en_cache(nom, modele, schema, X_train, y_train, X):  
+    # Une largeur différente de celle du schéma est refusée avant tout entraînement  
+    X_train, X = schema.check(X_train), schema.check(X)  
+    cle = cache_key(st.session_state.data, version=fingerprint(nom, modele, X_train, y_train))  
+
+    def predire():  
+        with timed(f"fit.{nom}"):  
+            modele_entraine = get_registry().fit(nom, modele, X_train, y_train)  
+        with get_registry().inference():  
+            return modele_entraine.predict(X), modele_entraine.predict_proba(X)  
+
+    return get_prediction_cache().get_or_compute(cle, predire)  
+
+# Temps par étape de cette exécution de la page (panneau de débogage, export METRICS_FILE)  
+metrics_run = get_metrics().start_run("tools")  
+
+if 'graph' not in st.session_state:  
+    st.session_state.graph = build_tools_graph()  
+graph = st.session_state.graph  
 
 # Configuration de la page  
 st.set_page_config(page_title="Prédiction de Matchs de Football", page_icon="⚽", layout="wide")  
@@ -74,6 +118,17 @@ st.header("⚽ Analyse de Prédiction de Matchs de Football")
 # Onglets pour les différentes sections  
 tab1, tab2, tab3, tab4 = st.tabs(["📊 Statistiques des Équipes", "🌦️ Conditions du Match", "🔮 Prédictions", "🛠️ Outils de Paris"])  
 
+# Chaque bloc est un fragment : modifier un widget ne relance que le bloc qui le contient  
+@st.fragment  
+def statistiques_equipe(suffixe):  
+    for key in TOOLS_TEAM_STATS.columns(suffix=suffixe):  
+        st.session_state.data[key] = st.number_input(  
+            key.replace("_", " ").title(),  
+            min_value=0.0,  
+            value=float(st.session_state.data[key]),  
+            key=key  
+        )  
+
 with tab1:  
     st.subheader("📊 Statistiques des Équipes")  
 
@@ -81,27 +136,14 @@ with tab1:
 
     with col_a:  
         st.subheader("Équipe A 🟡")  
-        for key in st.session_state.data:  
-            if key.endswith("_A") and isinstance(st.session_state.data[key], (int, float)):  
-                st.session_state.data[key] = st.number_input(  
-                    key.replace("_", " ").title(),  
-                    min_value=0.0,  
-                    value=float(st.session_state.data[key]),  
-                    key=key  
-                )  
+        statistiques_equipe("_A")  
 
     with col_b:  
         st.subheader("Équipe B 🔴")  
-        for key in st.session_state.data:  
-            if key.endswith("_B") and isinstance(st.session_state.data[key], (int, float)):  
-                st.session_state.data[key] = st.number_input(  
-                    key.replace("_", " ").title(),  
-                    min_value=0.0,  
-                    value=float(st.session_state.data[key]),  
-                    key=key  
-                )  
+        statistiques_equipe("_B")  
 
-with tab2:  
+@st.fragment  
+def conditions_du_match():  
     st.subheader("🌦️ Conditions du Match")  
     st.session_state.data["conditions_match"] = st.text_input("Conditions du Match (ex : pluie, terrain sec, etc.)", value="", key="conditions_match")  
 
@@ -150,59 +192,52 @@ with tab2:
                     key=f"recent_form_B_{i}"  
                 )  
 
+with tab2:  
+    conditions_du_match()  
+
 with tab3:  
     st.subheader("🔮 Prédiction du Résultat du Match")  
 
     if st.button("Prédire le Résultat du Match"):  
-        try:  
-            # Méthode de Poisson  
-            avg_goals_A = st.session_state.data["expected_but_A"]  
-            avg_goals_B = st.session_state.data["expected_but_B"]  
+        # Bibliothèques lourdes chargées uniquement à la première prédiction  
+        with timed("import.models"):  
+            import matplotlib.pyplot as plt  
+            from sklearn.linear_model import LogisticRegression  
+            from sklearn.ensemble import RandomForestClassifier  
 
-            goals_A = [poisson.pmf(i, avg_goals_A) for i in range(6)]  
-            goals_B = [poisson.pmf(i, avg_goals_B) for i in range(6)]  
-
-            results = pd.DataFrame(np.zeros((6, 6)), columns=[f"Équipe B: {i}" for i in range(6)], index=[f"Équipe A: {i}" for i in range(6)])  
-            for i in range(6):  
-                for j in range(6):  
-                    results.iloc[i, j] = goals_A[i] * goals_B[j]  
-
-            # Conversion en pourcentages  
-            results_percentage = results * 100  
+        try:  
+            # Méthode de Poisson (en pourcentages), recalculée seulement si les xG changent  
+            max_goals = DEFAULT_MAX_GOALS  
+            graph.set_inputs(  
+                expected_but_A=st.session_state.data["expected_but_A"],  
+                expected_but_B=st.session_state.data["expected_but_B"]  
+            )  
+            results_percentage = graph.get("poisson_matrix")  
 
             st.subheader("📊 Résultats de la Méthode de Poisson (en %)")  
             st.write(results_percentage)  
 
             # Amélioration du schéma  
-            plt.figure(figsize=(10, 6))  
-            plt.imshow(results_percentage, cmap='Blues', interpolation='nearest')  
-            plt.colorbar(label='Probabilité (%)')  
-            plt.xticks(ticks=np.arange(6), labels=[f"Équipe B: {i}" for i in range(6)])  
-            plt.yticks(ticks=np.arange(6), labels=[f"Équipe A: {i}" for i in range(6)])  
-            plt.title("Probabilités des Résultats (Méthode de Poisson)")  
-            st.pyplot(plt)  
+            with timed("render.heatmap"):  
+                plt.figure(figsize=(10, 6))  
+                plt.imshow(results_percentage, cmap='Blues', interpolation='nearest')  
+                plt.colorbar(label='Probabilité (%)')  
+                plt.xticks(ticks=np.arange(max_goals), labels=[f"Équipe B: {i}" for i in range(max_goals)])  
+                plt.yticks(ticks=np.arange(max_goals), labels=[f"Équipe A: {i}" for i in range(max_goals)])  
+                plt.title("Probabilités des Résultats (Méthode de Poisson)")  
+                st.pyplot(plt)  
 
             # Régression Logistique  
             # Critères importants pour la régression logistique  
-            X_lr = np.array([  
-                [st.session_state.data["score_rating_A"], st.session_state.data["buts_par_match_A"], st.session_state.data["buts_concedes_par_match_A"],  
-                 st.session_state.data["possession_moyenne_A"], st.session_state.data["expected_but_A"],  
-                 st.session_state.data["score_rating_B"], st.session_state.data["buts_par_match_B"], st.session_state.data["buts_concedes_par_match_B"],  
-                 st.session_state.data["possession_moyenne_B"], st.session_state.data["expected_but_B"]]  
-            ])  
+            X_lr = TOOLS_LR_STATS.match_vector(st.session_state.data)  
 
             # Génération de données d'entraînement  
             np.random.seed(0)  
-            X_train_lr = np.random.rand(100, 10)  # 100 échantillons, 10 caractéristiques  
+            X_train_lr = np.random.rand(100, 2 * TOOLS_LR_STATS.width)  # 100 échantillons, 5 critères par équipe  
             y_train_lr = np.random.randint(0, 2, 100)  # Cible binaire  
 
-            # Entraînement du modèle  
-            model_lr = LogisticRegression()  
-            model_lr.fit(X_train_lr, y_train_lr)  
-
-            # Prédiction  
-            prediction_lr = model_lr.predict(X_lr)  
-            prediction_proba_lr = model_lr.predict_proba(X_lr)  
+            # Entraînement du modèle (repris du registre s'il existe déjà) et prédiction (reprise du cache)  
+            prediction_lr, prediction_proba_lr = predire_en_cache("Logistic Regression", LogisticRegression(), TOOLS_LR_STATS, X_train_lr, y_train_lr, X_lr)  
 
             # Affichage des résultats  
             st.subheader("📈 Résultats de la Régression Logistique")  
@@ -210,24 +245,16 @@ with tab3:
             st.write(f"Probabilité Équipe B : {prediction_proba_lr[0][0]:.2%}")  
 
             # Random Forest  
-            # Utilisation de toutes les statistiques disponibles (uniquement les valeurs numériques)  
-            X_rf = np.array([[st.session_state.data[key] for key in st.session_state.data if key.endswith("_A") or key.endswith("_B") and isinstance(st.session_state.data[key], (int, float))]])  
-
-            # Vérification que toutes les valeurs sont numériques  
-            X_rf = np.array([float(val) for val in X_rf[0]]).reshape(1, -1)  
+            # Toutes les statistiques numériques des deux équipes, dans l'ordre du schéma  
+            X_rf = TOOLS_TEAM_STATS.match_vector(st.session_state.data)  
 
             # Génération de données d'entraînement  
             np.random.seed(0)  
-            X_train_rf = np.random.rand(100, 52)  # 100 échantillons, 52 caractéristiques  
+            X_train_rf = np.random.rand(100, 2 * TOOLS_TEAM_STATS.width)  # 100 échantillons, 15 statistiques par équipe  
             y_train_rf = np.random.randint(0, 2, 100)  # Cible binaire  
 
-            # Entraînement du modèle  
-            model_rf = RandomForestClassifier()  
-            model_rf.fit(X_train_rf, y_train_rf)  
-
-            # Prédiction  
-            prediction_rf = model_rf.predict(X_rf)  
-            prediction_proba_rf = model_rf.predict_proba(X_rf)  
+            # Entraînement du modèle (repris du registre s'il existe déjà) et prédiction (reprise du cache)  
+            prediction_rf, prediction_proba_rf = predire_en_cache("Random Forest", RandomForestClassifier(), TOOLS_TEAM_STATS, X_train_rf, y_train_rf, X_rf)  
 
             # Affichage des résultats  
             st.subheader("📈 Résultats de la Random Forest")  
@@ -263,58 +290,127 @@ with tab3:
         except Exception as e:  
             st.error(f"Une erreur s'est produite lors de la prédiction : {str(e)}")  
 
-with tab4:  
-    st.title("🛠️ Outils de Paris")  
-
-    # Convertisseur de cotes  
+@st.fragment  
+def convertisseur_de_cotes():  
     st.header("🧮 Convertisseur de Cotes")  
-    cote_decimale = st.number_input("Cote décimale", min_value=1.01, value=2.0)  
-    probabilite_implicite = cotes_vers_probabilite(cote_decimale)  
-    st.write(f"Probabilité implicite : **{probabilite_implicite:.2%}**")  
+    graph.set_inputs(cote_decimale=st.number_input("Cote décimale", min_value=1.01, value=2.0))  
+    st.write(f"Probabilité implicite : **{graph.get('probabilite_implicite'):.2%}**")  
 
-    # Calcul de value bets  
+@st.fragment  
+def calcul_value_bets():  
     st.header("💰 Calcul de Value Bets")  
-    cote_value_bet = st.number_input("Cote (value bet)", min_value=1.01, value=2.0, key="cote_value_bet")  
-    probabilite_estimee = st.slider("Probabilité estimée (%)", min_value=1, max_value=100, value=50) / 100  
-    probabilite_implicite_value_bet = cotes_vers_probabilite(cote_value_bet)  
-    if probabilite_estimee > probabilite_implicite_value_bet:  
+    graph.set_inputs(  
+        cote_value_bet=st.number_input("Cote (value bet)", min_value=1.01, value=2.0, key="cote_value_bet"),  
+        probabilite_estimee=st.slider("Probabilité estimée (%)", min_value=1, max_value=100, value=50) / 100  
+    )  
+    if graph.get("value_bet"):  
         st.success("Value bet détecté !")  
     else:  
         st.warning("Pas de value bet.")  
 
-    # Simulateur de paris combinés  
+@st.fragment  
+def simulateur_paris_combines():  
     st.header("➕ Simulateur de Paris Combinés")  
-    nombre_equipes = st.slider("Nombre d'équipes (jusqu'à 3)", min_value=1, max_value=3, value=2)  
-    probabilites = []  
-    for i in range(nombre_equipes):  
-        probabilite = st.slider(f"Probabilité implicite équipe {i + 1} (%)", min_value=1, max_value=100, value=50, key=f"probabilite_{i}") / 100  
-        probabilites.append(probabilite)  
-    probabilite_combinee = np.prod(probabilites)  
-    st.write(f"Probabilité combinée : **{probabilite_combinee:.2%}**")  
-
-    # Mise de Kelly  
+    st.write("Une ligne par sélection (sélections indépendantes) ; un système joue une mise par combinaison.")  
+    bordereau = st.data_editor(  
+        pd.DataFrame({"Cote": [1.8, 2.1, 1.6, 2.4], "Probabilité estimée (%)": [58, 50, 65, 44]}),  
+        num_rows="dynamic",  
+        key="bordereau_combine"  
+    ).dropna()  
+    nombre = len(bordereau)  
+    if nombre == 0:  
+        return  
+    systemes = ["combiné"] + [nom for nom, (legs, _) in SYSTEMS.items() if legs == nombre] + [f"{k}/{nombre}" for k in range(1, nombre)]  
+    systeme = st.selectbox("Système", systemes)  
+    graph.set_inputs(  
+        selections_combine=tuple(zip(bordereau["Cote"].astype(float), bordereau["Probabilité estimée (%)"].astype(float) / 100)),  
+        systeme_combine=systeme  
+    )  
+    try:  
+        resultat, distribution = graph.get("pari_combine")  
+    except ValueError as e:  
+        st.error(str(e))  
+        return  
+    col_a, col_b, col_c, col_d = st.columns(4)  
+    col_a.metric("Mise (combinaisons)", f"{resultat['Mise']:.0f}")  
+    col_b.metric("Retour espéré", f"{resultat['Retour espéré']:.2f}", f"{resultat['Rendement']:+.1%}")  
+    col_c.metric("Écart type du retour", f"{resultat['Écart type']:.2f}")  
+    col_d.metric("Probabilité d'un retour", f"{resultat['P(retour > 0)']:.2%}")  
+    st.bar_chart(pd.Series(distribution, index=pd.Index(range(nombre + 1), name="Sélections gagnantes"), name="Probabilité"))  
+
+@st.fragment  
+def mise_de_kelly():  
     st.header("🏦 Mise de Kelly")  
-    cote_kelly = st.number_input("Cote (Kelly)", min_value=1.01, value=2.0, key="cote_kelly")  
-    probabilite_kelly = st.slider("Probabilité estimée (Kelly) (%)", min_value=1, max_value=100, value=50, key="probabilite_kelly") / 100  
-    bankroll = st.number_input("Bankroll", min_value=1, value=1000)  
-    kelly_fraction = st.slider("Fraction de Kelly (1 à 5)", min_value=1, max_value=5, value=1) / 5  
-    mise_kelly = kelly_criterion(cote_kelly, probabilite_kelly, bankroll, kelly_fraction)  
-        st.write(f"Mise de Kelly recommandée : **{mise_kelly:.2f}**")  
-
-    # Analyse de la marge du bookmaker  
+    graph.set_inputs(  
+        cote_kelly=st.number_input("Cote (Kelly)", min_value=1.01, value=2.0, key="cote_kelly"),  
+        probabilite_kelly=st.slider("Probabilité estimée (Kelly) (%)", min_value=1, max_value=100, value=50, key="probabilite_kelly") / 100,  
+        bankroll=st.number_input("Bankroll", min_value=1, value=1000),  
+        kelly_fraction=st.slider("Fraction de Kelly (1 à 5)", min_value=1, max_value=5, value=1) / 5  
+    )  
+    st.write(f"Mise de Kelly recommandée : **{graph.get('mise_kelly'):.2f}**")  
+
+@st.fragment  
+def simulation_bankroll():  
+    st.header("🎲 Simulation de Bankroll (Monte Carlo)")  
+    st.write("Bordereau de paris (répété à chaque tour), misé selon Kelly pour chaque valeur du curseur de fraction.")  
+    bordereau = st.data_editor(  
+        pd.DataFrame({"Cote": [2.0, 2.5, 1.8], "Probabilité estimée (%)": [55, 45, 60]}),  
+        num_rows="dynamic",  
+        key="bordereau_simulation"  
+    ).dropna()  
+    col_a, col_b, col_c = st.columns(3)  
+    with col_a:  
+        nombre_chemins = st.selectbox("Nombre de simulations", [10_000, 100_000, 1_000_000], index=1)  
+    with col_b:  
+        nombre_tours = st.number_input("Nombre de tours", min_value=1, max_value=100, value=10)  
+    with col_c:  
+        graine = st.number_input("Graine aléatoire", min_value=0, value=0)  
+    if st.button("Lancer la simulation"):  
+        try:  
+            with timed("simulate_bankroll"):  
+                resultats = simulate_bankroll(  
+                    bordereau["Cote"].to_numpy(dtype=float),  
+                    bordereau["Probabilité estimée (%)"].to_numpy(dtype=float) / 100,  
+                    kelly_fractions=KELLY_FRACTIONS,  
+                    n_paths=nombre_chemins,  
+                    n_rounds=int(nombre_tours),  
+                    seed=int(graine)  
+                )  
+            st.dataframe(resultats.style.format("{:.2%}", subset=["Probabilité de ruine"]))  
+        except Exception as e:  
+            st.error(f"Erreur lors de la simulation : {str(e)}")  
+
+@st.fragment  
+def analyse_marge_bookmaker():  
     st.header("📊 Analyse de la Marge du Bookmaker")  
-    cotes = []  
-    nombre_cotes = st.slider("Nombre de cotes à analyser", min_value=1, max_value=10, value=3)  
-    for i in range(nombre_cotes):  
-        cote = st.number_input(f"Cote {i + 1}", min_value=1.01, value=2.0, key=f"cote_{i}")  
-        cotes.append(cote)  
-    probabilites_implicites = [cotes_vers_probabilite(cote) for cote in cotes]  
-    marge_bookmaker = sum(probabilites_implicites) - 1  
-    st.write(f"Marge du bookmaker : **{marge_bookmaker:.2%}**")  
-    probabilites_corrigees = enlever_marge(probabilites_implicites, marge_bookmaker)  
-    st.write("Probabilités corrigées (sans marge) :")  
-    for i, p in enumerate(probabilites_corrigees):  
-        st.write(f"Événement {i + 1} : **{p:.2%}**")  
+    st.write("Une ligne par marché ; laissez la dernière cote vide pour un marché à deux issues.")  
+    tableau = st.data_editor(  
+        pd.DataFrame({"Cote 1": [2.0, 1.85], "Cote 2": [3.4, 1.95], "Cote 3": [3.6, None]}),  
+        num_rows="dynamic",  
+        key="tableau_cotes"  
+    ).dropna(how="all")  
+    methode = st.selectbox("Méthode de retrait de la marge", DEVIG_METHODS, format_func=lambda m: NOMS_METHODES_MARGE[m])  
+    if tableau.empty:  
+        return  
+    # Les cases vides sont masquées (0) ; une valeur nulle reste comparable d'une exécution à l'autre  
+    graph.set_inputs(cotes=tableau.fillna(0).to_numpy(dtype=float), methode_marge=methode)  
+    try:  
+        probabilites, marges = graph.get("tableau_sans_marge")  
+    except ValueError as e:  
+        st.error(str(e))  
+        return  
+    resultat = pd.DataFrame(probabilites, columns=[f"P{i + 1}" for i in range(probabilites.shape[1])], index=tableau.index)  
+    resultat["Marge du bookmaker"] = marges  
+    st.dataframe(resultat.style.format("{:.2%}"))  
+
+with tab4:  
+    st.title("🛠️ Outils de Paris")  
+    convertisseur_de_cotes()  
+    calcul_value_bets()  
+    simulateur_paris_combines()  
+    mise_de_kelly()  
+    simulation_bankroll()  
+    analyse_marge_bookmaker()  
 
 # Pied de page simulé avec HTML  
 st.markdown(  
@@ -324,4 +420,12 @@ st.markdown(
     </div>  
     """,  
     unsafe_allow_html=True  
-)
+)  
+
+# Panneau de débogage : détail des étapes de cette exécution et compteurs  
+if st.sidebar.checkbox("🐞 Temps par étape", value=False):  
+    st.sidebar.dataframe(pd.DataFrame(metrics_run.table(), columns=["étape", "ms", "appels", "part"]), hide_index=True)  
+    st.sidebar.write(metrics_run.counters_snapshot())  
+    st.sidebar.write("Cache des prédictions :", get_prediction_cache().stats())  
+    st.sidebar.write("Modèles partagés :", get_registry().stats())  
+get_metrics().finish_run()  